@@ -0,0 +1,60 @@
+import argparse
+import time
+import numpy as np
+from src.utils.state_detection import AdaptiveFeatureExtractor, FeatureExtractor, iter_video_frames
+from src.utils.feature_spec import FEATURE_NAMES
+from src.utils.fast_predictor import load_classifier
+
+# Accuracy vs. cost of AdaptiveFeatureExtractor against full processing on a recorded video.
+# Every configuration sees the same decoded frames; accuracy is measured against the features
+# of the full FeatureExtractor (per-feature error and agreement of the predicted state).
+
+parser = argparse.ArgumentParser(description="Compare adaptive and full feature extraction on a video.")
+parser.add_argument("video", help="Path to a video file")
+parser.add_argument("--frames", type=int, default=300, help="Number of frames to process")
+parser.add_argument("--pose-every", type=int, nargs="+", default=[1, 5, 10], help="Pose cadences to compare")
+parser.add_argument("--motion-threshold", type=float, nargs="+", default=[0.0, 2.0], help="Motion gate thresholds to compare")
+parser.add_argument("--roi-size", type=int, default=256, help="Crop size for FaceMesh (0: full frame)")
+args = parser.parse_args()
+
+frames = list(iter_video_frames(args.video, max_frames=args.frames))
+print(f"Decoded {len(frames)} frames of {frames[0].shape[1]}x{frames[0].shape[0]}")
+model = load_classifier("svm_cognitive_state.joblib", "svm_cognitive_state.npz")
+
+
+def run(extractor):
+    extractor.warm_up(*frames[0].shape[:2])
+    features = []
+    start = time.perf_counter()
+    for frame in frames:
+        features.append(extractor.process(frame)[0])
+    elapsed = time.perf_counter() - start
+    extractor.close()
+    return np.array(features), elapsed / len(frames) * 1000
+
+
+reference, full_ms = run(FeatureExtractor())
+reference_states = model.predict(reference)
+scale = reference.std(axis=0)
+scale[scale == 0] = 1.0
+
+rows = [("full", full_ms, 0.0, 1.0, None)]
+for threshold in args.motion_threshold:
+    for pose_every in args.pose_every:
+        extractor = AdaptiveFeatureExtractor(motion_threshold=threshold, pose_every=pose_every, roi_size=args.roi_size)
+        features, ms = run(extractor)
+        error = np.abs(features - reference) / scale
+        agreement = np.mean(model.predict(features) == reference_states)
+        label = f"adaptive gate={threshold:g} pose/{pose_every}"
+        rows.append((label, ms, error.mean(), agreement, dict(extractor.stats), error.mean(axis=0)))
+
+print(f"\n  {'configuration':<30} {'ms/frame':>9} {'speedup':>8} {'err (std)':>10} {'state agree':>12}  shortcuts")
+for label, ms, err, agreement, stats, *_ in rows:
+    shortcuts = "" if stats is None else (
+        f"skipped {stats['skipped']}, roi {stats['face_roi']}, full {stats['face_full']}, pose {stats['pose_runs']}")
+    print(f"  {label:<30} {ms:>9.2f} {full_ms / ms:>7.1f}x {err:>10.3f} {agreement * 100:>11.1f}%  {shortcuts}")
+
+print("\nMean error per feature (in standard deviations of the full-processing features):")
+print(f"  {'configuration':<30}" + "".join(f"{name[:12]:>13}" for name in FEATURE_NAMES))
+for label, *_, per_feature in [r for r in rows if len(r) == 6]:
+    print(f"  {label:<30}" + "".join(f"{value:>13.3f}" for value in per_feature))
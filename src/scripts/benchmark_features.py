@@ -0,0 +1,46 @@
+import argparse
+import time
+import numpy as np
+from src.utils.state_detection import FeatureExtractor, iter_video_frames
+
+# Compares per-frame feature extraction latency on a recorded video:
+#   - "per-frame graphs": FaceMesh + Pose are built and torn down for every frame (old behaviour)
+#   - "persistent":       a single FeatureExtractor is reused for the whole video
+
+parser = argparse.ArgumentParser(description="Benchmark per-frame feature extraction latency.")
+parser.add_argument("video", help="Path to a recorded video file")
+parser.add_argument("--frames", type=int, default=200, help="Maximum number of frames to process")
+args = parser.parse_args()
+
+frames = list(iter_video_frames(args.video, max_frames=args.frames))
+if not frames:
+    raise SystemExit(f"No frames decoded from {args.video}")
+print(f"Loaded {len(frames)} frames from {args.video}")
+
+def report(name, timings):
+    timings_ms = np.array(timings) * 1000
+    print(f"\n{name}")
+    print(f"  mean: {timings_ms.mean():.2f} ms   median: {np.median(timings_ms):.2f} ms   "
+          f"p95: {np.percentile(timings_ms, 95):.2f} ms   fps: {1000 / timings_ms.mean():.1f}")
+    return timings_ms.mean()
+
+# Before: rebuild the graphs for each frame
+before = []
+for frame in frames:
+    start = time.perf_counter()
+    with FeatureExtractor() as extractor:
+        extractor.process(frame)
+    before.append(time.perf_counter() - start)
+
+# After: one extractor for the whole stream
+after = []
+with FeatureExtractor() as extractor:
+    start = time.perf_counter()
+    for _ in extractor.iter_features(frames):
+        now = time.perf_counter()
+        after.append(now - start)
+        start = now
+
+mean_before = report("Per-frame graphs (before)", before)
+mean_after = report("Persistent extractor (after)", after)
+print(f"\nSpeed-up: {mean_before / mean_after:.1f}x")
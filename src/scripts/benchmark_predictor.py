@@ -0,0 +1,61 @@
+import argparse
+import subprocess
+import sys
+import time
+import joblib
+import numpy as np
+from src.utils.fast_predictor import CompiledSVC
+
+# Compares the sklearn SVC with the exported NumPy predictor:
+#   - import time of each dependency (measured in a fresh interpreter)
+#   - per-call latency for a single sample and for a batch
+#   - agreement of predict / predict_proba
+
+parser = argparse.ArgumentParser(description="Benchmark the compiled SVM predictor against sklearn.")
+parser.add_argument("--model", default="svm_cognitive_state.joblib")
+parser.add_argument("--compiled", default="svm_cognitive_state.npz")
+parser.add_argument("--data", default="dataset_1/labeled_features.npy")
+parser.add_argument("--repeats", type=int, default=2000)
+args = parser.parse_args()
+
+def import_time(statement):
+    code = f"import time; t = time.perf_counter(); {statement}; print(time.perf_counter() - t)"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return float(out.stdout.strip()) * 1000
+
+def per_call_us(fn, repeats):
+    fn()  # warm-up
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) / repeats * 1e6
+
+model = joblib.load(args.model)
+compiled = CompiledSVC.load(args.compiled)
+X = np.load(args.data)
+sample = X[:1]
+
+print("Import time (fresh interpreter):")
+print(f"  sklearn.svm + joblib: {import_time('import joblib, sklearn.svm'):.1f} ms")
+print(f"  numpy only:           {import_time('import numpy'):.1f} ms")
+
+print(f"\nPer-call latency (single sample, {args.repeats} calls):")
+for name, fn in [
+    ("sklearn predict", lambda: model.predict(sample)),
+    ("compiled predict", lambda: compiled.predict(sample)),
+    ("sklearn predict_proba", lambda: model.predict_proba(sample)),
+    ("compiled predict_proba", lambda: compiled.predict_proba(sample)),
+]:
+    print(f"  {name:<24} {per_call_us(fn, args.repeats):8.1f} us")
+
+batch_repeats = max(args.repeats // 20, 1)
+print(f"\nBatched latency ({len(X)} samples, {batch_repeats} calls):")
+for name, fn in [
+    ("sklearn predict_proba", lambda: model.predict_proba(X)),
+    ("compiled predict_proba", lambda: compiled.predict_proba(X)),
+]:
+    print(f"  {name:<24} {per_call_us(fn, batch_repeats):8.1f} us")
+
+print("\nAgreement with sklearn:")
+print(f"  predict:       {np.mean(model.predict(X) == compiled.predict(X)) * 100:.2f}% identical")
+print(f"  predict_proba: max abs difference {np.abs(model.predict_proba(X) - compiled.predict_proba(X)).max():.2e}")
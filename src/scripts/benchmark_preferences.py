@@ -0,0 +1,83 @@
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+from src.utils.memory import JSONPreferenceStore, SQLitePreferenceStore
+
+# Compares preference lookups/updates at scale:
+#   - legacy: re-read the whole JSON file on every load, read + rewrite it on every update
+#   - JSONPreferenceStore: mtime-invalidated in-process cache with write-behind flushing
+#   - SQLitePreferenceStore: indexed rows with batched commits
+
+parser = argparse.ArgumentParser(description="Benchmark preference storage backends.")
+parser.add_argument("--users", type=int, default=10000, help="Number of synthetic users")
+parser.add_argument("--ops", type=int, default=500, help="Operations per measurement")
+args = parser.parse_args()
+
+STATES = ["attentive", "confused", "distracted"]
+
+def legacy_load(path, user_id, state):
+    with open(path, 'r') as f:
+        memory = json.load(f)
+    user_data = memory.get(user_id, {}).get(state, {})
+    return user_data.get("preferred_style", "neutral"), user_data.get("example_response", "Let's keep going!")
+
+def legacy_update(path, user_id, state, new_style, new_example):
+    with open(path, 'r') as f:
+        memory = json.load(f)
+    memory.setdefault(user_id, {})[state] = {"preferred_style": new_style, "example_response": new_example}
+    with open(path, 'w') as f:
+        json.dump(memory, f, indent=2)
+
+def measure(fn, ops):
+    rng = random.Random(0)
+    start = time.perf_counter()
+    for i in range(ops):
+        fn(f"user_{rng.randrange(args.users)}", rng.choice(STATES), i)
+    return (time.perf_counter() - start) / ops * 1e6
+
+with tempfile.TemporaryDirectory() as tmp:
+    json_path = os.path.join(tmp, "user_memory.json")
+    memory = {
+        f"user_{u}": {s: {"preferred_style": f"style {u}", "example_response": f"example for {s}"} for s in STATES}
+        for u in range(args.users)
+    }
+    with open(json_path, 'w') as f:
+        json.dump(memory, f, indent=2)
+    print(f"Synthetic memory: {args.users} users, {os.path.getsize(json_path) / 1e6:.1f} MB")
+
+    json_store = JSONPreferenceStore(json_path, flush_delay=60)
+    sqlite_path = os.path.join(tmp, "user_memory.sqlite")
+    sqlite_store = SQLitePreferenceStore(sqlite_path, flush_delay=60)
+    start = time.perf_counter()
+    sqlite_store.import_json(json_path)
+    print(f"SQLite import: {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    legacy_ops = max(args.ops // 10, 10)  # the legacy path is too slow for the full count
+    results = [
+        ("legacy load", measure(lambda u, s, i: legacy_load(json_path, u, s), legacy_ops)),
+        ("legacy update", measure(lambda u, s, i: legacy_update(json_path, u, s, "calm", f"ex {i}"), legacy_ops)),
+        ("json store load", measure(lambda u, s, i: json_store.get(u, s), args.ops)),
+        ("json store update", measure(lambda u, s, i: json_store.set(u, s, "calm", f"ex {i}"), args.ops)),
+        ("sqlite store load", measure(lambda u, s, i: sqlite_store.get(u, s), args.ops)),
+        ("sqlite store update", measure(lambda u, s, i: sqlite_store.set(u, s, "calm", f"ex {i}"), args.ops)),
+    ]
+
+    start = time.perf_counter()
+    json_store.flush()
+    json_flush = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    sqlite_store.flush()
+    sqlite_flush = (time.perf_counter() - start) * 1000
+
+    print(f"\nPer-operation latency ({args.users} users):")
+    for name, us in results:
+        print(f"  {name:<22} {us:10.1f} us")
+    print(f"\nWrite-behind flush of {args.ops} pending updates:")
+    print(f"  json store   {json_flush:8.1f} ms")
+    print(f"  sqlite store {sqlite_flush:8.1f} ms")
+
+    json_store.close()
+    sqlite_store.close()
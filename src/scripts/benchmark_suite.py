@@ -0,0 +1,396 @@
+import argparse
+import datetime
+import fnmatch
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+
+# End-to-end benchmark suite. Each stage is timed on its own, then the full turn loop:
+#   extract_features     per frame of a recorded video with a face (--video; the generated synthetic
+#                        fixture of --synthetic-video has no face and only times the no-face path)
+#   predict              single sample vs. batch, sklearn model and NumPy export
+#   preferences          load_preference / update_preference on a copy of user_memory.json
+#   logging              log_conversation (queued) and the background write it triggers
+#   full_loop            frame -> features -> prediction -> preferences -> reply (mock LLM) -> log
+#   training             train_classifier.py (grid mode) on dataset_1
+#   evaluation           evaluate.py, cold and with its cache warm
+# Every benchmark runs --runs times and each metric keeps its best (lowest) median, which is far
+# less sensitive to background load than a single median. Results are written as JSON. With a
+# baseline, a metric is a regression when it is slower than baseline * (1 + tolerance) AND slower
+# by more than --min-delta-ms, so sub-microsecond metrics cannot fail on scheduler noise.
+# Tolerances can be set per metric (TOLERANCES below, or --metric-tolerance). A missing baseline
+# fails the run unless --allow-missing-baseline is given, and a baseline is only saved when every
+# benchmark succeeded, so no stage silently drops out of the gate.
+#
+#   ipython src/scripts/benchmark_suite.py -- --video face.mp4 --save-baseline   # on the reference machine
+#   ipython src/scripts/benchmark_suite.py -- --video face.mp4                   # compare against it
+
+parser = argparse.ArgumentParser(description="Run the performance benchmark suite.")
+parser.add_argument("--video", help="Recorded video of a face (required by extract_features and full_loop)")
+parser.add_argument("--synthetic-video", action="store_true",
+                    help="Use a generated video without a face instead (times the no-face path only)")
+parser.add_argument("--data", default="dataset_1")
+parser.add_argument("--model", default="svm_cognitive_state.joblib")
+parser.add_argument("--compiled", default="svm_cognitive_state.npz")
+parser.add_argument("--memory", default="user_memory.json")
+parser.add_argument("--frames", type=int, default=60, help="Frames used from the video fixture")
+parser.add_argument("--repeats", type=int, default=200, help="Repeats of the fast micro-benchmarks")
+parser.add_argument("--only", nargs="+", help="Run only these benchmarks")
+parser.add_argument("--skip", nargs="+", default=[], help="Skip these benchmarks")
+parser.add_argument("--output", default="benchmark_results.json")
+parser.add_argument("--baseline", default="benchmarks/baseline.json")
+parser.add_argument("--save-baseline", action="store_true", help="Store these results as the new baseline")
+parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown relative to the baseline")
+parser.add_argument("--metric-tolerance", nargs="+", default=[], metavar="PATTERN=TOL",
+                    help="Per-metric tolerances, e.g. 'evaluation.*=1.0' (overrides the defaults)")
+parser.add_argument("--min-delta-ms", type=float, default=0.05, help="Slowdowns smaller than this are never regressions")
+parser.add_argument("--runs", type=int, default=3, help="Runs per benchmark; each metric keeps its best median")
+parser.add_argument("--allow-missing-baseline", action="store_true", help="Exit 0 when there is no baseline to compare with")
+args = parser.parse_args()
+
+FRAME_BENCHMARKS = {"extract_features", "full_loop"}
+
+# Metrics dominated by process start-up or disk caches vary more between runs than in-process timings
+TOLERANCES = {
+    "training.*": 0.5,
+    "evaluation.*": 1.0,
+    "*.flush": 1.0,
+}
+for item in args.metric_tolerance:
+    pattern, _, value = item.partition("=")
+    TOLERANCES[pattern] = float(value)
+
+# Replies must come from the mock LLM, not from the response cache
+os.environ["ASSISTANT_RESPONSE_CACHE"] = "off"
+
+BENCHMARKS = {}
+
+def benchmark(name):
+    def register(fn):
+        BENCHMARKS[name] = fn
+        return fn
+    return register
+
+
+def measure(fn, repeats, warmup=1):
+    """
+    Times fn() `repeats` times.
+
+    Returns:
+        dict: median and p95 in milliseconds, plus the number of repeats.
+    """
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    samples = np.array(samples) * 1000
+    return {"median_ms": float(np.median(samples)), "p95_ms": float(np.percentile(samples, 95)), "repeats": repeats}
+
+
+def once(fn):
+    start = time.perf_counter()
+    fn()
+    return {"median_ms": (time.perf_counter() - start) * 1000, "p95_ms": None, "repeats": 1}
+
+
+# --- fixtures ---
+
+def make_video_fixture(path, n_frames):
+    import cv2
+    from src.utils.frame_sources import SyntheticSource
+
+    source = SyntheticSource(fps=1e6)
+    _, frame = source.read()
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), 30, (frame.shape[1], frame.shape[0]))
+    for _ in range(n_frames):
+        writer.write(source.read()[1])
+    writer.release()
+    return path
+
+
+def load_frames(path, n_frames):
+    from src.utils.state_detection import iter_video_frames
+
+    return list(iter_video_frames(path, max_frames=n_frames))
+
+
+class Fixtures:
+    def __init__(self, workdir):
+        self.workdir = workdir
+        self._frames = None
+        self.face_frames = None   # frames of the fixture with a detected face (set by extract_features)
+        self.video = args.video
+        if self.video is None and args.synthetic_video:
+            self.video = make_video_fixture(os.path.join(workdir, "fixture.mp4"), args.frames)
+        self.X = np.load(f"{args.data}/labeled_features.npy")
+        self.y = np.load(f"{args.data}/labels.npy")
+
+    @property
+    def frames(self):
+        if self._frames is None:
+            self._frames = load_frames(self.video, args.frames)
+        return self._frames
+
+    def memory_copy(self, name):
+        path = os.path.join(self.workdir, name)
+        if os.path.exists(args.memory):
+            shutil.copy(args.memory, path)
+        return path
+
+
+# --- benchmarks ---
+
+@benchmark("extract_features")
+def bench_extract(fx):
+    from src.utils.feature_spec import FEATURE_SPEC
+    from src.utils.state_detection import FeatureExtractor
+
+    frames = fx.frames
+    face_columns = [i for i, spec in enumerate(FEATURE_SPEC) if spec.source == "face"]
+    with FeatureExtractor() as extractor:
+        extractor.warm_up()
+        # Frames without a face skip the landmark work; report how many exercised it
+        fx.face_frames = sum(bool(np.any(np.asarray(extractor.process(frame)[0])[face_columns] != 0)) for frame in frames)
+        index = iter(range(10 ** 9))
+        return {"per_frame": measure(lambda: extractor.process(frames[next(index) % len(frames)]), len(frames))}
+
+
+@benchmark("predict")
+def bench_predict(fx):
+    import joblib
+    from src.utils.fast_predictor import CompiledSVC
+
+    model = joblib.load(args.model)
+    compiled = CompiledSVC.load(args.compiled)
+    sample, batch = fx.X[:1], fx.X
+    batch_repeats = max(args.repeats // 10, 5)
+    return {
+        "sklearn_single": measure(lambda: model.predict_proba(sample), args.repeats),
+        "sklearn_batch": measure(lambda: model.predict_proba(batch), batch_repeats),
+        "compiled_single": measure(lambda: compiled.predict_proba(sample), args.repeats),
+        "compiled_batch": measure(lambda: compiled.predict_proba(batch), batch_repeats),
+    }
+
+
+@benchmark("preferences")
+def bench_preferences(fx):
+    from src.utils.memory import JSONPreferenceStore
+
+    store = JSONPreferenceStore(fx.memory_copy("user_memory.json"), flush_delay=60)
+    counter = iter(range(10 ** 9))
+    results = {
+        "load": measure(lambda: store.get("user_1", "confused"), args.repeats),
+        "update": measure(lambda: store.set("user_1", "confused", "calm", f"example {next(counter)}"), args.repeats),
+        "flush": once(store.flush),
+    }
+    store.close()
+    return results
+
+
+@benchmark("logging")
+def bench_logging(fx):
+    from src.utils.conversation_saving import LogWriter
+
+    writer = LogWriter(os.path.join(fx.workdir, "log.jsonl"), os.path.join(fx.workdir, "log.txt"))
+    record = {
+        "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f"), "turn_id": 1,
+        "user_id": "user_1", "state": "attentive", "user_input": "Hello there",
+        "assistant_response": "Hello! How are you feeling today?",
+    }
+    results = {
+        "log_conversation": measure(lambda: writer.write(dict(record)), args.repeats),
+        "flush": once(writer.flush),
+    }
+    writer.close()
+    return results
+
+
+@benchmark("full_loop")
+def bench_full_loop(fx):
+    from src.utils.state_detection import FeatureExtractor
+    from src.utils.fast_predictor import load_classifier
+    from src.utils.memory import JSONPreferenceStore
+    from src.utils.conversation_saving import LogWriter
+    from src.utils.llm_backends import LocalBackend
+    from src.utils.response_generator import ResponseGenerator, StreamingClient
+
+    frames = fx.frames
+    model = load_classifier(args.model, args.compiled)
+    store = JSONPreferenceStore(fx.memory_copy("user_memory_loop.json"), flush_delay=60)
+    writer = LogWriter(os.path.join(fx.workdir, "loop.jsonl"), os.path.join(fx.workdir, "loop.txt"))
+    client = StreamingClient(LocalBackend())
+    generator = ResponseGenerator(client=client)
+    classes = list(model.classes_)
+    turn = iter(range(10 ** 9))
+
+    with FeatureExtractor() as extractor:
+        extractor.warm_up()
+
+        def run_turn():
+            i = next(turn)
+            features, _ = extractor.process(frames[i % len(frames)])
+            state = classes[int(np.argmax(model.predict_proba(np.asarray(features)[None, :])[0]))]
+            style, example = store.get("user_1", state)
+            reply = generator.generate_response(state, style, example, user_input=f"Message number {i}")
+            writer.write({
+                "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f"), "turn_id": i,
+                "user_id": "user_1", "state": state, "user_input": f"Message number {i}", "assistant_response": reply,
+            })
+
+        results = {"turn": measure(run_turn, min(len(frames), 50))}
+    writer.close()
+    store.close()
+    client.close()
+    return results
+
+
+def run_script(*script_args):
+    subprocess.run([sys.executable, "-m", *script_args], check=True, capture_output=True, text=True)
+
+
+@benchmark("training")
+def bench_training(fx):
+    output = os.path.join(fx.workdir, "model.joblib")
+    return {"grid": once(lambda: run_script("src.scripts.train_classifier", "--data", args.data, "--mode", "grid", "--output", output))}
+
+
+@benchmark("evaluation")
+def bench_evaluation(fx):
+    output = os.path.join(fx.workdir, "evaluation")
+    evaluate = ("src.scripts.evaluate", "--data", args.data, "--model", args.model, "--output", output)
+    return {
+        "cold": once(lambda: run_script(*evaluate, "--force")),
+        "cached": once(lambda: run_script(*evaluate)),
+    }
+
+
+# --- run ---
+
+def tolerance_for(metric):
+    """
+    Tolerance of a metric: the last matching TOLERANCES pattern, else --tolerance.
+    """
+    tolerance = args.tolerance
+    for pattern, value in TOLERANCES.items():
+        if fnmatch.fnmatch(metric, pattern):
+            tolerance = value
+    return tolerance
+
+
+def best_of(runs):
+    """
+    Merges the results of several runs of one benchmark, keeping each metric's fastest run.
+    """
+    merged = {}
+    for metric in runs[0]:
+        values = [run[metric] for run in runs if metric in run]
+        best = dict(min(values, key=lambda value: value["median_ms"]))
+        best["run_medians_ms"] = [value["median_ms"] for value in values]
+        merged[metric] = best
+    return merged
+
+
+def compare(results, baseline):
+    """
+    Returns:
+        list: (metric, baseline ms, current ms, ratio, tolerance) for every metric slower than allowed.
+    """
+    regressions = []
+    for name, metrics in results.items():
+        for metric, value in metrics.items():
+            reference = baseline.get(name, {}).get(metric)
+            if reference is None:
+                continue
+            full_name = f"{name}.{metric}"
+            tolerance = tolerance_for(full_name)
+            before, after = reference["median_ms"], value["median_ms"]
+            if after > before * (1 + tolerance) and after - before > args.min_delta_ms:
+                regressions.append((full_name, before, after, after / max(before, 1e-9), tolerance))
+    return regressions
+
+
+selected = [name for name in BENCHMARKS if (not args.only or name in args.only) and name not in args.skip]
+if FRAME_BENCHMARKS & set(selected) and not args.video and not args.synthetic_video:
+    parser.error(f"a recorded video of a face (--video) is needed by: {', '.join(sorted(FRAME_BENCHMARKS & set(selected)))}. "
+                 "Pass --synthetic-video to time the no-face path, or skip them with --skip.")
+results, errors = {}, {}
+
+with tempfile.TemporaryDirectory() as workdir:
+    fixtures = Fixtures(workdir)
+    for name in selected:
+        print(f"Running {name}...", flush=True)
+        try:
+            results[name] = best_of([BENCHMARKS[name](fixtures) for _ in range(max(args.runs, 1))])
+        except Exception as e:
+            errors[name] = f"{type(e).__name__}: {e}"
+            print(f" FAILED: {errors[name]}")
+
+print(f"\n  {'metric':<34} {'median (ms)':>12} {'p95 (ms)':>10}")
+for name, metrics in results.items():
+    for metric, value in metrics.items():
+        p95 = f"{value['p95_ms']:>10.3f}" if value["p95_ms"] is not None else f"{'-':>10}"
+        print(f"  {name + '.' + metric:<34} {value['median_ms']:>12.3f} {p95}")
+
+report = {
+    "created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+    "machine": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+    "fixtures": {
+        "video": args.video or ("synthetic (no face)" if args.synthetic_video else None),
+        "frames": args.frames,
+        "face_frames": fixtures.face_frames,
+        "data": args.data,
+    },
+    "runs": args.runs,
+    "results": results,
+    "errors": errors,
+}
+with open(args.output, "w") as f:
+    json.dump(report, f, indent=2)
+print(f"\n Results saved to '{args.output}'")
+if fixtures.face_frames is not None:
+    print(f" Video fixture: {report['fixtures']['video']} ({fixtures.face_frames}/{len(fixtures.frames)} frames with a face)")
+
+if args.save_baseline and errors:
+    print(f"\n Not saving the baseline: {len(errors)} benchmark(s) failed ({', '.join(errors)}); "
+          "their stages would silently drop out of the regression check.")
+    sys.exit(1)
+if args.save_baseline:
+    os.makedirs(os.path.dirname(args.baseline) or ".", exist_ok=True)
+    with open(args.baseline, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f" Baseline saved to '{args.baseline}'")
+elif os.path.exists(args.baseline):
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    baseline_video = baseline.get("fixtures", {}).get("video")
+    same_video = os.path.basename(str(baseline_video)) == os.path.basename(str(report["fixtures"]["video"]))
+    if not same_video and FRAME_BENCHMARKS & set(results):
+        print(f"\n The baseline was measured on video '{baseline_video}', "
+              f"not '{report['fixtures']['video']}'; frame timings are not comparable.")
+        sys.exit(1)
+    regressions = compare(results, baseline["results"])
+    if regressions:
+        print(f"\n PERFORMANCE REGRESSIONS (minimum delta {args.min_delta_ms} ms, baseline from {baseline['created_at']}):")
+        for metric, before, after, ratio, tolerance in regressions:
+            print(f"  {metric:<34} {before:>10.3f} ms -> {after:>10.3f} ms  ({ratio:.2f}x, tolerance {tolerance:.0%})")
+        sys.exit(1)
+    print(f" No regressions against '{args.baseline}' (tolerance {args.tolerance:.0%}, minimum delta {args.min_delta_ms} ms).")
+elif args.allow_missing_baseline:
+    print(f" No baseline at '{args.baseline}'; nothing compared (--allow-missing-baseline).")
+else:
+    print(f"\n No baseline at '{args.baseline}': the regression check cannot run. "
+          "Create one with --save-baseline, or pass --allow-missing-baseline.")
+    sys.exit(1)
+
+if errors:
+    print(f"\n {len(errors)} benchmark(s) failed: {', '.join(errors)}")
+    sys.exit(1)
@@ -1,9 +1,15 @@
+import argparse
 import cv2
-import numpy as np
-import csv
-import os
 from collections import defaultdict
-from utils.state_detection import extract_features
+from src.utils.state_detection import FeatureExtractor
+from src.utils.dataset_store import DatasetStore
+
+parser = argparse.ArgumentParser(description="Collect labeled webcam samples.")
+parser.add_argument("--output", default="dataset", help="Dataset store directory (appended to across sessions)")
+parser.add_argument("--user", default="user_1", help="Id of the person being recorded")
+parser.add_argument("--session", help="Session id (default: current timestamp)")
+parser.add_argument("--chunk-size", type=int, default=10, help="Samples buffered before they are written to disk")
+args = parser.parse_args()
 
 # Initialize webcam (using AVFoundation backend for macOS)
 cap = cv2.VideoCapture(0, cv2.CAP_AVFOUNDATION)
@@ -11,9 +17,12 @@ width = cap.get(cv2.CAP_PROP_FRAME_WIDTH)
 height = cap.get(cv2.CAP_PROP_FRAME_HEIGHT)
 print(f" Webcam resolution: {int(width)}x{int(height)}")
 
-# Initialize storage
-features_list = []
-labels_list = []
+# MediaPipe graphs are built once and keep tracking the face between frames
+extractor = FeatureExtractor()
+
+# Samples are committed to the dataset every --chunk-size captures, so a crash loses at most one chunk
+store = DatasetStore(args.output)
+writer = store.writer(user_id=args.user, session_id=args.session, chunk_size=args.chunk_size)
 label_counts = defaultdict(int)
 
 # Define class labels and number of examples per class
@@ -56,11 +65,10 @@ while True:
 
     elif key in [ord(k) for k in class_labels]:
         label = class_labels[chr(key).lower()]
-        features = extract_features(frame)
+        features, _ = extractor.process(frame)
 
         if features is not None and not all(f == 0 for f in features):
-            features_list.append(features)
-            labels_list.append(label)
+            writer.append(features, label)
             label_counts[label] += 1
             print(f" Captured: {label} ({label_counts[label]}/{target_per_class})")
         else:
@@ -73,32 +81,12 @@ while True:
 
 # Cleanup
 cap.release()
+extractor.close()
 cv2.destroyAllWindows()
+writer.close()
+
+# Human-readable copy of the whole dataset (all sessions)
+store.export_csv()
 
-# Create dataset directory if not exists
-dataset_dir = os.path.join(os.getcwd(), "dataset")
-os.makedirs(dataset_dir, exist_ok=True)
-
-# Save raw features and labels in NumPy format
-np.save(os.path.join(dataset_dir, "labeled_features.npy"), np.array(features_list))
-np.save(os.path.join(dataset_dir, "labels.npy"), np.array(labels_list))
-
-# Save dataset in CSV format with readable feature names
-csv_path = os.path.join(dataset_dir, "dataset.csv")
-with open(csv_path, "w", newline="") as f:
-    writer = csv.writer(f)
-    writer.writerow([
-        "eye_openness_left",
-        "eye_openness_right",
-        "eyebrow_distance_left",
-        "eyebrow_distance_right",
-        "mouth_openness",
-        "head_yaw_asymmetry",
-        "shoulder_distance",
-        "head_tilt_vertical",
-        "label"
-    ])
-    for feats, label in zip(features_list, labels_list):
-        writer.writerow(list(feats) + [label])
-
-print(f"\n Saved dataset to: {dataset_dir}")
\ No newline at end of file
+print(f"\n Saved session '{writer.session_id}' to: {args.output} ({len(store)} samples in total)")
+print(f" Label counts: {store.label_counts()}")
@@ -0,0 +1,39 @@
+import argparse
+import time
+from src.utils.dataset_store import DatasetStore, load_dataset
+
+# Maintenance of chunked dataset stores (see src/utils/dataset_store.py):
+#   info      samples, label counts, users and sessions
+#   import    append a legacy directory (labeled_features.npy + labels.npy) as one session
+#   compact   merge all chunks into one, sorted by user and session, for zero-copy loading
+#   csv       rewrite dataset.csv
+
+parser = argparse.ArgumentParser(description="Inspect and maintain a dataset store.")
+parser.add_argument("command", choices=["info", "import", "compact", "csv"])
+parser.add_argument("--store", default="dataset", help="Dataset store directory")
+parser.add_argument("--source", help="Legacy dataset directory to import")
+parser.add_argument("--user", default="unknown", help="User id of the imported samples")
+parser.add_argument("--session", help="Session id of the imported samples")
+args = parser.parse_args()
+
+store = DatasetStore(args.store)
+
+if args.command == "import":
+    if not args.source:
+        parser.error("import requires --source")
+    X, y = load_dataset(args.source)
+    store.append(X, y, user_id=args.user, session_id=args.session)
+    print(f" Imported {len(y)} samples from '{args.source}'.")
+elif args.command == "compact":
+    n_chunks = len(store.manifest["chunks"])
+    start = time.perf_counter()
+    store.compact()
+    print(f" Compacted {n_chunks} chunks into {len(store.manifest['chunks'])} in {(time.perf_counter() - start) * 1000:.0f} ms.")
+elif args.command == "csv":
+    print(f" Wrote '{store.export_csv()}'.")
+
+print(f"\nDataset '{args.store}': {len(store)} samples in {len(store.manifest['chunks'])} chunks")
+print(f"  Labels: {store.label_counts()}")
+for user in store.users():
+    sessions = store.sessions(user)
+    print(f"  {user}: {len(sessions)} sessions ({', '.join(sessions)})")
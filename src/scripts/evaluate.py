@@ -1,4 +1,50 @@
+import argparse
+import json
+import os
+import time
+from src.utils.evaluation import ResultCache, adaptive_decision_grid, cache_key, file_hash
+from src.utils.dataset_store import DatasetStore, is_dataset_store, load_dataset
+
+# Headless evaluation report. Writes into --output:
+#   decision_regions.png     PCA decision regions with support vectors
+#   permutation_importance.png
+#   svm_confusion_matrix.pdf
+#   metrics.json             accuracy, per-class report, confusion matrix, importances, timings
+# The PCA boundary model, its decision grid and the permutation importances are cached by
+# model/dataset hash; if the model and dataset are unchanged the previous report is reused.
+
+parser = argparse.ArgumentParser(description="Evaluate the cognitive state classifier (headless).")
+parser.add_argument("--data", default="dataset_1", help="Dataset store, or directory with labeled_features.npy and labels.npy")
+parser.add_argument("--model", default="svm_cognitive_state.joblib")
+parser.add_argument("--output", default="evaluation", help="Directory for figures and metrics.json")
+parser.add_argument("--repeats", type=int, default=30, help="Permutation importance repeats")
+parser.add_argument("--force", action="store_true", help="Rebuild the report even if it is up to date")
+args = parser.parse_args()
+
+metrics_path = os.path.join(args.output, "metrics.json")
+figures = ["decision_regions.png", "permutation_importance.png", "svm_confusion_matrix.pdf"]
+
+timings = {}
+start = time.perf_counter()
+if is_dataset_store(args.data):
+    data_hash = DatasetStore(args.data).content_hash()
+else:
+    data_hash = file_hash(f"{args.data}/labeled_features.npy", f"{args.data}/labels.npy")
+model_hash = file_hash(args.model)
+report_key = cache_key(data_hash, model_hash, args.repeats)
+timings["hashing"] = time.perf_counter() - start
+
+# Nothing changed since the last report: skip the heavy imports entirely
+if not args.force and os.path.exists(metrics_path) and all(os.path.exists(os.path.join(args.output, f)) for f in figures):
+    with open(metrics_path) as f:
+        previous = json.load(f)
+    if previous.get("report_key") == report_key:
+        print(f" Report in '{args.output}' is up to date (accuracy {previous['accuracy']:.3f}). Use --force to rebuild.")
+        raise SystemExit(0)
+
 import numpy as np
+import matplotlib
+matplotlib.use("Agg")
 import matplotlib.pyplot as plt
 import seaborn as sns
 from sklearn.decomposition import PCA
@@ -8,17 +54,15 @@ from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import LabelEncoder
 from matplotlib.colors import ListedColormap
 import joblib
-from sklearn.metrics import confusion_matrix
+from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
+from src.utils.feature_spec import FEATURE_NAMES, check_model_schema
+
+os.makedirs(args.output, exist_ok=True)
+cache = ResultCache(os.path.join(args.output, "cache"))
 
 # Load dataset
-X = np.load("dataset_1/labeled_features.npy")
-y = np.load("dataset_1/labels.npy")
-feature_names = [
-    "eye_openness_left", "eye_openness_right",
-    "eyebrow_distance_left", "eyebrow_distance_right",
-    "mouth_openness", "head_yaw_asymmetry",
-    "shoulder_distance", "head_tilt_vertical"
-]
+X, y = load_dataset(args.data)
+feature_names = FEATURE_NAMES
 colors = {'attentive': 'green', 'confused': 'orange', 'distracted': 'red'}
 
 # Encode labels numerically (needed for contourf)
@@ -27,13 +71,29 @@ y_encoded = encoder.fit_transform(y)
 label_names = encoder.classes_
 
 # Load final trained model
-model = joblib.load("svm_cognitive_state.joblib")
+model = joblib.load(args.model)
+check_model_schema(model)
 
-# PCA + Decision Boundary
+# PCA + Decision Boundary (depends on the dataset only)
+start = time.perf_counter()
+boundary_key = cache_key(data_hash)
 pca = PCA(n_components=2)
 X_pca = pca.fit_transform(X)
-svm_pca = SVC(kernel="rbf")
-svm_pca.fit(X_pca, y_encoded)
+svm_pca = cache.get_object("svm_pca", boundary_key)
+if svm_pca is None:
+    svm_pca = SVC(kernel="rbf").fit(X_pca, y_encoded)
+    cache.put_object("svm_pca", boundary_key, svm_pca)
+
+boundary = cache.get_arrays("boundary", boundary_key)
+if boundary is None:
+    xx, yy, Z, n_evaluations = adaptive_decision_grid(
+        svm_pca.predict,
+        (X_pca[:, 0].min(), X_pca[:, 0].max()),
+        (X_pca[:, 1].min(), X_pca[:, 1].max()),
+    )
+    boundary = {"xx": xx, "yy": yy, "Z": Z, "n_evaluations": np.array(n_evaluations)}
+    cache.put_arrays("boundary", boundary_key, boundary)
+timings["decision_boundary"] = time.perf_counter() - start
 
 plt.figure(figsize=(8, 6))
 
@@ -42,14 +102,8 @@ for i, label in enumerate(label_names):
     idxs = np.where(y_encoded == i)
     plt.scatter(X_pca[idxs, 0], X_pca[idxs, 1], label=label, alpha=0.6, color=colors[label])
 
-# Compute decision boundaries
-xx, yy = np.meshgrid(
-    np.linspace(X_pca[:, 0].min(), X_pca[:, 0].max(), 500),
-    np.linspace(X_pca[:, 1].min(), X_pca[:, 1].max(), 500)
-)
-Z = svm_pca.predict(np.c_[xx.ravel(), yy.ravel()]).reshape(xx.shape)
 cmap = ListedColormap([colors[l] for l in label_names])
-plt.contourf(xx, yy, Z, alpha=0.2, levels=len(colors), cmap=cmap)
+plt.contourf(boundary["xx"], boundary["yy"], boundary["Z"], alpha=0.2, levels=len(colors), cmap=cmap)
 
 # Highlight support vectors
 sv_idxs_pca = svm_pca.support_
@@ -62,28 +116,37 @@ plt.ylabel("PCA Component 2")
 plt.title("SVM Decision Regions with Support Vectors (PCA Space)")
 plt.legend()
 plt.tight_layout()
-plt.show()
+plt.savefig(os.path.join(args.output, "decision_regions.png"), dpi=150)
+plt.close()
 
 # Support Vector Info
-print(f"\n Number of support vectors (final model): {len(model.support_)}")
-print("Support vector indices:", model.support_)
+n_support_vectors = len(model.support_) if hasattr(model, "support_") else None
+if n_support_vectors is not None:
+    print(f"\n Number of support vectors (final model): {n_support_vectors}")
 
 # Permutation Feature Importance
 # Train/test split for permutation importance
 X_train, X_test, y_train, y_test = train_test_split(X, y, stratify=y, test_size=0.2, random_state=42)
-perm = permutation_importance(model, X_test, y_test, n_repeats=30, random_state=42, n_jobs=-1)
+start = time.perf_counter()
+importance = cache.get_arrays("importance", report_key)
+if importance is None:
+    perm = permutation_importance(model, X_test, y_test, n_repeats=args.repeats, random_state=42, n_jobs=-1)
+    importance = {"mean": perm.importances_mean, "std": perm.importances_std}
+    cache.put_arrays("importance", report_key, importance)
+timings["permutation_importance"] = time.perf_counter() - start
 
 plt.figure(figsize=(10, 5))
-sorted_idx = perm.importances_mean.argsort()[::-1]
+sorted_idx = importance["mean"].argsort()[::-1]
 sns.barplot(
-    x=perm.importances_mean[sorted_idx],
+    x=importance["mean"][sorted_idx],
     y=np.array(feature_names)[sorted_idx],
     palette="coolwarm"
 )
 plt.title("Permutation Feature Importance (SVM)")
 plt.xlabel("Mean Importance")
 plt.tight_layout()
-plt.show()
+plt.savefig(os.path.join(args.output, "permutation_importance.png"), dpi=150)
+plt.close()
 
 # === Confusion Matrix ===
 y_pred = model.predict(X_test)
@@ -95,5 +158,32 @@ plt.title("Confusion Matrix (SVM Classifier)")
 plt.xlabel("Predicted Label")
 plt.ylabel("True Label")
 plt.tight_layout()
-plt.savefig("svm_confusion_matrix.pdf")
-plt.close()
\ No newline at end of file
+plt.savefig(os.path.join(args.output, "svm_confusion_matrix.pdf"))
+plt.close()
+
+# === Metrics ===
+metrics = {
+    "report_key": report_key,
+    "model": args.model,
+    "model_hash": model_hash,
+    "data": args.data,
+    "data_hash": data_hash,
+    "n_samples": int(len(X)),
+    "accuracy": float(accuracy_score(y_test, y_pred)),
+    "classification_report": classification_report(y_test, y_pred, output_dict=True),
+    "labels": [str(l) for l in label_names],
+    "confusion_matrix": cm.tolist(),
+    "n_support_vectors": n_support_vectors,
+    "permutation_importance": {
+        name: {"mean": float(m), "std": float(s)}
+        for name, m, s in zip(feature_names, importance["mean"], importance["std"])
+    },
+    "boundary_evaluations": int(boundary["n_evaluations"]),
+    "timings": timings,
+}
+with open(metrics_path, "w") as f:
+    json.dump(metrics, f, indent=2)
+
+print(f" Accuracy: {metrics['accuracy']:.3f}")
+print(f" Decision boundary: {metrics['boundary_evaluations']} SVM evaluations")
+print(f" Report written to '{args.output}'")
@@ -0,0 +1,14 @@
+import argparse
+import joblib
+from src.utils.fast_predictor import export_predictor
+
+# Converts the trained sklearn SVC into the NumPy-only predictor used by the assistant.
+
+parser = argparse.ArgumentParser(description="Export the SVM to a NumPy-only .npz predictor.")
+parser.add_argument("--model", default="svm_cognitive_state.joblib", help="Trained sklearn model")
+parser.add_argument("--output", default="svm_cognitive_state.npz", help="Destination .npz file")
+args = parser.parse_args()
+
+model = joblib.load(args.model)
+export_predictor(model, args.output)
+print(f" Exported {len(model.support_vectors_)} support vectors to '{args.output}'")
@@ -0,0 +1,48 @@
+import argparse
+import os
+from src.utils.batch_extraction import read_manifest, plan_tasks, extract_dataset, merge_chunks
+from src.utils.temporal_features import build_temporal_dataset
+
+# Builds a labeled dataset offline from recorded videos and image folders.
+#
+# The manifest is a CSV with one source per row:
+#     path,label
+#     recordings/anna_attentive.mp4,attentive
+#     recordings/confused_frames/,confused
+#
+# Frames are processed in parallel (one MediaPipe instance per worker process) and written as
+# chunks, then merged into the same files collect_data.py produces. With --temporal, every video is
+# also replayed through the TemporalFeatureEngine to build temporal_features.npy / temporal_labels.npy
+# (windowed statistics for `train_classifier.py --features temporal`).
+
+parser = argparse.ArgumentParser(description="Offline batch feature extraction.")
+parser.add_argument("manifest", help="CSV file with 'path' and 'label' columns")
+parser.add_argument("--output", default="dataset", help="Output directory")
+parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+parser.add_argument("--frames-per-task", type=int, default=256, help="Frames per work unit / chunk")
+parser.add_argument("--stride", type=int, default=1, help="Keep every n-th frame")
+parser.add_argument("--keep-empty", action="store_true", help="Keep frames without any detection")
+parser.add_argument("--temporal", action="store_true", help="Also build the temporal feature dataset")
+parser.add_argument("--fps", type=float, default=30.0, help="Frame rate of the recordings (temporal features)")
+parser.add_argument("--window", type=float, default=10.0, help="Seconds per temporal window (as in the live assistant)")
+parser.add_argument("--sample-every", type=float, default=0.5, help="Seconds between temporal samples")
+args = parser.parse_args()
+
+entries = read_manifest(args.manifest)
+tasks = plan_tasks(entries, frames_per_task=args.frames_per_task, stride=args.stride)
+print(f"Planned {len(tasks)} tasks from {len(entries)} sources.")
+
+os.makedirs(args.output, exist_ok=True)
+summary = extract_dataset(tasks, args.output, workers=args.workers, keep_empty=args.keep_empty)
+X, y = merge_chunks(args.output)
+
+print(f"\n Processed {summary['frames']} frames in {summary['seconds']:.1f} s "
+      f"({summary['frames_per_second']:.1f} frames/s), kept {summary['kept']}.")
+print(f" Saved {len(X)} samples to: {os.path.abspath(args.output)}")
+
+if args.temporal:
+    # Windows are measured in seconds (frame index / fps), so --stride does not stretch them
+    X_t, y_t = build_temporal_dataset(args.output, fps=args.fps, window_seconds=args.window,
+                                      sample_seconds=args.sample_every, min_seconds=min(args.window, 1.0),
+                                      frame_stride=args.stride)
+    print(f" Saved {len(X_t)} temporal samples ({X_t.shape[1]} features) to: {os.path.abspath(args.output)}")
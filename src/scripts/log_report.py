@@ -0,0 +1,33 @@
+import argparse
+import time
+from src.utils.log_analytics import LogIndex
+
+# Summarizes the conversation logs: state transitions, style-change trigger rates and
+# turn latency. The index is updated incrementally, so repeated runs only parse new records.
+
+parser = argparse.ArgumentParser(description="Query the conversation log index.")
+parser.add_argument("--log", default="conversation_log.jsonl", help="Active JSONL log")
+parser.add_argument("--user", default=None, help="Restrict transitions and latency to one user")
+args = parser.parse_args()
+
+start = time.perf_counter()
+index = LogIndex(args.log).update()
+print(f"Indexed {len(index)} records from {len(index.segments)} rotated segments + active log "
+      f"in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+matrix, states = index.transition_matrix(args.user)
+print("\nState transitions between user turns (row: from, column: to):")
+print(" " * 12 + "".join(f"{s:>12}" for s in states))
+for state, row in zip(states, matrix):
+    print(f"{state:>12}" + "".join(f"{value:12.2f}" for value in row))
+
+print("\nStyle-change trigger rate per user and state:")
+for user, per_state in index.style_change_rates().items():
+    if args.user and user != args.user:
+        continue
+    for state, (triggers, turns, rate) in per_state.items():
+        print(f"  {user:<12} {state:<12} {triggers:>5}/{turns:<5} {rate * 100:5.1f}%")
+
+print("\nTurn latency (seconds):")
+for key, value in index.latency_distribution(args.user).items():
+    print(f"  {key:<6} {value:.2f}" if isinstance(value, float) else f"  {key:<6} {value}")
@@ -1,134 +1,350 @@
-import cv2
-import joblib
+import argparse
+import os
+import threading
 import time
-from src.utils.state_detection import extract_features
-from src.utils.memory import load_preference, update_preference
-from src.utils.response_generator import generate_response
-from src.utils.conversation_saving import log_conversation
+from concurrent.futures import Future
+from src.utils.startup import StartupTimer, Warmup
 
-# Load trained SVM model for cognitive state prediction
-model = joblib.load("svm_cognitive_state.joblib")
+# Startup is measured from here; heavy libraries (OpenCV, MediaPipe, scikit-learn, Gemini)
+# are only imported by the tasks that need them
+timer = StartupTimer()
 
-# Initialize webcam
-cap = cv2.VideoCapture(0)
+with timer.stage("core imports"):
+    from src.utils.memory import load_preference, update_preference
+    from src.utils.response_generator import STYLE_CHANGE_MARKER, ConsoleStreamer, generate_response, start_response, history, get_cache
+    from src.utils.conversation_saving import log_conversation
+    from src.utils.assistant_session import response_did_not_work, style_check
+    from src.utils.observation import AdaptiveObserver, observation_fields
+    from src.utils.personalization import Personalizer
+    from src.utils import tracing
 
-user_id = "user_1"
+parser = argparse.ArgumentParser(description="Adaptive Elderly Assistant (single user, webcam).")
+parser.add_argument("--user", default="user_1", help="User id for preferences, personalization and logs")
+args = parser.parse_args()
+
+user_id = args.user
 turn_id = 1
 
+# ASSISTANT_TEMPORAL_FEATURES=1 classifies windowed statistics of the feature stream (blink rate,
+# head motion, ...) with the model trained by `train_classifier.py --features temporal`
+temporal = os.getenv("ASSISTANT_TEMPORAL_FEATURES", "0") == "1"
+model_name = "svm_cognitive_state_temporal" if temporal else "svm_cognitive_state"
+registry_root = "models/temporal" if temporal else "models"
+
+# States are decided over confidence-gated observation windows (src/utils/observation.py);
+# ASSISTANT_OBSERVATION=fixed always waits the full 10 s and decides on the last frame
+adaptive_observation = os.getenv("ASSISTANT_OBSERVATION", "adaptive") != "fixed"
+
+def open_camera():
+    """
+    Opens the webcam; frames are grabbed continuously on a background thread.
+    """
+    import cv2
+    from src.utils.capture import FrameGrabber
+
+    return FrameGrabber(cv2.VideoCapture(0)).start()
+
+def build_extractor():
+    """
+    Builds the MediaPipe graphs once (reused for every observation) and runs a blank frame through them.
+    With ASSISTANT_ADAPTIVE_EXTRACTION=1, frames are processed adaptively (face crop, motion gating, Pose at a lower rate).
+    """
+    from src.utils.state_detection import AdaptiveFeatureExtractor, FeatureExtractor
+
+    if os.getenv("ASSISTANT_ADAPTIVE_EXTRACTION", "0") == "1":
+        return AdaptiveFeatureExtractor().warm_up()
+    return FeatureExtractor().warm_up()
+
+def build_classifier():
+    """
+    Loads the promoted model of the registry (or the legacy model files when nothing is promoted),
+    checks its feature schema and runs one prediction. A watcher picks up later promotions.
+
+    Returns:
+        tuple: (model, ModelWatcher)
+    """
+    import numpy as np
+    from src.utils.fast_predictor import load_classifier
+    from src.utils.feature_spec import check_model_schema, schema
+    from src.utils.model_registry import ModelRegistry, ModelWatcher
+    from src.utils.temporal_features import TEMPORAL_FEATURE_NAMES, temporal_schema
+
+    registry = ModelRegistry(registry_root)
+    expected_schema = temporal_schema() if temporal else schema()
+    version = registry.promoted()
+    if version is not None:
+        model, _ = registry.load(version, expected_schema)
+    else:
+        model = load_classifier(f"{model_name}.joblib", f"{model_name}.npz")
+        check_model_schema(model, TEMPORAL_FEATURE_NAMES if temporal else None)
+    model.predict(np.zeros((1, model.n_features_in_)))
+    return model, ModelWatcher(registry, expected_schema, current_version=version).start()
+
+warmup = Warmup(timer)
+warmup.add("camera", open_camera)
+warmup.add("feature extractor", build_extractor)
+warmup.add("classifier", build_classifier)
+warmup.start()
+
 print("\n--- Adaptive Elderly Assistant ---")
 print("Press 'q' in the webcam window to quit.")
-print("Type a message after each detection to interact.\n")
+print("Type a message to interact; you are observed while you type.\n")
+
+# Initial assistant greeting (neutral state), streamed while the models warm up
+streamer = ConsoleStreamer()
+with timer.stage("greeting (LLM)"):
+    generate_response(
+        state="attentive",
+        style="empathetic",
+        example="Hello, how are you feeling today?",
+        user_input="Please greet the user and ask if they would like to chat or do something together.",
+        on_token=streamer.write
+    )
+    streamer.finish()
+
+grabber = warmup.result("camera")
+extractor = warmup.result("feature extractor")
+model, model_watcher = warmup.result("classifier")
+personalizer = Personalizer(model, directory="user_models/temporal" if temporal else "user_models")
+import cv2  # already loaded by the camera warm-up
+
+# In temporal mode every camera frame goes through the extractor on a background thread
+stream = None
+if temporal:
+    from src.utils.temporal_features import TemporalFeatureStream
+    stream = TemporalFeatureStream(grabber, extractor).start()
+
+timer.report()
+
+# ASSISTANT_TRACING=1 records per-stage latencies, exported to metrics.jsonl and
+# http://127.0.0.1:9464/metrics, and drawn on the camera window
+exporters = tracing.start_exporters() if tracing.enabled() else None
+
+class QuitRequested(Exception):
+    pass
+
+def pump_window():
+    """
+    Shows the newest camera frame and polls the keyboard. Raises QuitRequested on 'q'.
+    """
+    _, frame = grabber.latest()
+    if frame is not None:
+        if tracing.enabled():
+            frame = tracing.draw_overlay(frame.copy())
+        cv2.imshow("Adaptive Elderly Assistant", frame)
+    if cv2.waitKey(30) & 0xFF == ord('q'):
+        raise QuitRequested()
+
+def run_in_background(fn, *args, **kwargs):
+    """
+    Runs fn on a daemon thread and returns a Future with its result.
+    Daemon threads let the assistant quit even while input() is still waiting.
+    """
+    future = Future()
+    def target():
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+    threading.Thread(target=target, daemon=True).start()
+    return future
 
-def response_did_not_work(before, after):
+def wait_for(future):
     """
-    Heuristic to detect if the response failed to improve or maintain the user's state.
+    Keeps the camera window responsive until the background task completes.
     """
-    if before == "attentive" and after in ["confused", "distracted"]:
-        return True
-    elif before != after and after in ["confused", "distracted"]:
-        return True
-    elif before == after and before in ["confused", "distracted"]:
-        return True
+    while not future.done():
+        pump_window()
+    return future.result()
+
+def ask(prompt):
+    """
+    Non-blocking replacement for input(): the camera keeps being observed while the user types.
+    """
+    return wait_for(run_in_background(input, prompt))
+
+def classify(frame, context, observe=True):
+    """
+    Extracts features from a frame and predicts the cognitive state with the user's adapter.
+    In temporal mode the frame is ignored and the current window statistics are classified.
+
+    Args:
+        observe (bool): Add the features to the adapter's running statistics.
+
+    Returns:
+        tuple: (state, features, probabilities)
+    """
+    if stream is not None:
+        from src.utils.temporal_features import TEMPORAL_FEATURE_NAMES
+        features, feature_names = stream.vector(), TEMPORAL_FEATURE_NAMES
     else:
-        return False
-
-# Initial assistant greeting (neutral state)
-initial_response = generate_response(
-    state="attentive",
-    style="empathetic",
-    example="Hello, how are you feeling today?",
-    user_input="Please greet the user and ask if they would like to chat or do something together."
-)
-print(f"\nAssistant: {initial_response}")
-
-while True:
-    for i in range(3, 0, -1):
-        print(f" Observing your reaction in {i}...")
-        time.sleep(1)
-
-    ret, frame = cap.read()
-    if not ret:
-        break
-
-    # Extract features from current frame
-    features, feature_names = extract_features(frame)
+        with tracing.span("extract"):
+            features, feature_names = extractor.process(frame)
     try:
-        state = model.predict([features])[0]
+        state, proba = personalizer.predict(user_id, features, observe=observe)
+        return state, features, proba
     except ValueError as e:
-        print("\n Prediction failed due to shape mismatch.")
+        print(f"\n {context} prediction failed due to shape mismatch.")
         print(f"Expected {model.n_features_in_} features but got {len(features)}.\n")
         print(" Feature breakdown:")
         for name, value in zip(feature_names, features):
             print(f" - {name}: {value:.4f}")
         raise e
 
-    style, example = load_preference(user_id, state)
+def next_evidence(last):
+    """
+    Returns the timestamp and frame of evidence newer than `last`, or (None, None). In temporal
+    mode that is a new update of the feature stream (the frame is not needed); otherwise a new
+    camera frame.
+    """
+    if stream is not None:
+        timestamp = stream.latest_timestamp
+        return (timestamp, None) if timestamp is not None and (last is None or timestamp > last) else (None, None)
+    timestamp, frame = grabber.latest()
+    return (timestamp, frame) if frame is not None and (last is None or timestamp > last) else (None, None)
 
-    print(f"\nDetected state: [{state.upper()}] (style: {style})")
+def observe_state(observer, context, buffered=()):
+    """
+    Classifies the buffered frames, then every new camera frame, until the observer's window
+    closes; the camera window stays live meanwhile.
 
-    user_input = input("You: ").strip()
+    In temporal mode the buffered frames are already part of the window statistics, so only new
+    updates of the feature stream count as evidence, and the overlapping window vectors are
+    added to the adapter's statistics once per observation instead of at every update.
 
-    response = generate_response(state, style, example, user_input=user_input)
+    Returns:
+        tuple: (Observation or None if no frame was seen, features of the last classified frame)
+    """
+    observer.start(time.monotonic())
+    features, last = None, None
+    for timestamp, frame in (buffered if stream is None else ()):
+        _, features, proba = classify(frame, context)
+        last = timestamp
+        if observer.update(proba, time.monotonic()):
+            break
+    while not observer.done(time.monotonic()):
+        pump_window()
+        timestamp, frame = next_evidence(last)
+        if timestamp is None:
+            continue
+        last = timestamp
+        _, features, proba = classify(frame, context, observe=stream is None)
+        observer.update(proba, time.monotonic())
+    if stream is not None and features is not None:
+        personalizer.adapter(user_id).observe(features)
+    observation = observer.result()
+    if observation is not None:
+        tracing.observe(f"observation_{context.lower().replace('-', '_')}", observation.seconds)
+    return observation, features
 
-    style_requested = "[STYLE_CHANGE_REQUESTED]" in response
-    response = response.replace("[STYLE_CHANGE_REQUESTED]", "")
+def pre_response_observer():
+    # Frames of the last second before Enter are already buffered; a short extension is allowed
+    if adaptive_observation:
+        return AdaptiveObserver(personalizer.classes, min_seconds=0.0, max_seconds=1.5, min_frames=3)
+    return AdaptiveObserver(personalizer.classes, alpha=1.0, threshold=0.0, min_seconds=0.0, max_seconds=0.0, min_frames=1)
 
-    print(f"Assistant: {response}")
+def post_response_observer():
+    if adaptive_observation:
+        return AdaptiveObserver(personalizer.classes, min_seconds=1.0, max_seconds=12.0, min_frames=5)
+    # No smoothing and no early close: the state of the last frame after 10 s
+    return AdaptiveObserver(personalizer.classes, alpha=1.0, threshold=0.0, min_seconds=10.0, max_seconds=10.0, min_frames=1)
+
+def apply_model_update():
+    """
+    Switches to a newly promoted model version, if the watcher has loaded one. Called between
+    turns; the camera keeps running meanwhile.
+    """
+    global model
+    update = model_watcher.swap()
+    if update is not None:
+        model, meta = update
+        personalizer.set_base_model(model)
+        print(f"\n Switched to model {meta['version']} (loaded in {meta['load_seconds'] * 1000:.0f} ms, "
+              f"test accuracy {meta['metrics'].get('test_accuracy', float('nan')):.3f})")
 
-    log_conversation(state, user_input, response, user_id, turn_id)
+def log_record(state, user_input, response, extra=None):
+    """
+    Writes one conversation record under the next turn id.
+    """
+    global turn_id
+    log_conversation(state, user_input, response, user_id, turn_id, extra=extra)
     turn_id += 1
 
-    if not style_requested:
-        for i in range(10, 0, -1):
-            print(f" Observing your reaction in {i}...")
-            time.sleep(1)
+def respond(state, style, example, user_input):
+    """
+    Streams a reply to the console while the camera window stays live.
+    """
+    response = wait_for(start_response(state, style, example, user_input=user_input, on_token=streamer.write))
+    streamer.finish()
+    return response.strip()
+
+def run_turns():
+    while grabber.running:
+        apply_model_update()
 
-        ret, post_frame = cap.read()
-        post_features, feature_names = extract_features(post_frame)
-        try:
-            post_state = model.predict([post_features])[0]
-        except ValueError as e:
-            print("\n Post-response prediction failed.")
-            print(f"Expected {model.n_features_in_} features but got {len(post_features)}.\n")
-            print(" Feature breakdown:")
-            for name, value in zip(feature_names, post_features):
-                print(f" - {name}: {value:.4f}")
-            raise e
-
-        print(f" Observed post-response state: [{post_state.upper()}]")
-
-    if response_did_not_work(state, post_state) or style_requested:
-        assistant_question = f"You seem {post_state}. Would you like to try a different explanation style for when you are {state}?"
-        print(f"\n Assistant: {assistant_question}")
-        log_conversation(post_state, "System trigger", assistant_question, user_id, turn_id)
-        turn_id += 1
-
-        confirm = input("Change style? (yes/no): ").strip().lower()
-        log_conversation(post_state, "User", f"Change style? → {confirm}", user_id, turn_id)
-        turn_id += 1
-
-        if confirm == "yes":
-            new_style = input(f"Enter a new preferred style for when you are {state} (e.g., calm, motivational, step-by-step): ").strip()
-            new_example = input("Give an example response in that style: ").strip()
-            update_preference(user_id, state, new_style, new_example)
-            print("Preferences updated.")
-
-            style_change_input = f"[User updated preferred style to '{new_style}' for state '{state}']"
-            assistant_ack = "Preferences updated and stored. I'll use this style from now on when you seem like that."
-            log_conversation(state, style_change_input, assistant_ack, user_id, turn_id)
-            turn_id += 1
-        else:
-            new_style, new_example = style, example
-
-        response = generate_response(post_state, new_style, new_example, user_input="Continue the conversation.")
-        print(f"Assistant: {response}")
-        log_conversation(post_state, "System trigger after style check", response, user_id, turn_id)
-        turn_id += 1
-
-        continue
-
-    if cv2.waitKey(1) & 0xFF == ord('q'):
-        break
-
-cap.release()
-cv2.destroyAllWindows()
+        # The user is observed while typing; the state comes from the last frame before Enter
+        user_input = ask("You: ").strip()
+        _, frame = grabber.buffer.wait_for_frame(timeout=2.0)
+        if frame is None:
+            break
+
+        buffered = grabber.last_seconds(1.0)[-5:] if adaptive_observation else [grabber.latest()]
+        observation, _ = observe_state(pre_response_observer(), "Pre-response", buffered)
+        if observation is None:
+            break
+        # The pre-response window is recorded separately (observation_pre_response)
+        turn_start = time.perf_counter()
+        state = observation.state
+        style, example = load_preference(user_id, state)
+
+        print(f"\nDetected state: [{state.upper()}] (style: {style}, confidence {observation.confidence:.2f})")
+
+        # The reply is printed as it streams in while the camera window stays live
+        response = wait_for(start_response(state, style, example, user_input=user_input, on_token=streamer.write))
+        streamer.finish()
+
+        style_requested = STYLE_CHANGE_MARKER in response
+        response = response.replace(STYLE_CHANGE_MARKER, "").strip()
+
+        # From the decided state to the full reply (excludes both observation windows)
+        tracing.observe("turn", time.perf_counter() - turn_start)
+
+        post_state, post_features, post_observation = state, None, None
+        if not style_requested:
+            print(" Observing your reaction...")
+            post_observation, post_features = observe_state(post_response_observer(), "Post-response")
+            if post_observation is None:
+                # No frame arrived during the window: keep the pre-response state, log post as None
+                print(" No camera frames during the observation; keeping the detected state.")
+            else:
+                post_state = post_observation.state
+                print(f" Observed post-response state: [{post_state.upper()}] "
+                      f"(confidence {post_observation.confidence:.2f} after {post_observation.seconds:.1f} s)")
+
+        # Logged once both states behind the style check are known, with how they were decided
+        log_record(state, user_input, response, extra=observation_fields(observation, post_observation))
+
+        if response_did_not_work(state, post_state) or style_requested:
+            style_check(
+                state, post_state, style, example, ask=ask, say=lambda text: print(f"\n Assistant: {text}"),
+                log=log_record, respond=respond,
+                update_preference=lambda *preference: update_preference(user_id, *preference),
+                personalizer=personalizer, user_id=user_id, post_features=post_features,
+            )
+
+try:
+    run_turns()
+except QuitRequested:
+    print("\n Quitting.")
+finally:
+    history.report()
+    if get_cache() is not None:
+        get_cache().report()
+    if exporters is not None:
+        exporters.close()
+    model_watcher.stop()
+    if stream is not None:
+        stream.stop()
+    grabber.stop()
+    extractor.close()
+    cv2.destroyAllWindows()
@@ -0,0 +1,54 @@
+import argparse
+import json
+import os
+import time
+from src.utils.feature_spec import schema
+from src.utils.model_registry import ModelRegistry
+from src.utils.temporal_features import temporal_schema
+
+# Management of the model registry (see src/utils/model_registry.py):
+#   list      versions with creation time, data hash and test accuracy (* marks the promoted one)
+#   show      full metadata of a version
+#   promote   make a version the one running assistants switch to
+#   import    register a model file trained before the registry existed
+#   load      time loading a version (schema check included)
+
+parser = argparse.ArgumentParser(description="Inspect and manage the model registry.")
+parser.add_argument("command", choices=["list", "show", "promote", "import", "load"])
+parser.add_argument("version", nargs="?", help="Version for show / promote / load (default: the promoted one)")
+parser.add_argument("--registry", default="models", help="Registry directory")
+parser.add_argument("--model", default="svm_cognitive_state.joblib", help="Model file to import")
+parser.add_argument("--features", choices=["snapshot", "temporal"],
+                    help="Feature schema for import / load (default: temporal for models/temporal, else snapshot)")
+args = parser.parse_args()
+if args.features is None:
+    args.features = "temporal" if os.path.basename(os.path.normpath(args.registry)) == "temporal" else "snapshot"
+expected_schema = temporal_schema() if args.features == "temporal" else schema()
+
+registry = ModelRegistry(args.registry)
+promoted = registry.promoted()
+
+if args.command == "list":
+    print(f"Registry '{args.registry}':")
+    for version in registry.versions():
+        meta = registry.meta(version)
+        accuracy = meta["metrics"].get("test_accuracy")
+        print(f" {'*' if version == promoted else ' '} {version}  {meta['created_at']}  "
+              f"data {str(meta['data_hash'])[:12]}  test acc {accuracy if accuracy is None else f'{accuracy:.3f}'}  "
+              f"{len(meta['schema']['feature_names'])} features")
+elif args.command == "show":
+    print(json.dumps(registry.meta(args.version or promoted), indent=2))
+elif args.command == "promote":
+    if not args.version:
+        parser.error("promote requires a version")
+    registry.promote(args.version)
+    print(f" Promoted {args.version} (was {promoted or 'none'}).")
+elif args.command == "import":
+    import joblib
+
+    version = registry.register(joblib.load(args.model), expected_schema, params={"imported_from": args.model})
+    print(f" Imported '{args.model}' as {version}; run `promote {version}` to use it.")
+elif args.command == "load":
+    start = time.perf_counter()
+    model, meta = registry.load(args.version, expected_schema)
+    print(f" Loaded {meta['version']} ({type(model).__name__}) in {(time.perf_counter() - start) * 1000:.1f} ms.")
@@ -0,0 +1,115 @@
+import argparse
+import threading
+import time
+import numpy as np
+from src.utils.assistant_session import AssistantSession, ScriptedUser
+from src.utils.fast_predictor import load_classifier
+from src.utils.feature_spec import check_model_schema
+from src.utils.frame_sources import open_source
+from src.utils.inference import BatchedPredictor, ExtractionPool
+from src.utils.llm_backends import create_backend
+from src.utils.personalization import Personalizer
+from src.utils.response_generator import ResponseGenerator, StreamingClient
+
+# Runs many assistant sessions concurrently (one thread each) against shared workers:
+# a feature extraction process pool, one micro-batching classifier and one LLM client.
+# Users are scripted, so the server can be load-tested at increasing session counts; for each
+# count it reports throughput and per-session latency percentiles.
+#
+#   ipython src/scripts/session_server.py -- --sessions 1 4 16 --turns 3 --source synthetic
+
+MESSAGES = [
+    "Good morning! I slept well today.",
+    "Can you remind me what we talked about yesterday?",
+    "I don't understand, can you say that again?",
+    "Maybe we could play a word game.",
+    "I'm a bit tired, but let's continue.",
+]
+
+parser = argparse.ArgumentParser(description="Run concurrent assistant sessions and report throughput and latency.")
+parser.add_argument("--sessions", type=int, nargs="+", default=[1, 4, 16], help="Session counts to run, one after the other")
+parser.add_argument("--turns", type=int, default=3, help="Turns per session")
+parser.add_argument("--source", default="synthetic", help="Frame source per session: synthetic[:fps], video:<path> or webcam[:index]")
+parser.add_argument("--workers", type=int, default=None, help="Feature extraction processes (default: CPU count)")
+parser.add_argument("--backend", default="local", help="LLM backend shared by all sessions")
+parser.add_argument("--observe", type=float, default=1.0, help="Seconds each reply's effect is observed")
+parser.add_argument("--max-batch", type=int, default=64)
+parser.add_argument("--max-wait", type=float, default=0.005, help="Seconds a classifier request waits for a batch")
+parser.add_argument("--log", action="store_true", help="Write the sessions to the conversation log")
+args = parser.parse_args()
+
+model = load_classifier("svm_cognitive_state.joblib", "svm_cognitive_state.npz")
+check_model_schema(model)
+
+print(f"Starting {args.workers or 'one per CPU'} extraction workers...")
+start = time.perf_counter()
+pool = ExtractionPool(args.workers).warm_up()
+print(f" Workers ready in {time.perf_counter() - start:.1f} s")
+predictor = BatchedPredictor(model, max_batch=args.max_batch, max_wait=args.max_wait)
+client = StreamingClient(create_backend(args.backend))
+personalizer = Personalizer(model)
+
+
+def run_session(session, user, errors):
+    try:
+        for _ in range(args.turns):
+            session.run_turn(user.next_message(), ask=user.ask)
+    except Exception as e:
+        errors.append((session.session_id, e))
+
+
+def percentile(values, p):
+    return float(np.percentile(values, p)) if len(values) else float("nan")
+
+
+rows = []
+try:
+    for n_sessions in args.sessions:
+        sessions = [
+            AssistantSession(
+                f"s{n_sessions}-{i}", f"resident_{i}", open_source(args.source), pool, predictor,
+                generator=ResponseGenerator(client=client), personalizer=personalizer,
+                observe_seconds=args.observe, log=args.log,
+            )
+            for i in range(n_sessions)
+        ]
+        users = [ScriptedUser(MESSAGES[i % len(MESSAGES):] + MESSAGES[:i % len(MESSAGES)]) for i in range(n_sessions)]
+        predictor.batch_sizes = []
+        errors = []
+
+        start = time.perf_counter()
+        threads = [threading.Thread(target=run_session, args=(s, u, errors)) for s, u in zip(sessions, users)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - start
+
+        for session in sessions:
+            session.close()
+        for session_id, error in errors:
+            print(f" Session {session_id} failed: {type(error).__name__}: {error}")
+
+        timings = [t for s in sessions for t in s.timings]
+        column = lambda name: [t[name] for t in timings if name in t]
+        rows.append({
+            "sessions": n_sessions,
+            "turns": len(timings),
+            "turns_per_s": len(timings) / wall,
+            "response_p50": percentile(column("response"), 50),
+            "response_p95": percentile(column("response"), 95),
+            "extract_p95": percentile(column("extract") + column("extract_post"), 95),
+            "classify_p95": percentile(column("classify") + column("classify_post"), 95),
+            "mean_batch": float(np.mean(predictor.batch_sizes)) if predictor.batch_sizes else 0.0,
+        })
+        print(f" {n_sessions} sessions: {len(timings)} turns in {wall:.1f} s")
+finally:
+    predictor.close()
+    pool.close()
+    client.close()
+
+print(f"\nThroughput and latency (observe window {args.observe:.1f} s, ms unless noted):")
+print(f"  {'sessions':>8} {'turns':>6} {'turns/s':>8} {'resp p50':>9} {'resp p95':>9} {'extract p95':>12} {'classify p95':>13} {'batch':>6}")
+for r in rows:
+    print(f"  {r['sessions']:>8} {r['turns']:>6} {r['turns_per_s']:>8.2f} {r['response_p50'] * 1000:>9.1f} "
+          f"{r['response_p95'] * 1000:>9.1f} {r['extract_p95'] * 1000:>12.1f} {r['classify_p95'] * 1000:>13.1f} {r['mean_batch']:>6.1f}")
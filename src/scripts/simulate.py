@@ -0,0 +1,175 @@
+import argparse
+import json
+import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+# Replays logged conversations through the assistant loop (AssistantSession) faster than real
+# time and in parallel, for regression runs without a webcam, a person at the keyboard or an
+# API key:
+#   - every session runs on its own SimulatedClock, so observation windows take no time;
+#   - user messages, states and style-check answers come from conversation_log.jsonl;
+#   - frames are feature vectors of the logged state drawn from a labeled dataset (or frames of
+#     a recorded video, processed by MediaPipe workers);
+#   - replies come from the offline LocalBackend.
+# Logs and preferences are written to the output directory; the real ones are never touched.
+#
+#   ipython src/scripts/simulate.py -- --sessions 200 --parallel 8
+
+parser = argparse.ArgumentParser(description="Replay logged conversations through the assistant loop on a simulated clock.")
+parser.add_argument("--log", default="conversation_log.jsonl", help="Conversation log to replay")
+parser.add_argument("--sessions", type=int, default=None, help="Sessions to simulate (default: one per logged session; scripts are cycled)")
+parser.add_argument("--source", default="synthetic", help="'synthetic' (dataset feature vectors) or video:<path>")
+parser.add_argument("--data", default="dataset_1", help="Labeled dataset for the synthetic source")
+parser.add_argument("--model", default="svm_cognitive_state.joblib")
+parser.add_argument("--compiled", default="svm_cognitive_state.npz")
+parser.add_argument("--memory", default="user_memory.json", help="Preferences the simulated users start from")
+parser.add_argument("--observe", type=float, default=10.0, help="Simulated seconds each reply's effect is observed (fixed window)")
+parser.add_argument("--adaptive", action="store_true", help="Confidence-gated observation windows instead of the fixed one")
+parser.add_argument("--threshold", type=float, default=0.8, help="Smoothed probability that closes an adaptive window")
+parser.add_argument("--max-observe", type=float, default=12.0, help="Cap of an adaptive window (simulated seconds)")
+parser.add_argument("--think", type=float, default=5.0, help="Simulated seconds the user types before each message")
+parser.add_argument("--parallel", type=int, default=os.cpu_count(), help="Sessions running at the same time")
+parser.add_argument("--workers", type=int, default=None, help="Feature extraction processes (video source)")
+parser.add_argument("--output", default="simulation", help="Directory for the simulated logs, preferences and summary")
+parser.add_argument("--seed", type=int, default=0)
+args = parser.parse_args()
+
+# Replies must come from the offline backend, not from the response cache
+os.environ["ASSISTANT_RESPONSE_CACHE"] = "off"
+
+from src.utils.assistant_session import AssistantSession
+from src.utils.conversation_saving import LogWriter
+from src.utils.dataset_store import load_dataset
+from src.utils.fast_predictor import load_classifier
+from src.utils.feature_spec import check_model_schema
+from src.utils.inference import BatchedPredictor
+from src.utils.llm_backends import LocalBackend
+from src.utils.memory import JSONPreferenceStore
+from src.utils.observation import AdaptiveObserver
+from src.utils.response_generator import ResponseGenerator, StreamingClient
+from src.utils.simulation import FeaturePassthrough, ReplayUser, SimulatedClock, SyntheticFeatureFrames, VideoFrames, load_scripts
+
+scripts = load_scripts(args.log)
+if not scripts:
+    raise SystemExit(f"No user turns found in '{args.log}'.")
+n_sessions = args.sessions or len(scripts)
+print(f"Loaded {len(scripts)} logged sessions ({sum(len(turns) for _, turns in scripts)} user turns); simulating {n_sessions}.")
+
+model = load_classifier(args.model, args.compiled)
+check_model_schema(model)
+predictor = BatchedPredictor(model)
+client = StreamingClient(LocalBackend())
+
+os.makedirs(args.output, exist_ok=True)
+memory_path = os.path.join(args.output, "user_memory.json")
+if os.path.exists(args.memory):
+    shutil.copy(args.memory, memory_path)
+preferences = JSONPreferenceStore(memory_path)
+log_path = os.path.join(args.output, "conversation_log.jsonl")
+if os.path.exists(log_path):
+    os.remove(log_path)
+writer = LogWriter(log_path, jsonl_only=True)
+
+pool = None
+if args.source == "synthetic":
+    X, y = load_dataset(args.data)
+    X, y = np.asarray(X), np.asarray(y)
+    extraction = FeaturePassthrough()
+    make_frames = lambda clock, i: SyntheticFeatureFrames(clock, X, y, seed=args.seed + i)
+elif args.source.startswith("video:"):
+    from src.utils.inference import ExtractionPool
+    from src.utils.state_detection import iter_video_frames
+
+    video_frames = list(iter_video_frames(args.source.split(":", 1)[1]))
+    pool = extraction = ExtractionPool(args.workers).warm_up(*video_frames[0].shape[:2])
+    make_frames = lambda clock, i: VideoFrames(clock, video_frames)
+else:
+    raise SystemExit(f"Unknown source '{args.source}' (use synthetic or video:<path>).")
+
+
+def simulate(i):
+    """
+    Runs one logged session on a simulated clock.
+
+    Returns:
+        dict: Per-session counts and simulated vs. wall-clock seconds.
+    """
+    user_id, turns = scripts[i % len(scripts)]
+    clock = SimulatedClock()
+    frames = make_frames(clock, i)
+    session = AssistantSession(
+        f"sim-{i}", f"{user_id}_sim{i}", None, extraction, predictor,
+        generator=ResponseGenerator(client=client), observe_seconds=args.observe,
+        clock=clock, frames=frames, preferences=preferences, log_writer=writer,
+        observer=(lambda: AdaptiveObserver(predictor.classes, threshold=args.threshold, max_seconds=args.max_observe))
+        if args.adaptive else None,
+    )
+    user = ReplayUser()
+    start = time.perf_counter()
+    try:
+        for turn in turns:
+            clock.advance(args.think)
+            frames.show(turn.state, then=turn.post_state)
+            user.turn = turn
+            session.run_turn(turn.message, ask=user.ask)
+    finally:
+        session.close()
+
+    pairs = list(zip(turns, session.states))
+    return {
+        "session": session.session_id,
+        "turns": len(pairs),
+        "state_matches": sum(turn.state == state for turn, (state, _) in pairs),
+        "post_state_matches": sum(turn.post_state == post for turn, (_, post) in pairs),
+        "observe_seconds": [t["observe"] for t in session.timings if "observe" in t],
+        "logged_style_checks": sum(turn.style_check for turn in turns),
+        "style_checks": user.style_checks,
+        "simulated_seconds": clock.time(),
+        "wall_seconds": time.perf_counter() - start,
+    }
+
+
+start = time.perf_counter()
+try:
+    with ThreadPoolExecutor(max_workers=args.parallel) as executor:
+        results = list(executor.map(simulate, range(n_sessions)))
+finally:
+    wall = time.perf_counter() - start
+    writer.close()
+    preferences.close()
+    predictor.close()
+    client.close()
+    if pool is not None:
+        pool.close()
+
+total = lambda key: sum(r[key] for r in results)
+simulated = total("simulated_seconds")
+observed = [seconds for r in results for seconds in r["observe_seconds"]]
+summary = {
+    "sessions": len(results),
+    "turns": total("turns"),
+    "wall_seconds": wall,
+    "simulated_seconds": simulated,
+    "speedup": simulated / wall if wall else float("inf"),
+    "turns_per_second": total("turns") / wall if wall else float("inf"),
+    "state_accuracy": total("state_matches") / max(total("turns"), 1),
+    "post_state_accuracy": total("post_state_matches") / max(total("turns"), 1),
+    "mean_observe_seconds": float(np.mean(observed)) if observed else 0.0,
+    "logged_style_checks": total("logged_style_checks"),
+    "style_checks": total("style_checks"),
+    "sessions_detail": results,
+}
+with open(os.path.join(args.output, "summary.json"), "w") as f:
+    json.dump(summary, f, indent=2)
+
+print(f"\n Simulated {summary['sessions']} sessions / {summary['turns']} turns in {wall:.2f} s "
+      f"({simulated / 60:.1f} simulated minutes, {summary['speedup']:.0f}x real time, {summary['turns_per_second']:.1f} turns/s)")
+print(f" Detected state matched the logged state in {summary['state_accuracy']:.1%} of turns "
+      f"(post-response: {summary['post_state_accuracy']:.1%})")
+print(f" Mean post-response observation: {summary['mean_observe_seconds']:.2f} simulated s"
+      + (" (adaptive)" if args.adaptive else " (fixed)"))
+print(f" Style checks: {summary['style_checks']} simulated vs. {summary['logged_style_checks']} in the log")
+print(f" Logs, preferences and summary written to: {os.path.abspath(args.output)}")
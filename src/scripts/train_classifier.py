@@ -1,17 +1,68 @@
+import argparse
+import os
+import time
 import numpy as np
 from sklearn.svm import SVC
-from sklearn.model_selection import train_test_split, GridSearchCV, StratifiedKFold
-from sklearn.metrics import classification_report, confusion_matrix
+from sklearn.model_selection import train_test_split, GridSearchCV, RandomizedSearchCV, StratifiedKFold
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401 (enables HalvingGridSearchCV)
+from sklearn.model_selection import HalvingGridSearchCV
+from sklearn.kernel_approximation import Nystroem, RBFSampler
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline
+from sklearn.metrics import accuracy_score, classification_report
+from scipy.stats import loguniform
 from collections import Counter
 import joblib
+from src.utils.feature_spec import FEATURE_NAMES, schema
+from src.utils.fast_predictor import export_predictor
+from src.utils.dataset_store import DatasetStore, is_dataset_store, load_dataset
+from src.utils.evaluation import file_hash
+from src.utils.model_registry import ModelRegistry
+from src.utils.temporal_features import TEMPORAL_FEATURE_NAMES, temporal_schema
+
+# Training modes:
+#   grid     exhaustive search over C and gamma; the RBF kernel matrix is computed once per
+#            gamma from cached pairwise distances and shared by every C and every CV fold
+#   halving  successive halving over the same grid (weak candidates get fewer samples)
+#   random   randomized search over log-uniform C and gamma
+#   approx   Nystroem / random Fourier features + logistic regression, for datasets too
+#            large for an exact SVC
+# Candidates are fitted without probability=True; Platt calibration runs only once, on the
+# final refit of the best SVC.
+
+parser = argparse.ArgumentParser(description="Train the cognitive state classifier.")
+parser.add_argument("--data", default="dataset_1", help="Dataset store, or directory with labeled_features.npy and labels.npy")
+parser.add_argument("--user", help="Only train on samples of this user (dataset stores only)")
+parser.add_argument("--session", help="Only train on samples of this session (dataset stores only)")
+parser.add_argument("--mode", default="grid", choices=["grid", "halving", "random", "approx", "all"])
+parser.add_argument("--n-iter", type=int, default=16, help="Candidates for random search")
+parser.add_argument("--cache-size", type=float, default=500, help="libsvm kernel cache size (MB)")
+parser.add_argument("--features", default="snapshot", choices=["snapshot", "temporal"],
+                    help="Per-frame features, or windowed statistics (temporal_features.npy from extract_offline.py --temporal)")
+parser.add_argument("--output", help="Model path (default: svm_cognitive_state.joblib, or svm_cognitive_state_temporal.joblib)")
+parser.add_argument("--register", action="store_true", help="Also store the model as a new registry version")
+parser.add_argument("--promote", action="store_true", help="Register the model and promote it (running assistants switch to it)")
+parser.add_argument("--registry", help="Registry directory (default: models, or models/temporal)")
+args = parser.parse_args()
+if args.features == "temporal" and (args.user or args.session):
+    # temporal_features.npy carries no user/session groups, so the filter could not be applied
+    parser.error("--user and --session are not supported with --features temporal")
+if args.output is None:
+    args.output = "svm_cognitive_state_temporal.joblib" if args.features == "temporal" else "svm_cognitive_state.joblib"
 
 # Load feature and label data
-X = np.load("dataset_1/labeled_features.npy")
-y = np.load("dataset_1/labels.npy")
+if args.features == "temporal":
+    X, y = np.load(f"{args.data}/temporal_features.npy"), np.load(f"{args.data}/temporal_labels.npy")
+    feature_names = TEMPORAL_FEATURE_NAMES
+else:
+    X, y = load_dataset(args.data, user_id=args.user, session_id=args.session)
+    feature_names = FEATURE_NAMES
 
 # Check basic info
 print(f"Loaded {len(X)} samples with {X.shape[1]} features each.")
 print(f"Classes: {set(y)}")
+if X.shape[1] != len(feature_names):
+    raise ValueError(f"Dataset has {X.shape[1]} features but the feature spec defines {len(feature_names)}: {feature_names}")
 
 # Split dataset with stratification
 X_train, X_test, y_train, y_test = train_test_split(
@@ -31,21 +82,140 @@ param_grid = {
 # Setup stratified 5-fold cross-validation
 cv = StratifiedKFold(n_splits=5, shuffle=True, random_state=42)
 
-# Grid search
-print("\n Starting Grid Search...")
-grid_search = GridSearchCV(
-    SVC(kernel="rbf", probability=True),
-    param_grid,
-    cv=cv,
-    scoring="accuracy",
-    n_jobs=-1
-)
-grid_search.fit(X_train, y_train)
 
-# Best model from grid search
-model = grid_search.best_estimator_
-print("\n Best parameters:", grid_search.best_params_)
+def resolve_gamma(gamma, X):
+    # Same definition as sklearn's gamma="scale"
+    return 1.0 / (X.shape[1] * X.var()) if gamma == "scale" else gamma
+
+
+def search_grid_cached_kernel(X, y):
+    """
+    Grid search over C and gamma where each RBF kernel matrix is computed once per gamma
+    (from pairwise squared distances computed once) and reused for all C values and folds.
+    """
+    sq_norms = np.einsum("ij,ij->i", X, X)
+    sq_dist = np.maximum(sq_norms[:, None] - 2 * X @ X.T + sq_norms[None, :], 0)
+
+    best = (-np.inf, None)
+    for gamma in param_grid["gamma"]:
+        kernel = np.exp(-resolve_gamma(gamma, X) * sq_dist)
+        search = GridSearchCV(
+            SVC(kernel="precomputed"), {"C": param_grid["C"]},
+            cv=cv, scoring="accuracy", n_jobs=-1
+        )
+        search.fit(kernel, y)
+        if search.best_score_ > best[0]:
+            best = (search.best_score_, {"C": search.best_params_["C"], "gamma": gamma})
+    return best[1], best[0]
+
+
+def search_halving(X, y):
+    search = HalvingGridSearchCV(
+        SVC(kernel="rbf", cache_size=args.cache_size), param_grid,
+        cv=cv, scoring="accuracy", factor=3, random_state=42, n_jobs=-1
+    )
+    search.fit(X, y)
+    return search.best_params_, search.best_score_
+
+
+def search_random(X, y):
+    search = RandomizedSearchCV(
+        SVC(kernel="rbf", cache_size=args.cache_size),
+        {"C": loguniform(1e-1, 1e3), "gamma": loguniform(1e-3, 1e1)},
+        n_iter=args.n_iter, cv=cv, scoring="accuracy", random_state=42, n_jobs=-1
+    )
+    search.fit(X, y)
+    return search.best_params_, search.best_score_
+
+
+def train_approx(X, y):
+    """
+    Approximate RBF kernel (Nystroem or random Fourier features) followed by a linear model.
+    Training cost grows linearly with the number of samples.
+    """
+    n_components = min(300, len(X))
+    pipeline = Pipeline([
+        ("features", Nystroem(kernel="rbf", n_components=n_components, random_state=42)),
+        ("linear", LogisticRegression(max_iter=2000)),
+    ])
+    search = GridSearchCV(
+        pipeline,
+        {
+            "features": [
+                Nystroem(kernel="rbf", n_components=n_components, random_state=42),
+                RBFSampler(n_components=n_components, random_state=42),
+            ],
+            "features__gamma": [resolve_gamma("scale", X), 0.1, 1],
+            "linear__C": [1, 10, 100],
+        },
+        cv=cv, scoring="accuracy", n_jobs=-1
+    )
+    search.fit(X, y)
+    return search.best_estimator_, search.best_params_, search.best_score_
+
+
+def refit_calibrated_svc(params, X, y):
+    # Platt scaling (probability=True) is only paid here, once
+    model = SVC(kernel="rbf", probability=True, cache_size=args.cache_size, C=params["C"], gamma=params["gamma"])
+    return model.fit(X, y)
+
+
+searches = {"grid": search_grid_cached_kernel, "halving": search_halving, "random": search_random}
+modes = ["grid", "halving", "random", "approx"] if args.mode == "all" else [args.mode]
+results = []
+
+for mode in modes:
+    print(f"\n Training mode: {mode}...")
+    start = time.perf_counter()
+    if mode == "approx":
+        model, params, cv_score = train_approx(X_train, y_train)
+        params = {k: v for k, v in params.items() if k != "features"} | {"features": type(params["features"]).__name__}
+    else:
+        params, cv_score = searches[mode](X_train, y_train)
+        model = refit_calibrated_svc(params, X_train, y_train)
+    wall_time = time.perf_counter() - start
+    accuracy = accuracy_score(y_test, model.predict(X_test))
+    results.append({"mode": mode, "model": model, "params": params, "cv": cv_score, "test": accuracy, "time": wall_time})
+    print(f" Best parameters: {params}")
+    print(f" CV accuracy: {cv_score:.3f}  test accuracy: {accuracy:.3f}  wall time: {wall_time:.2f} s")
+
+print("\n Summary:")
+print(f"  {'mode':<8} {'wall time (s)':>14} {'CV acc':>8} {'test acc':>9}")
+for r in results:
+    print(f"  {r['mode']:<8} {r['time']:>14.2f} {r['cv']:>8.3f} {r['test']:>9.3f}")
+
+# Best model (by cross-validation accuracy)
+best = max(results, key=lambda r: r["cv"])
+model = best["model"]
+print(f"\n Selected mode: {best['mode']}")
+print(classification_report(y_test, model.predict(X_test)))
 
 # Save trained model
-joblib.dump(model, "svm_cognitive_state.joblib")
-print("\n Model saved as 'svm_cognitive_state.joblib'")
\ No newline at end of file
+joblib.dump(model, args.output)
+print(f"\n Model saved as '{args.output}'")
+
+# Export the NumPy-only predictor used by the assistant at runtime
+if isinstance(model, SVC):
+    compiled_path = args.output.rsplit(".", 1)[0] + ".npz"
+    export_predictor(model, compiled_path)
+    print(f" Compiled predictor saved as '{compiled_path}'")
+else:
+    print(" Approximate-kernel model: no compiled predictor exported (the assistant will load the joblib model).")
+
+# Versioned copy with its feature schema, data hash and metrics
+if args.register or args.promote:
+    if args.features == "temporal":
+        data_hash = file_hash(f"{args.data}/temporal_features.npy", f"{args.data}/temporal_labels.npy")
+    elif is_dataset_store(args.data):
+        data_hash = DatasetStore(args.data).content_hash()
+    else:
+        data_hash = file_hash(f"{args.data}/labeled_features.npy", f"{args.data}/labels.npy")
+    registry = ModelRegistry(args.registry or ("models/temporal" if args.features == "temporal" else "models"))
+    version = registry.register(
+        model, temporal_schema() if args.features == "temporal" else schema(), data_hash=data_hash,
+        metrics={"cv_accuracy": best["cv"], "test_accuracy": best["test"], "train_seconds": best["time"]},
+        params={"mode": best["mode"], **best["params"], "data": os.path.abspath(args.data),
+                "user": args.user, "session": args.session, "n_samples": int(len(X))},
+        promote=args.promote,
+    )
+    print(f" Registered as {version} in '{registry.root}'" + (" and promoted" if args.promote else ""))
@@ -0,0 +1,330 @@
+import datetime
+import itertools
+import time
+from src.utils.capture import FrameGrabber
+from src.utils.conversation_saving import log_conversation
+from src.utils.memory import load_preference, update_preference
+from src.utils.observation import Observation, observation_fields
+from src.utils.response_generator import STYLE_CHANGE_MARKER, ResponseGenerator
+
+# One assistant conversation (the loop of main.py) as an object, so a server can run many of
+# them side by side. Each session owns its frame source, conversation history and turn
+# counter; feature extraction and classification go through shared workers
+# (src/utils/inference.py). The clock, frame buffer, preference store and log writer can be
+# injected, so the same loop runs in the accelerated simulator (src/utils/simulation.py).
+# The style-check dialog (style_check) is shared with main.py.
+
+
+def response_did_not_work(before, after):
+    """
+    Heuristic to detect if the response failed to improve or maintain the user's state.
+    """
+    if before == "attentive" and after in ["confused", "distracted"]:
+        return True
+    elif before != after and after in ["confused", "distracted"]:
+        return True
+    elif before == after and before in ["confused", "distracted"]:
+        return True
+    else:
+        return False
+
+
+def style_check(state, post_state, style, example, ask, say, log, respond, update_preference,
+                personalizer=None, user_id=None, post_features=None):
+    """
+    The dialog after a reply that did not work (or asked for a style change): offers another
+    style, lets the user confirm or correct the observed state (which personalizes the
+    classifier), stores a new preferred style and continues the conversation.
+
+    Args:
+        state (str): State the reply was generated for.
+        post_state (str): State observed after the reply.
+        style (str): Preferred style the reply used.
+        example (str): Example response of that style.
+        ask (callable): ask(prompt) -> the user's answer.
+        say (callable): Shows an assistant message.
+        log (callable): log(state, user_input, response) writes one conversation record.
+        respond (callable): respond(state, style, example, user_input) -> reply text (shown by respond).
+        update_preference (callable): update_preference(state, style, example).
+        personalizer (Personalizer, optional): Receives the confirmed or corrected state.
+        user_id (str, optional): Whose adapter is updated.
+        post_features (np.array, optional): Features post_state was classified from; without
+            them the state is not asked about.
+
+    Returns:
+        str: The post-response state, as confirmed or corrected by the user.
+    """
+    question = f"You seem {post_state}. Would you like to try a different explanation style for when you are {state}?"
+    say(question)
+    log(post_state, "System trigger", question)
+
+    if personalizer is not None and post_features is not None:
+        # Confirmed or corrected labels personalize the classifier for this user
+        answer = ask(f"Were you really {post_state}? (yes / {' / '.join(personalizer.classes)}): ").strip().lower()
+        actual = post_state if answer == "yes" else answer
+        log(actual if actual in personalizer.classes else post_state, "State confirmation",
+            f"Were you really {post_state}? → {answer}")
+        if actual in personalizer.classes:
+            personalizer.confirm(user_id, post_features, actual)
+            post_state = actual
+
+    confirm = ask("Change style? (yes/no): ").strip().lower()
+    log(post_state, "User", f"Change style? → {confirm}")
+
+    if confirm == "yes":
+        new_style = ask(f"Enter a new preferred style for when you are {state} (e.g., calm, motivational, step-by-step): ").strip()
+        new_example = ask("Give an example response in that style: ").strip()
+        update_preference(state, new_style, new_example)
+        acknowledgement = "Preferences updated and stored. I'll use this style from now on when you seem like that."
+        say(acknowledgement)
+        log(state, f"[User updated preferred style to '{new_style}' for state '{state}']", acknowledgement)
+    else:
+        new_style, new_example = style, example
+
+    response = respond(post_state, new_style, new_example, "Continue the conversation.")
+    log(post_state, "System trigger after style check", response)
+    return post_state
+
+
+class RealClock:
+    """
+    Wall-clock time for live sessions (see simulation.SimulatedClock for the accelerated one).
+    """
+
+    def time(self):
+        return time.monotonic()
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+    def now(self):
+        return datetime.datetime.now()
+
+
+class ScriptedUser:
+    """
+    Stands in for a person at the keyboard: cycles through messages and answers the
+    style-check questions with fixed replies. The state question is skipped by default (an
+    answer that is not a class leaves the user's adapter unchanged).
+    """
+
+    def __init__(self, messages, change_style="no", new_style="calm", new_example="Let's take it slowly.",
+                 state_answer="skip"):
+        self._messages = itertools.cycle(messages)
+        self.state_answer = state_answer
+        self.change_style = change_style
+        self.new_style = new_style
+        self.new_example = new_example
+
+    def next_message(self):
+        return next(self._messages)
+
+    def ask(self, prompt):
+        if prompt.startswith("Were you really"):
+            return self.state_answer
+        if prompt.startswith("Change style?"):
+            return self.change_style
+        if prompt.startswith("Enter a new preferred style"):
+            return self.new_style
+        return self.new_example
+
+
+class AssistantSession:
+    """
+    A single user's conversation with the assistant.
+
+    Usage:
+        session = AssistantSession("s1", "user_1", SyntheticSource(), pool, predictor)
+        timings = session.run_turn("Hello!", ask=user.ask)
+        session.close()
+    """
+
+    def __init__(self, session_id, user_id, source, extraction, predictor, generator=None,
+                 personalizer=None, observe_seconds=10.0, log=True, say=None, clock=None, frames=None,
+                 preferences=None, log_writer=None, observer=None, frame_interval=1 / 15):
+        """
+        Args:
+            session_id (str): Identifier used in reports.
+            user_id (str): Whose preferences, adapter and log records this session uses.
+            source: Frame source with read()/release() (cv2.VideoCapture or src.utils.frame_sources).
+            extraction (ExtractionPool): Shared feature extraction workers.
+            predictor (BatchedPredictor): Shared classifier.
+            generator (ResponseGenerator, optional): Defaults to a new one (own history).
+            personalizer (Personalizer, optional): Per-user adapters applied on top of the classifier.
+            observe_seconds (float): How long the reaction to a reply is observed (fixed window).
+            log (bool): Write turns to the conversation log.
+            say (callable, optional): Receives assistant messages (e.g. print).
+            clock (optional): time() / sleep() / now() provider; defaults to RealClock.
+            frames (optional): Object with wait_for_frame(timeout) used instead of grabbing `source`.
+            preferences (optional): Preference store with get() / set(); defaults to user_memory.json.
+            log_writer (LogWriter, optional): Writes this session's records (timestamps from the clock)
+                instead of the shared conversation log.
+            observer (callable, optional): Returns a new AdaptiveObserver for each post-response window;
+                by default one frame is classified after observe_seconds.
+            frame_interval (float): Seconds between the frames classified by the observer.
+        """
+        self.session_id = session_id
+        self.user_id = user_id
+        self.extraction = extraction
+        self.predictor = predictor
+        self.generator = generator or ResponseGenerator()
+        self.personalizer = personalizer
+        self.observe_seconds = observe_seconds
+        self.log = log
+        self.say = say or (lambda text: None)
+        self.clock = clock or RealClock()
+        self.preferences = preferences
+        self.log_writer = log_writer
+        self.observer = observer
+        self.frame_interval = frame_interval
+        self.turn_id = 1
+        self.timings = []
+        self.states = []
+        self.grabber = None if frames is not None else FrameGrabber(source).start()
+        self.frames = frames if frames is not None else self.grabber.buffer
+
+    def _log(self, state, user_input, response, extra=None):
+        if self.log and self.log_writer is not None:
+            self.log_writer.write({
+                "timestamp": self.clock.now().strftime("%Y-%m-%d %H:%M:%S.%f"), "turn_id": self.turn_id,
+                "user_id": self.user_id, "state": state, "user_input": user_input, "assistant_response": response,
+                **(extra or {}),
+            })
+        elif self.log:
+            log_conversation(state, user_input, response, self.user_id, self.turn_id, extra=extra)
+        self.turn_id += 1
+
+    def _load_preference(self, state):
+        if self.preferences is not None:
+            return self.preferences.get(self.user_id, state)
+        return load_preference(self.user_id, state)
+
+    def _update_preference(self, state, style, example):
+        if self.preferences is not None:
+            self.preferences.set(self.user_id, state, style, example)
+        else:
+            update_preference(self.user_id, state, style, example)
+
+    def _respond(self, state, style, example, user_input):
+        response = self.generator.generate_response(state, style, example, user_input=user_input)
+        self.say(response)
+        return response
+
+    def classify(self, frame):
+        """
+        Returns:
+            tuple: (state, features, extraction seconds, classification seconds, probabilities)
+        """
+        start = time.perf_counter()
+        features = self.extraction.extract(frame)
+        extracted = time.perf_counter()
+        base_proba = self.predictor.predict_proba(features)
+        if self.personalizer is not None:
+            adapter = self.personalizer.adapter(self.user_id)
+            adapter.observe(features)
+            proba = adapter.predict_proba(features, base_proba)
+        else:
+            proba = base_proba
+        state = self.predictor.classes[int(proba.argmax())]
+        return state, features, extracted - start, time.perf_counter() - extracted, proba
+
+    def observe(self, observer):
+        """
+        Classifies a frame every frame_interval (on the session's clock) until the observer's
+        window closes.
+
+        Returns:
+            tuple: (Observation or None, features of the last classified frame, extraction seconds,
+            classification seconds)
+        """
+        observer.start(self.clock.time())
+        features = None
+        extract_time = classify_time = 0.0
+        while not observer.done(self.clock.time()):
+            self.clock.sleep(self.frame_interval)
+            _, frame = self.frames.wait_for_frame(timeout=2.0)
+            if frame is None:
+                break
+            _, features, extracted, classified, proba = self.classify(frame)
+            extract_time += extracted
+            classify_time += classified
+            observer.update(proba, self.clock.time())
+        return observer.result(), features, extract_time, classify_time
+
+    def run_turn(self, user_input, ask):
+        """
+        One turn: classify the latest frame, reply, observe the reaction and run the
+        style check if needed.
+
+        Args:
+            user_input (str): The user's message.
+            ask (callable): ask(prompt) -> answer, for the style-check dialog.
+
+        Returns:
+            dict: Seconds spent per stage (extract, classify, first_token, reply, turn; observe is
+            measured on the session's clock).
+        """
+        turn_start = time.perf_counter()
+        _, frame = self.frames.wait_for_frame(timeout=2.0)
+        if frame is None:
+            raise RuntimeError(f"Session {self.session_id}: no frames from the source.")
+
+        state, _, extract_time, classify_time, proba = self.classify(frame)
+        observation = Observation(state, float(proba.max()), 0.0, 1, True, proba)
+        style, example = self._load_preference(state)
+
+        first_token = []
+        reply_start = time.perf_counter()
+        response = self.generator.start_response(
+            state, style, example, user_input=user_input,
+            on_token=lambda text: first_token or first_token.append(time.perf_counter())
+        ).result()
+        reply_time = time.perf_counter() - reply_start
+        timings = {
+            "extract": extract_time,
+            "classify": classify_time,
+            "first_token": (first_token[0] if first_token else time.perf_counter()) - reply_start,
+            "reply": reply_time,
+            "response": time.perf_counter() - turn_start,
+        }
+
+        style_requested = STYLE_CHANGE_MARKER in response
+        response = response.replace(STYLE_CHANGE_MARKER, "").strip()
+        self.say(response)
+
+        post_state, post_features, post_observation = state, None, None
+        if not style_requested:
+            observe_start = self.clock.time()
+            if self.observer is not None:
+                post_observation, post_features, extract_time, classify_time = self.observe(self.observer())
+            else:
+                self.clock.sleep(self.observe_seconds)
+                _, post_frame = self.frames.wait_for_frame(timeout=2.0)
+                if post_frame is not None:
+                    post_state, post_features, extract_time, classify_time, proba = self.classify(post_frame)
+                    post_observation = Observation(post_state, float(proba.max()), self.observe_seconds, 1, False, proba)
+            if post_observation is not None:
+                post_state = post_observation.state
+                timings["extract_post"] = extract_time
+                timings["classify_post"] = classify_time
+            timings["observe"] = self.clock.time() - observe_start
+
+        # Logged once both states behind the style check are known, as in main.py
+        self._log(state, user_input, response, extra=observation_fields(observation, post_observation))
+
+        if response_did_not_work(state, post_state) or style_requested:
+            post_state = style_check(
+                state, post_state, style, example, ask=ask, say=self.say,
+                log=self._log, respond=self._respond,
+                update_preference=self._update_preference,
+                personalizer=self.personalizer, user_id=self.user_id, post_features=post_features,
+            )
+
+        timings["turn"] = time.perf_counter() - turn_start
+        self.timings.append(timings)
+        self.states.append((state, post_state))
+        return timings
+
+    def close(self):
+        if self.grabber is not None:
+            self.grabber.stop()
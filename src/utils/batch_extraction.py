@@ -0,0 +1,224 @@
+import csv
+import glob
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import cv2
+import numpy as np
+from src.utils.feature_spec import csv_header
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+# One FeatureExtractor per worker process and per mode (video tracking vs. still images)
+_worker_extractors = {}
+_worker_position = None   # (source, next frame index) the tracking extractor would continue from
+
+
+def read_manifest(manifest_path):
+    """
+    Reads a label manifest: a CSV with a `path` and a `label` column.
+    Relative paths are resolved against the manifest's directory.
+
+    Returns:
+        list: (path, label) tuples.
+    """
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    entries = []
+    with open(manifest_path, newline="") as f:
+        for row in csv.DictReader(f):
+            path = row["path"].strip()
+            if not os.path.isabs(path):
+                path = os.path.join(base_dir, path)
+            entries.append((path, row["label"].strip()))
+    return entries
+
+
+def plan_tasks(entries, frames_per_task=256, stride=1):
+    """
+    Splits every manifest entry into independent tasks of at most `frames_per_task` frames.
+
+    Returns:
+        list: task dicts with keys kind ('video' or 'images'), source, label and the frame
+        range (video) or image paths (images) to process.
+    """
+    tasks = []
+    for path, label in entries:
+        if os.path.isdir(path):
+            images = sorted(
+                p for p in glob.glob(os.path.join(path, "*"))
+                if p.lower().endswith(IMAGE_EXTENSIONS)
+            )[::stride]
+            for start in range(0, len(images), frames_per_task):
+                tasks.append({
+                    "kind": "images", "source": path, "label": label,
+                    "images": images[start:start + frames_per_task],
+                })
+        else:
+            cap = cv2.VideoCapture(path)
+            if not cap.isOpened():
+                print(f" Skipping unreadable video: {path}")
+                continue
+            n_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            cap.release()
+            span = frames_per_task * stride
+            for start in range(0, n_frames, span):
+                tasks.append({
+                    "kind": "video", "source": path, "label": label,
+                    "start": start, "stop": min(start + span, n_frames), "stride": stride,
+                })
+    for task_id, task in enumerate(tasks):
+        task["task_id"] = task_id
+    return tasks
+
+
+def _init_worker():
+    # MediaPipe and OpenCV parallelize internally; one thread each keeps workers from
+    # oversubscribing the cores the pool already uses.
+    cv2.setNumThreads(1)
+
+
+def _get_worker_extractor(static_image_mode):
+    # Imported here so the parent process never loads MediaPipe
+    from src.utils.state_detection import FeatureExtractor
+
+    if static_image_mode not in _worker_extractors:
+        _worker_extractors[static_image_mode] = FeatureExtractor(static_image_mode=static_image_mode)
+    return _worker_extractors[static_image_mode]
+
+
+def _iter_task_frames(task):
+    if task["kind"] == "images":
+        for index, image_path in enumerate(task["images"]):
+            frame = cv2.imread(image_path)
+            if frame is not None:
+                yield index, frame
+        return
+
+    cap = cv2.VideoCapture(task["source"])
+    cap.set(cv2.CAP_PROP_POS_FRAMES, task["start"])
+    try:
+        for index in range(task["start"], task["stop"]):
+            ret, frame = cap.read()
+            if not ret:
+                break
+            if (index - task["start"]) % task["stride"] == 0:
+                yield index, frame
+    finally:
+        cap.release()
+
+
+def process_task(task):
+    """
+    Worker entry point: extracts features for every frame of a task.
+
+    Returns:
+        dict: task_id, features (n, 8), frame indices and feature names.
+    """
+    global _worker_position
+    extractor = _get_worker_extractor(static_image_mode=task["kind"] == "images")
+    if task["kind"] == "video":
+        # Tasks reach a worker in arbitrary order: tracking must not carry over from another
+        # video, or from a non-adjacent part of the same one
+        if _worker_position != (task["source"], task["start"]):
+            extractor.reset()
+        _worker_position = None
+    features, indices, feature_names = [], [], None
+    for index, frame in _iter_task_frames(task):
+        feats, feature_names = extractor.process(frame)
+        features.append(feats)
+        indices.append(index)
+    if task["kind"] == "video":
+        _worker_position = (task["source"], task["stop"])
+    return {
+        "task_id": task["task_id"],
+        "features": np.array(features, dtype=float).reshape(len(features), -1),
+        "frame_indices": np.array(indices, dtype=int),
+        "feature_names": feature_names,
+    }
+
+
+def extract_dataset(tasks, output_dir, workers=None, keep_empty=False):
+    """
+    Fans tasks out across a process pool and writes one chunk file per finished task.
+
+    Args:
+        tasks (list): Output of plan_tasks().
+        output_dir (str): Directory receiving chunk_XXXXX.npz files.
+        workers (int, optional): Number of worker processes (defaults to CPU count).
+        keep_empty (bool): Keep frames where neither face nor pose was detected.
+
+    Returns:
+        dict: Summary with frame counts, elapsed time and throughput.
+    """
+    chunk_dir = os.path.join(output_dir, "chunks")
+    os.makedirs(chunk_dir, exist_ok=True)
+    # Chunks left over from a previous run would otherwise be merged into this dataset
+    for stale in glob.glob(os.path.join(chunk_dir, "chunk_*.npz")):
+        os.remove(stale)
+
+    by_id = {task["task_id"]: task for task in tasks}
+    total_frames = 0
+    kept_frames = 0
+    start = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        futures = [pool.submit(process_task, task) for task in tasks]
+        for done, future in enumerate(as_completed(futures), 1):
+            result = future.result()
+            task = by_id[result["task_id"]]
+            features = result["features"]
+            total_frames += len(features)
+
+            mask = np.ones(len(features), dtype=bool)
+            if not keep_empty and len(features):
+                mask = np.any(features != 0, axis=1)
+            kept_frames += int(mask.sum())
+
+            np.savez(
+                os.path.join(chunk_dir, f"chunk_{result['task_id']:05d}.npz"),
+                features=features[mask],
+                labels=np.array([task["label"]] * int(mask.sum())),
+                frame_indices=result["frame_indices"][mask],
+                source=np.array(task["source"]),
+                feature_names=np.array(result["feature_names"] or []),
+            )
+            elapsed = time.perf_counter() - start
+            print(f" [{done}/{len(tasks)}] {os.path.basename(task['source'])}: "
+                  f"{len(features)} frames ({total_frames / elapsed:.1f} frames/s)")
+
+    elapsed = time.perf_counter() - start
+    return {
+        "frames": total_frames,
+        "kept": kept_frames,
+        "seconds": elapsed,
+        "frames_per_second": total_frames / elapsed if elapsed > 0 else 0.0,
+    }
+
+
+def merge_chunks(output_dir):
+    """
+    Concatenates chunk files (in task order) into labeled_features.npy, labels.npy and
+    dataset.csv, the same layout collect_data.py produces.
+
+    Returns:
+        tuple: (features, labels) arrays.
+    """
+    chunk_paths = sorted(glob.glob(os.path.join(output_dir, "chunks", "chunk_*.npz")))
+    features, labels = [], []
+    for path in chunk_paths:
+        with np.load(path) as chunk:
+            if len(chunk["features"]):
+                features.append(chunk["features"])
+                labels.append(chunk["labels"])
+
+    X = np.concatenate(features) if features else np.empty((0, len(csv_header()) - 1))
+    y = np.concatenate(labels) if labels else np.empty(0, dtype=str)
+
+    np.save(os.path.join(output_dir, "labeled_features.npy"), X)
+    np.save(os.path.join(output_dir, "labels.npy"), y)
+    with open(os.path.join(output_dir, "dataset.csv"), "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(csv_header())
+        for feats, label in zip(X, y):
+            writer.writerow(list(feats) + [label])
+    return X, y
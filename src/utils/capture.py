@@ -0,0 +1,163 @@
+import threading
+import time
+from collections import deque
+from src.utils import tracing
+
+
+class FrameRingBuffer:
+    """
+    Fixed-size, thread-safe buffer of (timestamp, frame) pairs. The oldest frame is dropped
+    when the buffer is full, so readers always see the most recent part of the stream.
+    """
+
+    def __init__(self, capacity=90):
+        """
+        Args:
+            capacity (int): Maximum number of frames kept (e.g. 90 = ~3 s at 30 fps).
+        """
+        self._frames = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        self._new_frame = threading.Condition(self._lock)
+        self.total_frames = 0
+
+    def push(self, frame, timestamp=None):
+        """
+        Stores a frame with its capture time (time.monotonic() by default).
+        """
+        if timestamp is None:
+            timestamp = time.monotonic()
+        with self._new_frame:
+            self._frames.append((timestamp, frame))
+            self.total_frames += 1
+            self._new_frame.notify_all()
+
+    def latest(self):
+        """
+        Returns:
+            tuple: (timestamp, frame) of the newest frame, or (None, None) if empty.
+        """
+        with self._lock:
+            if not self._frames:
+                return None, None
+            return self._frames[-1]
+
+    def since(self, timestamp):
+        """
+        Returns all buffered (timestamp, frame) pairs captured after the given monotonic time.
+        """
+        with self._lock:
+            return [item for item in self._frames if item[0] > timestamp]
+
+    def last_seconds(self, seconds):
+        """
+        Returns the (timestamp, frame) pairs captured in the last `seconds` seconds.
+        """
+        return self.since(time.monotonic() - seconds)
+
+    def wait_for_frame(self, after=None, timeout=1.0):
+        """
+        Blocks until a frame newer than `after` is available or the timeout expires.
+
+        Returns:
+            tuple: (timestamp, frame), or (None, None) on timeout.
+        """
+        deadline = time.monotonic() + timeout
+        with self._new_frame:
+            while True:
+                if self._frames and (after is None or self._frames[-1][0] > after):
+                    return self._frames[-1]
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None, None
+                self._new_frame.wait(remaining)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._frames)
+
+
+class FrameGrabber:
+    """
+    Reads frames from a cv2.VideoCapture on a dedicated thread and writes them into a
+    FrameRingBuffer, so the camera buffer never goes stale while the assistant waits for
+    input or for the language model. After `max_failures` consecutive failed reads (a
+    disconnected camera or the end of a video file) the grabber stops and `running` turns false.
+
+    Usage:
+        grabber = FrameGrabber(cv2.VideoCapture(0)).start()
+        timestamp, frame = grabber.buffer.latest()
+        grabber.stop()
+    """
+
+    def __init__(self, cap, capacity=90, max_failures=100):
+        """
+        Args:
+            cap (cv2.VideoCapture): Opened capture device or video file.
+            capacity (int): Ring buffer size in frames.
+            max_failures (int): Consecutive failed reads (10 ms apart) after which the grabber stops.
+        """
+        self.cap = cap
+        self.buffer = FrameRingBuffer(capacity)
+        self.max_failures = max_failures
+        self.failed_reads = 0
+        self._running = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._running.set()
+            self._thread = threading.Thread(target=self._run, name="frame-grabber", daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        window_start, window_frames = time.monotonic(), 0
+        consecutive_failures = 0
+        while self._running.is_set():
+            with tracing.span("capture"):
+                ret, frame = self.cap.read()
+            if not ret or frame is None:
+                self.failed_reads += 1
+                consecutive_failures += 1
+                tracing.count("camera_read_failures")
+                if consecutive_failures >= self.max_failures:
+                    print(f"\n No frames from the camera after {consecutive_failures} attempts; stopping capture.")
+                    self._running.clear()
+                    return
+                time.sleep(0.01)
+                continue
+            consecutive_failures = 0
+            self.buffer.push(frame)
+            tracing.count("camera_frames")
+
+            window_frames += 1
+            now = time.monotonic()
+            if now - window_start >= 1.0:
+                tracing.set_gauge("camera_fps", window_frames / (now - window_start))
+                window_start, window_frames = now, 0
+
+    def stop(self):
+        """
+        Stops the grabber thread and releases the capture device.
+        """
+        self._running.clear()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+        self.cap.release()
+
+    @property
+    def running(self):
+        return self._running.is_set()
+
+    def latest(self):
+        """
+        Returns the newest (timestamp, frame) pair without blocking.
+        """
+        return self.buffer.latest()
+
+    def last_seconds(self, seconds):
+        """
+        Returns the frames captured during the last `seconds` seconds.
+        """
+        return self.buffer.last_seconds(seconds)
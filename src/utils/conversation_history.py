@@ -0,0 +1,185 @@
+import hashlib
+
+
+def estimate_tokens(text):
+    """
+    Cheap token estimate (~4 characters per token for English text), good enough for budgeting.
+    """
+    return len(text) // 4 + 1
+
+
+def _shorten(text, limit):
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[:limit - 3].rstrip() + "..."
+
+
+class ConversationHistory:
+    """
+    Bounded conversation memory for the language model.
+
+    The request sent each turn is made of:
+        - the system prompt (always kept),
+        - a rolling summary of older turns (folded in once they fall out of the window),
+        - the last `keep_turns` turns verbatim,
+        - the new user prompt.
+
+    Turns are folded into the summary until the estimated size fits `token_budget`.
+    The per-turn style header ("The user appears ... preferred style ... example ...") is only
+    repeated when the state or the preferences change.
+    """
+
+    def __init__(self, system_prompt, token_budget=3000, keep_turns=6, summary_budget=400, summarizer=None):
+        """
+        Args:
+            system_prompt (str): Instructions sent at the start of every request.
+            token_budget (int): Target upper bound for the estimated request size.
+            keep_turns (int): Maximum number of recent turns kept verbatim.
+            summary_budget (int): Maximum estimated size of the rolling summary.
+            summarizer (callable, optional): summarizer(turn) -> str, one summary line per
+                folded turn. Defaults to a short extractive line.
+        """
+        self.system_prompt = system_prompt
+        self.token_budget = token_budget
+        self.keep_turns = keep_turns
+        self.summary_budget = summary_budget
+        self.summarizer = summarizer or self._default_summary_line
+        self.turns = []           # completed turns kept verbatim
+        self.summary_lines = []   # one line per folded turn
+        self.omitted_turns = 0    # folded turns dropped from the summary to respect its budget
+        self.pending = None       # turn waiting for the model's reply
+        self.metrics = []         # one dict per request
+        self._raw_tokens = estimate_tokens(system_prompt)
+
+    @staticmethod
+    def _default_summary_line(turn):
+        line = f"- ({turn['state']}) User: {_shorten(turn['user_input'] or '(no message)', 80)}"
+        return line + f" / Assistant: {_shorten(turn['reply'], 100)}"
+
+    @staticmethod
+    def style_header(state, style, example):
+        return (
+            f"The user appears {state}. Their preferred response style is: {style}.\n"
+            f"Example response: \"{example}\"."
+        )
+
+    def _prompts(self, state, style, example, user_input, previous):
+        """
+        Returns (prompt, standalone_prompt): the deduplicated prompt, and the full version used
+        when the turn it refers back to is no longer in the verbatim window.
+        """
+        said = f"\nThey just said: \"{user_input}\"" if user_input else ""
+        standalone = self.style_header(state, style, example) + said
+        if previous is not None and (previous["state"], previous["style"], previous["example"]) == (state, style, example):
+            return f"The user still appears {state}; keep the same preferred style." + said, standalone
+        return standalone, standalone
+
+    def _summary_text(self):
+        if not self.summary_lines and not self.omitted_turns:
+            return ""
+        lines = ["Summary of the earlier conversation:"]
+        if self.omitted_turns:
+            lines.append(f"- ({self.omitted_turns} earlier turns omitted)")
+        return "\n".join(lines + self.summary_lines)
+
+    def _fold_oldest(self):
+        self.summary_lines.append(self.summarizer(self.turns.pop(0)))
+        while self.summary_lines and estimate_tokens("\n".join(self.summary_lines)) > self.summary_budget:
+            self.summary_lines.pop(0)
+            self.omitted_turns += 1
+
+    def _build(self, prompt, standalone):
+        system = self.system_prompt
+        summary = self._summary_text()
+        if summary:
+            system += "\n\n" + summary
+        messages = [{"role": "user", "parts": [system]}]
+        for i, turn in enumerate(self.turns):
+            # The oldest verbatim turn cannot refer back to a turn that has been summarized
+            messages.append({"role": "user", "parts": [turn["standalone"] if i == 0 else turn["prompt"]]})
+            messages.append({"role": "model", "parts": [turn["reply"]]})
+        messages.append({"role": "user", "parts": [prompt if self.turns else standalone]})
+        return messages
+
+    def begin_turn(self, state, style, example, user_input=None, full_prompt=None):
+        """
+        Registers a new user turn and returns the messages to send to the model.
+
+        Args:
+            full_prompt (str, optional): The uncompressed per-turn prompt, only used to report
+                how large an unbounded history would have been.
+
+        Returns:
+            list: Messages in Gemini format.
+        """
+        previous = self.turns[-1] if self.turns else None
+        prompt, standalone = self._prompts(state, style, example, user_input, previous)
+
+        while len(self.turns) > self.keep_turns:
+            self._fold_oldest()
+        messages = self._build(prompt, standalone)
+        while self.turns and self.size(messages) > self.token_budget:
+            self._fold_oldest()
+            messages = self._build(prompt, standalone)
+        # Still too large with no verbatim turns left: shorten the summary itself
+        while self.summary_lines and self.size(messages) > self.token_budget:
+            self.summary_lines.pop(0)
+            self.omitted_turns += 1
+            messages = self._build(prompt, standalone)
+        if not self.turns:
+            prompt = standalone
+
+        self.pending = {
+            "state": state, "style": style, "example": example, "user_input": user_input,
+            "prompt": prompt, "standalone": standalone,
+        }
+        self._raw_tokens += estimate_tokens(full_prompt or standalone)
+        self.metrics.append({
+            "turn": len(self.metrics) + 1,
+            "prompt_tokens": self.size(messages),
+            "unbounded_tokens": self._raw_tokens,
+            "verbatim_turns": len(self.turns),
+            "summarized_turns": len(self.summary_lines) + self.omitted_turns,
+        })
+        return messages
+
+    def complete_turn(self, reply):
+        """
+        Stores the model's reply for the pending turn.
+        """
+        turn = dict(self.pending, reply=reply)
+        self.turns.append(turn)
+        self._raw_tokens += estimate_tokens(reply)
+        self.pending = None
+
+    def abort_turn(self):
+        """
+        Drops the pending turn (e.g. when the request failed).
+        """
+        self.pending = None
+
+    def context_hash(self, n_turns=2):
+        """
+        Short hash of the last `n_turns` completed turns, identifying the recent context.
+        """
+        digest = hashlib.sha256()
+        for turn in self.turns[-n_turns:]:
+            digest.update(f"{turn['state']}\x1f{turn['user_input'] or ''}\x1f{turn['reply']}\x1e".encode("utf-8"))
+        return digest.hexdigest()[:16]
+
+    @staticmethod
+    def size(messages):
+        """
+        Estimated token count of a list of messages.
+        """
+        return sum(estimate_tokens(part) for message in messages for part in message["parts"])
+
+    def report(self):
+        """
+        Prints the per-request prompt size next to what an unbounded history would have sent.
+        """
+        if not self.metrics:
+            return
+        print("\n Prompt size per turn (estimated tokens):")
+        for m in self.metrics:
+            print(f"   turn {m['turn']:>3}: {m['prompt_tokens']:>6} sent  / {m['unbounded_tokens']:>6} unbounded"
+                  f"  ({m['verbatim_turns']} verbatim, {m['summarized_turns']} summarized)")
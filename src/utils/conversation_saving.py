@@ -1,37 +1,275 @@
+import atexit
 import datetime
+import glob
+import gzip
 import json
+import os
+import queue
+import shutil
+import sys
+import threading
+import time
+from src.utils import tracing
 
 # File paths for logs
 log_txt_path = "conversation_log.txt"
 log_jsonl_path = "conversation_log.jsonl"
 
-def log_conversation(state, user_input, response, user_id, turn_id):
+
+def format_text_entry(record):
+    """
+    Renders one JSONL record in the human-readable TXT format.
+    """
+    return (
+        f"[{record['timestamp']}] Turn {record['turn_id']} — User: {record['user_id']} — State: {record['state'].upper()}\n"
+        f"User: {record['user_input']}\n"
+        f"Assistant: {record['assistant_response']}\n\n"
+    )
+
+
+def rotated_segments(path):
+    """
+    Returns the compressed segments rotated out of `path`, oldest first.
+    """
+    return sorted(glob.glob(f"{glob.escape(path)}.*.gz"))
+
+
+class LogWriter:
+    """
+    Background conversation logger.
+
+    Records are put on a bounded queue and written by a dedicated thread in batches, either
+    when `batch_size` records are waiting or `flush_interval` seconds have passed. Files stay
+    open between batches. When the JSONL log exceeds `max_bytes` it is rotated into a
+    gzip-compressed segment (conversation_log.jsonl.00001.gz, ...). Pending records are
+    flushed when the writer is closed, including at interpreter exit.
+    """
+
+    def __init__(self, jsonl_path=log_jsonl_path, txt_path=log_txt_path, jsonl_only=False,
+                 max_queue=1000, batch_size=32, flush_interval=0.5,
+                 max_bytes=10 * 1024 * 1024, backup_count=None):
+        """
+        Args:
+            jsonl_path (str): Structured log (one JSON object per line).
+            txt_path (str): Human-readable log; not written when jsonl_only is True
+                (use render_text() to produce it on demand).
+            max_queue (int): Maximum pending records; writers block when it is full.
+            batch_size (int): Records per write batch.
+            flush_interval (float): Maximum seconds a record waits before being written.
+            max_bytes (int): Rotate the logs once the JSONL file exceeds this size (0 disables).
+            backup_count (int, optional): Keep at most this many rotated segments.
+        """
+        self.jsonl_path = jsonl_path
+        self.txt_path = None if jsonl_only else txt_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._files = {}
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def write(self, record):
+        """
+        Queues a record (dict) for writing. Blocks only if the queue is full.
+        """
+        if self._closed:
+            raise RuntimeError("LogWriter is closed.")
+        self._queue.put(record)
+
+    def flush(self, timeout=5.0):
+        """
+        Blocks until every record queued so far has been written.
+        """
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait(timeout)
+
+    def close(self):
+        """
+        Writes all pending records and stops the writer thread.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join(timeout=10)
+
+    def _run(self):
+        batch, waiters = [], []
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = False  # flush interval elapsed
+
+            if isinstance(item, dict):
+                batch.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+                if len(batch) < self.batch_size:
+                    continue
+            elif isinstance(item, threading.Event):
+                waiters.append(item)
+
+            try:
+                if batch:
+                    self._write_safely(batch)
+            finally:
+                # Waiters are released even if writing failed, so flush() never hangs
+                batch, deadline = [], None
+                for waiter in waiters:
+                    waiter.set()
+                waiters = []
+            if item is None:
+                self._close_files()
+                return
+
+    def _file(self, path):
+        if path not in self._files:
+            self._files[path] = open(path, "a", encoding="utf-8")
+        return self._files[path]
+
+    def _close_files(self):
+        for f in self._files.values():
+            try:
+                f.close()
+            except OSError:
+                pass  # buffered data that could not be written; see _write_safely
+        self._files = {}
+
+    def _write_safely(self, batch):
+        """
+        Writes a batch and rotates if needed without ever raising: an I/O error (full disk,
+        permissions, ...) must not kill the writer thread, or log_conversation would block once
+        the queue is full. A failed write is rolled back and retried once on reopened files;
+        if that fails too, the batch is dropped and reported on stderr.
+        """
+        paths = [self.jsonl_path] + ([self.txt_path] if self.txt_path is not None else [])
+        sizes = {path: os.path.getsize(path) if os.path.exists(path) else 0 for path in paths}
+        for attempt in range(2):
+            try:
+                self._write_batch(batch)
+                break
+            except Exception as e:
+                self._close_files()
+                for path, size in sizes.items():
+                    try:
+                        os.truncate(path, size)  # drop a partially written batch
+                    except OSError:
+                        pass
+                error = e
+        else:
+            tracing.count("log_dropped", len(batch))
+            print(f"LogWriter: dropped {len(batch)} records: {type(error).__name__}: {error}", file=sys.stderr)
+            return
+
+        if self.max_bytes and self._files[self.jsonl_path].tell() >= self.max_bytes:
+            try:
+                self._rotate()
+            except Exception as e:
+                # The records are written; rotation is retried after the next batch
+                print(f"LogWriter: rotation failed: {type(e).__name__}: {e}", file=sys.stderr)
+
+    @tracing.traced("log_write")
+    def _write_batch(self, batch):
+        tracing.count("log_records", len(batch))
+        jsonl = self._file(self.jsonl_path)
+        jsonl.write("".join(json.dumps(record) + "\n" for record in batch))
+        jsonl.flush()
+        if self.txt_path is not None:
+            txt = self._file(self.txt_path)
+            txt.write("".join(format_text_entry(record) for record in batch))
+            txt.flush()
+
+    def _rotate(self):
+        self._close_files()
+        paths = [self.jsonl_path] + ([self.txt_path] if self.txt_path is not None else [])
+        for path in paths:
+            if not os.path.exists(path):
+                continue
+            segments = rotated_segments(path)
+            index = int(segments[-1].rsplit(".", 2)[-2]) + 1 if segments else 1
+            segment = f"{path}.{index:05d}.gz"
+            try:
+                with open(path, "rb") as src, gzip.open(segment, "wb") as dst:
+                    shutil.copyfileobj(src, dst)
+            except BaseException:
+                if os.path.exists(segment):
+                    os.remove(segment)  # never leave a truncated segment behind
+                raise
+            os.remove(path)
+            if self.backup_count is not None:
+                for old in rotated_segments(path)[:-self.backup_count or None]:
+                    os.remove(old)
+
+
+def render_text(jsonl_path=log_jsonl_path, output_path=None, include_rotated=True):
+    """
+    Produces the human-readable view of a JSONL log (useful when logging with jsonl_only).
+
+    Args:
+        jsonl_path (str): Active JSONL log.
+        output_path (str, optional): Write the text here; otherwise it is returned.
+        include_rotated (bool): Prepend the compressed rotated segments.
+    """
+    paths = (rotated_segments(jsonl_path) if include_rotated else []) + [jsonl_path]
+    chunks = []
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rt", encoding="utf-8") as f:
+            chunks.extend(format_text_entry(json.loads(line)) for line in f if line.strip())
+    text = "".join(chunks)
+    if output_path is None:
+        return text
+    with open(output_path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+# Writer used by log_conversation(), started on first use
+_writer = None
+_writer_lock = threading.Lock()
+
+def get_writer():
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = LogWriter(jsonl_only=os.getenv("ASSISTANT_LOG_JSONL_ONLY", "0") == "1")
+        return _writer
+
+def log_conversation(state, user_input, response, user_id, turn_id, extra=None):
     """
     Logs each conversation turn in both plain text and JSONL formats.
-    
+    Writing happens on a background thread; this call only queues the record.
+
     Args:
         state (str): Detected cognitive state (e.g., 'attentive').
         user_input (str): The user's input message.
         response (str): The assistant's generated reply.
         user_id (str): Identifier for the current user.
         turn_id (int): Turn number in the conversation.
+        extra (dict, optional): Additional JSONL fields (e.g. the observation behind the state);
+            not shown in the text log.
     """
-    timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-    # Write to human-readable TXT log
-    with open(log_txt_path, "a", encoding="utf-8") as f_txt:
-        f_txt.write(f"[{timestamp}] Turn {turn_id} — User: {user_id} — State: {state.upper()}\n")
-        f_txt.write(f"User: {user_input}\n")
-        f_txt.write(f"Assistant: {response}\n\n")
-
-    # Write structured JSONL log (one JSON object per line)
-    with open(log_jsonl_path, "a", encoding="utf-8") as f_jsonl:
-        json.dump({
-            "timestamp": timestamp,
-            "turn_id": turn_id,
-            "user_id": user_id,
-            "state": state,
-            "user_input": user_input,
-            "assistant_response": response
-        }, f_jsonl)
-        f_jsonl.write("\n")
\ No newline at end of file
+    timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")
+
+    record = {
+        "timestamp": timestamp,
+        "turn_id": turn_id,
+        "user_id": user_id,
+        "state": state,
+        "user_input": user_input,
+        "assistant_response": response
+    }
+    if extra:
+        record.update(extra)
+
+    with tracing.span("log_enqueue"):
+        get_writer().write(record)
@@ -0,0 +1,354 @@
+import csv
+import datetime
+import json
+import os
+import tempfile
+import threading
+import numpy as np
+from src.utils.feature_spec import FEATURE_NAMES, csv_header, schema
+
+try:
+    import fcntl
+except ImportError:  # Windows: writers are not serialized across processes
+    fcntl = None
+
+# Append-only dataset of labeled feature vectors.
+#
+# Layout of a dataset directory:
+#   manifest.json                  schema, label/group vocabularies and the list of chunks
+#   chunks/chunk_00000.features.npy  float64 (n, n_features)
+#   chunks/chunk_00000.labels.npy    int16 label codes
+#   chunks/chunk_00000.groups.npy    int32 group codes; a group is one (user_id, session_id)
+#
+# Chunks are written once and never modified; a chunk becomes part of the dataset only when
+# the manifest listing it is atomically replaced, so a crash loses at most the samples not
+# yet flushed. Chunks are loaded memory-mapped: after compact() (one chunk, rows sorted by
+# group) the full dataset and every user/session view are zero-copy slices of a single file.
+
+MANIFEST = "manifest.json"
+
+
+def is_dataset_store(path):
+    return os.path.exists(os.path.join(path, MANIFEST))
+
+
+class DatasetStore:
+    """
+    Chunked, append-only dataset with a manifest.
+
+    Usage:
+        store = DatasetStore("dataset")
+        with store.writer(user_id="user_1") as writer:
+            writer.append(features, "confused")
+        X, y = store.load(user_id="user_1")
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.chunk_dir = os.path.join(root, "chunks")
+        os.makedirs(self.chunk_dir, exist_ok=True)
+        self._lock = threading.RLock()
+        self.manifest = self._read_manifest()
+
+    # --- manifest ---
+
+    def _read_manifest(self):
+        path = os.path.join(self.root, MANIFEST)
+        if not os.path.exists(path):
+            return {"schema": schema(), "labels": [], "groups": [], "chunks": [], "next_chunk": 0}
+        with open(path) as f:
+            manifest = json.load(f)
+        if manifest["schema"]["feature_names"] != list(FEATURE_NAMES):
+            raise ValueError(
+                f"Dataset '{self.root}' was built with features {manifest['schema']['feature_names']}, "
+                f"but the feature spec defines {list(FEATURE_NAMES)}."
+            )
+        return manifest
+
+    def _update_manifest(self, change, after_commit=None):
+        """
+        Re-reads the manifest under an exclusive lock, applies change(manifest) and atomically
+        replaces it, so several collecting processes can append to the same dataset.
+        after_commit(manifest), if given, runs once the new manifest is in place, still under the
+        lock; it never runs when the replace fails, so the manifest on disk stays consistent.
+        """
+        with self._lock, open(os.path.join(self.root, MANIFEST + ".lock"), "w") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            manifest = self._read_manifest()
+            result = change(manifest)
+            fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix=".manifest.", suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w") as f:
+                    json.dump(manifest, f, indent=2)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, os.path.join(self.root, MANIFEST))
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+            self.manifest = manifest
+            if after_commit is not None:
+                after_commit(manifest)
+            return result
+
+    def refresh(self):
+        self.manifest = self._read_manifest()
+        return self
+
+    @staticmethod
+    def _code(vocabulary, value):
+        if value not in vocabulary:
+            vocabulary.append(value)
+        return vocabulary.index(value)
+
+    def _chunk_path(self, name, column):
+        return os.path.join(self.chunk_dir, f"{name}.{column}.npy")
+
+    # --- writing ---
+
+    def writer(self, user_id="unknown", session_id=None, chunk_size=64):
+        """
+        Returns a DatasetWriter appending samples of one user/session.
+        """
+        return DatasetWriter(self, user_id, session_id, chunk_size)
+
+    def _write_chunk(self, features, labels, groups):
+        """
+        Writes one chunk. labels are strings; groups are (user_id, session_id) pairs per row.
+        """
+        features = np.asarray(features, dtype=np.float64)
+        if features.ndim != 2 or features.shape[1] != len(FEATURE_NAMES):
+            raise ValueError(f"Expected samples with {len(FEATURE_NAMES)} features, got shape {features.shape}.")
+
+        # Label/group codes are assigned and the chunk written under the manifest lock, so the
+        # vocabularies stay consistent when several processes append to the same dataset
+        def commit(manifest):
+            name = f"chunk_{manifest['next_chunk']:05d}"
+            manifest["next_chunk"] += 1
+            label_codes = np.array([self._code(manifest["labels"], str(l)) for l in labels], dtype=np.int16)
+            group_codes = np.array([
+                self._code(manifest["groups"], [user, session]) for user, session in groups
+            ], dtype=np.int32)
+            np.save(self._chunk_path(name, "features"), features)
+            np.save(self._chunk_path(name, "labels"), label_codes)
+            np.save(self._chunk_path(name, "groups"), group_codes)
+            counts = {}
+            for label in labels:
+                counts[str(label)] = counts.get(str(label), 0) + 1
+            manifest["chunks"].append({
+                "name": name,
+                "n_samples": len(features),
+                "label_counts": counts,
+                "groups": sorted(set(int(g) for g in group_codes)),
+                "created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+            })
+            return name
+        return self._update_manifest(commit)
+
+    def append(self, features, labels, user_id="unknown", session_id=None):
+        """
+        Appends a batch of samples (e.g. an existing labeled_features.npy / labels.npy pair).
+        """
+        session_id = session_id or _new_session_id()
+        self._write_chunk(features, labels, [(user_id, session_id)] * len(labels))
+
+    # --- reading ---
+
+    def _group_codes(self, user_id=None, session_id=None):
+        return [
+            i for i, (user, session) in enumerate(self.manifest["groups"])
+            if (user_id is None or user == user_id) and (session_id is None or session == session_id)
+        ]
+
+    def _load_chunk(self, name, mmap=True):
+        mode = "r" if mmap else None
+        return (
+            np.load(self._chunk_path(name, "features"), mmap_mode=mode),
+            np.load(self._chunk_path(name, "labels"), mmap_mode=mode),
+            np.load(self._chunk_path(name, "groups"), mmap_mode=mode),
+        )
+
+    def load(self, user_id=None, session_id=None, mmap=True, decode_labels=True):
+        """
+        Loads the dataset, optionally restricted to one user and/or session.
+
+        Feature arrays are memory-mapped. When the selected rows are one contiguous range of a
+        single chunk (always true after compact()) the returned X is a view of the file, not a copy.
+
+        Returns:
+            tuple: (X, y) with y as label strings (or int16 codes with decode_labels=False).
+        """
+        wanted = set(self._group_codes(user_id, session_id))
+        filtered = user_id is not None or session_id is not None
+        parts_X, parts_y = [], []
+        for chunk in self.manifest["chunks"]:
+            if filtered and not wanted.intersection(chunk["groups"]):
+                continue
+            X, y, groups = self._load_chunk(chunk["name"], mmap)
+            if filtered and not wanted.issuperset(chunk["groups"]):
+                rows = np.flatnonzero(np.isin(groups, list(wanted)))
+                if len(rows) and rows[-1] - rows[0] + 1 == len(rows):
+                    X, y = X[rows[0]:rows[-1] + 1], y[rows[0]:rows[-1] + 1]
+                else:
+                    X, y = X[rows], y[rows]
+            parts_X.append(X)
+            parts_y.append(y)
+
+        if not parts_X:
+            X = np.empty((0, len(FEATURE_NAMES)))
+            y = np.empty(0, dtype=np.int16)
+        elif len(parts_X) == 1:
+            X, y = parts_X[0], parts_y[0]
+        else:
+            X, y = np.concatenate(parts_X), np.concatenate(parts_y)
+
+        if decode_labels:
+            y = np.asarray(self.manifest["labels"])[np.asarray(y, dtype=np.intp)] if len(y) else np.empty(0, dtype=str)
+        return X, y
+
+    def users(self):
+        return sorted({user for user, _ in self.manifest["groups"]})
+
+    def sessions(self, user_id=None):
+        return [session for user, session in self.manifest["groups"] if user_id is None or user == user_id]
+
+    def label_counts(self):
+        counts = {}
+        for chunk in self.manifest["chunks"]:
+            for label, n in chunk["label_counts"].items():
+                counts[label] = counts.get(label, 0) + n
+        return counts
+
+    def __len__(self):
+        return sum(chunk["n_samples"] for chunk in self.manifest["chunks"])
+
+    def content_hash(self):
+        """
+        Identifies the dataset contents (chunks are immutable, so the chunk list is enough).
+        """
+        import hashlib
+        names = [chunk["name"] for chunk in self.manifest["chunks"]]
+        return hashlib.sha256(json.dumps([names, self.manifest["groups"], self.manifest["labels"]]).encode()).hexdigest()
+
+    # --- maintenance ---
+
+    def compact(self):
+        """
+        Rewrites all chunks as a single chunk with rows sorted by user and session, so
+        that the full dataset and every filtered view load as zero-copy slices. Unreferenced
+        chunk files (e.g. from a crash between writing a chunk and committing it) are removed.
+        """
+        with self._lock:
+            self.refresh()
+            old_chunks = [chunk["name"] for chunk in self.manifest["chunks"]]
+            rows = None
+            if len(old_chunks) > 1:
+                parts = [self._load_chunk(name, mmap=False) for name in old_chunks]
+                X = np.concatenate([p[0] for p in parts])
+                labels = np.concatenate([p[1] for p in parts])
+                groups = np.concatenate([p[2] for p in parts])
+                # Sort rows by (user, session) so every user/session view is a contiguous range
+                group_names = self.manifest["groups"]
+                rank = np.empty(len(group_names), dtype=np.int64)
+                rank[sorted(range(len(group_names)), key=lambda g: group_names[g])] = np.arange(len(group_names))
+                order = np.argsort(rank[groups], kind="stable")
+                rows = (X[order], labels[order], groups[order])
+
+            # The compacted chunk is written under the manifest lock, against the fresh manifest, so
+            # chunks committed meanwhile by other writers are kept. Orphans are only swept once the
+            # new manifest has replaced the old one, so a failed write never loses the dataset.
+            def rewrite(manifest):
+                if rows is not None:
+                    X, labels, groups = rows
+                    name = f"chunk_{manifest['next_chunk']:05d}"
+                    manifest["next_chunk"] += 1
+                    np.save(self._chunk_path(name, "features"), X)
+                    np.save(self._chunk_path(name, "labels"), labels)
+                    np.save(self._chunk_path(name, "groups"), groups)
+
+                    label_names = manifest["labels"]
+                    counts = {}
+                    for code, n in zip(*np.unique(labels, return_counts=True)):
+                        counts[label_names[code]] = int(n)
+                    # Keep chunks appended by other writers while we were compacting
+                    newer = [c for c in manifest["chunks"] if c["name"] not in old_chunks]
+                    manifest["chunks"] = [{
+                        "name": name,
+                        "n_samples": len(X),
+                        "label_counts": counts,
+                        "groups": sorted(set(int(g) for g in groups)),
+                        "created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+                    }] + newer
+
+            def sweep(manifest):
+                referenced = {chunk["name"] for chunk in manifest["chunks"]}
+                for file_name in os.listdir(self.chunk_dir):
+                    if file_name.split(".", 1)[0] not in referenced:
+                        os.remove(os.path.join(self.chunk_dir, file_name))
+            self._update_manifest(rewrite, after_commit=sweep)
+        return self
+
+    def export_csv(self, path=None):
+        """
+        Writes the human-readable dataset.csv (same columns as before).
+        """
+        path = path or os.path.join(self.root, "dataset.csv")
+        X, y = self.load()
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(csv_header())
+            for feats, label in zip(X, y):
+                writer.writerow(list(feats) + [label])
+        return path
+
+
+class DatasetWriter:
+    """
+    Buffers samples of one user/session and commits them to the store every chunk_size samples.
+    """
+
+    def __init__(self, store, user_id="unknown", session_id=None, chunk_size=64):
+        self.store = store
+        self.user_id = user_id
+        self.session_id = session_id or _new_session_id()
+        self.chunk_size = chunk_size
+        self._features = []
+        self._labels = []
+
+    def append(self, features, label):
+        self._features.append(np.asarray(features, dtype=np.float64))
+        self._labels.append(label)
+        if len(self._labels) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        if not self._labels:
+            return
+        self.store._write_chunk(np.stack(self._features), self._labels, [(self.user_id, self.session_id)] * len(self._labels))
+        self._features, self._labels = [], []
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _new_session_id():
+    return datetime.datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+
+
+def load_dataset(path, user_id=None, session_id=None):
+    """
+    Loads (X, y) from a dataset store or from a legacy directory with labeled_features.npy
+    and labels.npy (memory-mapped in both cases).
+    """
+    if is_dataset_store(path):
+        return DatasetStore(path).load(user_id=user_id, session_id=session_id)
+    if user_id is not None or session_id is not None:
+        raise ValueError(f"'{path}' is not a dataset store; it cannot be filtered by user or session.")
+    return np.load(os.path.join(path, "labeled_features.npy"), mmap_mode="r"), np.load(os.path.join(path, "labels.npy"))
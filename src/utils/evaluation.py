@@ -0,0 +1,127 @@
+import hashlib
+import json
+import os
+import numpy as np
+
+# Building blocks of the evaluation report (src/scripts/evaluate.py):
+#   - content hashes of the model and dataset, used as cache keys
+#   - an on-disk cache for expensive results (PCA boundary model and grid, permutation importance)
+#   - coarse-to-fine decision boundary rendering: the grid is refined only in cells where
+#     the predicted class changes, instead of predicting every point of a dense meshgrid
+
+
+def file_hash(*paths):
+    """
+    SHA-256 of the contents of one or more files.
+    """
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def cache_key(*parts):
+    """
+    Short stable key derived from hashes and parameters (anything JSON-serializable).
+    """
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+
+class ResultCache:
+    """
+    Directory of cached results: NumPy arrays (.npz) and joblib-pickled objects.
+
+    Usage:
+        cache = ResultCache("evaluation/cache")
+        arrays = cache.get_arrays("importance", key)
+        if arrays is None:
+            arrays = {...}
+            cache.put_arrays("importance", key, arrays)
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, name, key, extension):
+        return os.path.join(self.directory, f"{name}-{key}.{extension}")
+
+    def get_arrays(self, name, key):
+        path = self._path(name, key, "npz")
+        if not os.path.exists(path):
+            return None
+        with np.load(path, allow_pickle=False) as data:
+            return {k: data[k] for k in data.files}
+
+    def put_arrays(self, name, key, arrays):
+        path = self._path(name, key, "npz")
+        tmp_path = path + ".tmp.npz"
+        np.savez(tmp_path, **arrays)
+        os.replace(tmp_path, path)
+
+    def get_object(self, name, key):
+        import joblib
+        path = self._path(name, key, "joblib")
+        return joblib.load(path) if os.path.exists(path) else None
+
+    def put_object(self, name, key, obj):
+        import joblib
+        path = self._path(name, key, "joblib")
+        tmp_path = path + ".tmp"
+        joblib.dump(obj, tmp_path)
+        os.replace(tmp_path, path)
+
+
+def adaptive_decision_grid(predict, x_range, y_range, coarse=50, levels=3):
+    """
+    Predicts class labels on a regular 2D grid with coarse-to-fine refinement.
+
+    The grid starts at coarse x coarse points. At each level the resolution doubles and only
+    points inside cells whose corners disagree (i.e. cells crossed by a decision boundary)
+    are predicted; the rest inherit the label of their uniform cell.
+
+    Args:
+        predict (callable): Maps an (n, 2) array of points to integer labels.
+        x_range, y_range (tuple): (min, max) of each axis.
+        coarse (int): Points per axis of the initial grid.
+        levels (int): Refinement steps; the final grid has (coarse - 1) * 2**levels + 1 points per axis.
+
+    Returns:
+        tuple: (xx, yy, Z, n_evaluations) with xx, yy, Z shaped like np.meshgrid output.
+    """
+    n = coarse
+    xs = np.linspace(*x_range, n)
+    ys = np.linspace(*y_range, n)
+    xx, yy = np.meshgrid(xs, ys)
+    Z = np.asarray(predict(np.c_[xx.ravel(), yy.ravel()])).reshape(n, n)
+    n_evaluations = Z.size
+
+    for _ in range(levels):
+        # Cells whose four corners do not all share one label
+        corners = np.stack([Z[:-1, :-1], Z[:-1, 1:], Z[1:, :-1], Z[1:, 1:]])
+        mixed = (corners != corners[0]).any(axis=0)
+
+        m = 2 * n - 1
+        # Each new point first takes the label of the old grid point at or before it
+        idx = np.arange(m) // 2
+        Z_new = Z[np.ix_(idx, idx)]
+
+        # Points inside or on the border of a mixed cell are predicted
+        refine = np.zeros((m, m), dtype=bool)
+        for di in range(3):
+            for dj in range(3):
+                refine[di:di + m - 2:2, dj:dj + m - 2:2] |= mixed
+        refine[::2, ::2] = False  # already known from the previous level
+
+        xs = np.linspace(*x_range, m)
+        ys = np.linspace(*y_range, m)
+        rows, cols = np.nonzero(refine)
+        if len(rows):
+            Z_new[rows, cols] = predict(np.c_[xs[cols], ys[rows]])
+            n_evaluations += len(rows)
+        Z, n = Z_new, m
+
+    xx, yy = np.meshgrid(xs, ys)
+    return xx, yy, Z, n_evaluations
@@ -0,0 +1,240 @@
+import os
+import numpy as np
+
+# NumPy-only re-implementation of a fitted sklearn SVC (RBF kernel, one-vs-one).
+#
+# The exported .npz holds everything libsvm needs at prediction time: support vectors,
+# dual coefficients, intercepts, gamma and the pairwise Platt scaling parameters.
+# predict() reproduces libsvm's one-vs-one voting and predict_proba() its pairwise coupling,
+# so results match sklearn without importing it.
+
+# Clipping applied by libsvm to the pairwise Platt probabilities
+_MIN_PROB = 1e-7
+
+
+def export_predictor(model, path):
+    """
+    Saves the parameters of a fitted sklearn SVC to a compact .npz file.
+
+    Args:
+        model (sklearn.svm.SVC): Fitted classifier with an RBF kernel.
+        path (str): Destination .npz path.
+    """
+    if model.kernel != "rbf":
+        raise ValueError(f"Only RBF kernels can be exported (got '{model.kernel}').")
+
+    arrays = {
+        "classes": np.asarray(model.classes_),
+        "support_vectors": np.asarray(model.support_vectors_, dtype=float),
+        "n_support": np.asarray(model._n_support, dtype=int),
+        "dual_coef": np.asarray(model._dual_coef_, dtype=float),
+        "intercept": np.asarray(model._intercept_, dtype=float),
+        "gamma": np.asarray(model._gamma, dtype=float),
+    }
+    if getattr(model, "probability", False):
+        arrays["prob_a"] = np.asarray(model.probA_, dtype=float)
+        arrays["prob_b"] = np.asarray(model.probB_, dtype=float)
+    np.savez(path, **arrays)
+
+
+def load_classifier(model_path="svm_cognitive_state.joblib", compiled_path="svm_cognitive_state.npz"):
+    """
+    Loads the exported NumPy predictor when it is at least as recent as the sklearn model,
+    otherwise falls back to the pickled sklearn model (importing sklearn only in that case).
+
+    Returns:
+        CompiledSVC or sklearn.svm.SVC: Object with predict / predict_proba.
+    """
+    if os.path.exists(compiled_path) and (
+        not os.path.exists(model_path) or os.path.getmtime(compiled_path) >= os.path.getmtime(model_path)
+    ):
+        return CompiledSVC.load(compiled_path)
+
+    import joblib
+    if os.path.exists(compiled_path):
+        print(f" '{compiled_path}' is older than '{model_path}'; using the sklearn model. "
+              "Re-run src/scripts/export_predictor.py to refresh it.")
+    return joblib.load(model_path)
+
+
+class CompiledSVC:
+    """
+    Batched RBF SVC predictor backed only by NumPy arrays.
+
+    Usage:
+        predictor = CompiledSVC.load("svm_cognitive_state.npz")
+        state = predictor.predict([features])[0]
+    """
+
+    def __init__(self, classes, support_vectors, n_support, dual_coef, intercept, gamma,
+                 prob_a=None, prob_b=None):
+        self.classes_ = classes
+        self.support_vectors = support_vectors
+        self.n_support = n_support
+        self.dual_coef = dual_coef
+        self.intercept = intercept
+        self.gamma = float(gamma)
+        self.prob_a = prob_a
+        self.prob_b = prob_b
+        self.n_features_in_ = support_vectors.shape[1]
+
+        n_classes = len(classes)
+        starts = np.concatenate([[0], np.cumsum(n_support)])
+        self._sv_norms = np.einsum("ij,ij->i", support_vectors, support_vectors)
+
+        # For each pair (i, j), libsvm uses the coefficients of class i's support vectors
+        # from row j-1 and those of class j's support vectors from row i. They are folded
+        # into one (n_pairs, n_SV) matrix so all decision values come from a single matmul.
+        pairs = [(i, j) for i in range(n_classes) for j in range(i + 1, n_classes)]
+        self._pairs = np.array(pairs, dtype=int).reshape(-1, 2)
+        self._pair_coef = np.zeros((len(pairs), len(support_vectors)))
+        for p, (i, j) in enumerate(pairs):
+            self._pair_coef[p, starts[i]:starts[i + 1]] = dual_coef[j - 1, starts[i]:starts[i + 1]]
+            self._pair_coef[p, starts[j]:starts[j + 1]] = dual_coef[i, starts[j]:starts[j + 1]]
+
+    @classmethod
+    def load(cls, path):
+        """
+        Loads a predictor written by export_predictor().
+        """
+        with np.load(path, allow_pickle=False) as data:
+            arrays = {key: data[key] for key in data.files}
+        return cls(**arrays)
+
+    def _kernel(self, X):
+        # ||x - sv||^2 = ||x||^2 - 2 x.sv + ||sv||^2
+        sq_dist = (
+            np.einsum("ij,ij->i", X, X)[:, None]
+            - 2.0 * X @ self.support_vectors.T
+            + self._sv_norms[None, :]
+        )
+        return np.exp(-self.gamma * np.maximum(sq_dist, 0.0))
+
+    def _validate(self, X):
+        X = np.asarray(X, dtype=float)
+        if X.ndim == 1:
+            X = X[None, :]
+        if X.shape[1] != self.n_features_in_:
+            raise ValueError(
+                f"X has {X.shape[1]} features, but CompiledSVC is expecting {self.n_features_in_} features as input."
+            )
+        return X
+
+    def decision_function(self, X):
+        """
+        Returns:
+            np.array: (n_samples, n_pairs) one-vs-one decision values in libsvm pair order.
+        """
+        X = self._validate(X)
+        return self._kernel(X) @ self._pair_coef.T + self.intercept[None, :]
+
+    def predict(self, X):
+        """
+        Predicts class labels with libsvm's one-vs-one voting (ties go to the lower class index).
+        """
+        dec = self.decision_function(X)
+        votes = np.zeros((len(dec), len(self.classes_)), dtype=int)
+        winners = np.where(dec > 0, self._pairs[:, 0], self._pairs[:, 1])
+        for p in range(len(self._pairs)):
+            np.add.at(votes, (np.arange(len(dec)), winners[:, p]), 1)
+        return self.classes_[np.argmax(votes, axis=1)]
+
+    def predict_proba(self, X):
+        """
+        Class probabilities from pairwise Platt scaling and libsvm's pairwise coupling.
+        """
+        if self.prob_a is None:
+            raise AttributeError("predict_proba is not available: the model was trained without probability=True.")
+        dec = self.decision_function(X)
+        n_samples, n_classes = len(dec), len(self.classes_)
+
+        # Pairwise probabilities, computed in the numerically stable form libsvm uses
+        f = dec * self.prob_a[None, :] + self.prob_b[None, :]
+        pos = f >= 0
+        exp_term = np.exp(-np.abs(f))
+        sig = np.where(pos, exp_term / (1.0 + exp_term), 1.0 / (1.0 + exp_term))
+        sig = np.clip(sig, _MIN_PROB, 1 - _MIN_PROB)
+
+        r = np.zeros((n_samples, n_classes, n_classes))
+        i_idx, j_idx = self._pairs[:, 0], self._pairs[:, 1]
+        r[:, i_idx, j_idx] = sig
+        r[:, j_idx, i_idx] = 1 - sig
+        if n_samples == 1:
+            # NumPy call overhead dominates for a single 3x3 problem; plain floats are faster
+            return np.array([_multiclass_probability_scalar(r[0].tolist())])
+        return _multiclass_probability(r)
+
+
+def _multiclass_probability(r):
+    """
+    Vectorized port of libsvm's multiclass_probability (Wu, Lin & Weng, method 2).
+    Each sample stops iterating on its own convergence, exactly like the scalar version.
+
+    Args:
+        r (np.array): (n_samples, k, k) pairwise probabilities.
+    """
+    n_samples, k, _ = r.shape
+    max_iter = max(100, k)
+    eps = 0.005 / k
+
+    # Q[t, t] = sum_{j != t} r[j, t]^2 ; Q[t, j] = -r[j, t] * r[t, j]
+    Q = -r.transpose(0, 2, 1) * r
+    diag = np.einsum("njt,njt->nt", r, r) - np.einsum("ntt,ntt->nt", r, r)
+    idx = np.arange(k)
+    Q[:, idx, idx] = diag
+
+    p = np.full((n_samples, k), 1.0 / k)
+    active = np.arange(n_samples)
+    Qa, pa = Q, p.copy()
+
+    for _ in range(max_iter):
+        Qp = np.matmul(Qa, pa[:, :, None])[:, :, 0]
+        pQp = np.einsum("nt,nt->n", pa, Qp)
+        converged = np.max(np.abs(Qp - pQp[:, None]), axis=1) < eps
+        if converged.any():
+            # Converged samples keep their current estimate and leave the working set
+            p[active[converged]] = pa[converged]
+            keep = ~converged
+            active, Qa, pa, Qp, pQp = active[keep], Qa[keep], pa[keep], Qp[keep], pQp[keep]
+            if len(active) == 0:
+                return p
+        for t in range(k):
+            Qtt = Qa[:, t, t]
+            diff = (-Qp[:, t] + pQp) / Qtt
+            pa[:, t] += diff
+            scale = 1.0 / (1 + diff)
+            pQp = (pQp + diff * (diff * Qtt + 2 * Qp[:, t])) * scale * scale
+            Qp = (Qp + diff[:, None] * Qa[:, t, :]) * scale[:, None]
+            pa *= scale[:, None]
+    p[active] = pa
+    return p
+
+
+def _multiclass_probability_scalar(r):
+    """
+    Scalar libsvm multiclass_probability for a single sample, on nested Python lists.
+    """
+    k = len(r)
+    max_iter = max(100, k)
+    eps = 0.005 / k
+    Q = [[0.0] * k for _ in range(k)]
+    for t in range(k):
+        for j in range(k):
+            if j != t:
+                Q[t][t] += r[j][t] * r[j][t]
+                Q[t][j] = -r[j][t] * r[t][j]
+    p = [1.0 / k] * k
+
+    for _ in range(max_iter):
+        Qp = [sum(Q[t][j] * p[j] for j in range(k)) for t in range(k)]
+        pQp = sum(p[t] * Qp[t] for t in range(k))
+        if max(abs(Qp[t] - pQp) for t in range(k)) < eps:
+            break
+        for t in range(k):
+            diff = (-Qp[t] + pQp) / Q[t][t]
+            p[t] += diff
+            pQp = (pQp + diff * (diff * Q[t][t] + 2 * Qp[t])) / (1 + diff) / (1 + diff)
+            for j in range(k):
+                Qp[j] = (Qp[j] + diff * Q[t][j]) / (1 + diff)
+                p[j] /= (1 + diff)
+    return p
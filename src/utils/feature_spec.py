@@ -0,0 +1,142 @@
+from collections import namedtuple
+import numpy as np
+
+# Declarative description of the classifier's input features.
+#
+# Each feature is a weighted sum of landmark terms, optionally divided by a normalizer:
+#   ("dist", a, b): 2D euclidean distance between landmarks a and b
+#   ("dy", a, b):   vertical offset y[a] - y[b]
+#
+# Adding a feature only means adding an entry here: all terms of a landmark source are
+# gathered and evaluated in a single vectorized pass per frame.
+
+FeatureSpec = namedtuple("FeatureSpec", ["name", "source", "terms", "normalizer"])
+
+# Face height (forehead center to chin), used to make facial distances scale invariant
+FACE_SCALE_TERM = ("dist", 10, 152)
+
+FEATURE_SPEC = (
+    FeatureSpec("eye_openness_left", "face", ((1.0, "dist", 159, 145),), "face_scale"),
+    FeatureSpec("eye_openness_right", "face", ((1.0, "dist", 386, 374),), "face_scale"),
+    FeatureSpec("eyebrow_distance_left", "face", ((1.0, "dist", 105, 159),), "face_scale"),
+    FeatureSpec("eyebrow_distance_right", "face", ((1.0, "dist", 334, 386),), "face_scale"),
+    FeatureSpec("mouth_openness", "face", ((1.0, "dist", 13, 14),), "face_scale"),
+    # Nose-to-cheek distance difference: positive when the head turns towards the right cheek
+    FeatureSpec("head_yaw_asymmetry", "face", ((1.0, "dist", 1, 234), (-1.0, "dist", 1, 454)), "face_scale"),
+    FeatureSpec("shoulder_distance", "pose", ((1.0, "dist", 11, 12),), None),
+    # Vertical offset between the ears
+    FeatureSpec("head_tilt_vertical", "pose", ((1.0, "dy", 7, 8),), None),
+)
+
+FEATURE_NAMES = [spec.name for spec in FEATURE_SPEC]
+
+# Bump whenever the meaning or order of the features changes
+FEATURE_SCHEMA_VERSION = 1
+
+
+class CompiledSource:
+    """
+    Index arrays and coefficient matrix for all features computed from one landmark source.
+    """
+
+    def __init__(self, specs):
+        terms = []
+        for spec in specs:
+            for _, op, a, b in spec.terms:
+                if (op, a, b) not in terms:
+                    terms.append((op, a, b))
+        # The normalizer is evaluated together with the other terms
+        if any(spec.normalizer == "face_scale" for spec in specs) and FACE_SCALE_TERM not in terms:
+            terms.append(FACE_SCALE_TERM)
+
+        self.a = np.array([t[1] for t in terms], dtype=int)
+        self.b = np.array([t[2] for t in terms], dtype=int)
+        self.is_dist = np.array([t[0] == "dist" for t in terms])
+        self.coef = np.zeros((len(specs), len(terms)))
+        for row, spec in enumerate(specs):
+            for weight, op, a, b in spec.terms:
+                self.coef[row, terms.index((op, a, b))] += weight
+        self.normalized = np.array([spec.normalizer == "face_scale" for spec in specs])
+        self.scale_index = terms.index(FACE_SCALE_TERM) if FACE_SCALE_TERM in terms else None
+
+    def compute(self, landmarks):
+        """
+        Args:
+            landmarks (np.array): (N, 3) landmark coordinates.
+
+        Returns:
+            np.array: One value per feature of this source.
+        """
+        delta = landmarks[self.a, :2] - landmarks[self.b, :2]
+        values = np.where(self.is_dist, np.sqrt(np.einsum("ij,ij->i", delta, delta)), delta[:, 1])
+        features = self.coef @ values
+        if self.scale_index is not None:
+            scale = max(values[self.scale_index], 1e-6)  # Prevent division by zero
+            features = np.where(self.normalized, features / scale, features)
+        return features
+
+
+_face_columns = [i for i, spec in enumerate(FEATURE_SPEC) if spec.source == "face"]
+_pose_columns = [i for i, spec in enumerate(FEATURE_SPEC) if spec.source == "pose"]
+_face_source = CompiledSource([FEATURE_SPEC[i] for i in _face_columns])
+_pose_source = CompiledSource([FEATURE_SPEC[i] for i in _pose_columns])
+
+
+def landmarks_to_array(landmark_list):
+    """
+    Converts a MediaPipe landmark list into an (N, 3) array of x, y, z coordinates.
+    """
+    return np.array([(lm.x, lm.y, lm.z) for lm in landmark_list.landmark], dtype=float)
+
+
+def compute_features(face_landmarks=None, pose_landmarks=None):
+    """
+    Computes the feature vector described by FEATURE_SPEC.
+
+    Args:
+        face_landmarks (np.array, optional): (468+, 3) FaceMesh landmarks, None if no face.
+        pose_landmarks (np.array, optional): (33, 3) Pose landmarks, None if no body.
+
+    Returns:
+        np.array: len(FEATURE_NAMES) values; features of a missing source are 0.
+    """
+    features = np.zeros(len(FEATURE_SPEC))
+    if face_landmarks is not None:
+        features[_face_columns] = _face_source.compute(face_landmarks)
+    if pose_landmarks is not None:
+        features[_pose_columns] = _pose_source.compute(pose_landmarks)
+    return features
+
+
+def csv_header():
+    """
+    Column names for dataset CSV files.
+    """
+    return FEATURE_NAMES + ["label"]
+
+
+def schema():
+    """
+    Description of the input a classifier trained on these features expects.
+
+    Returns:
+        dict: Schema version and feature names.
+    """
+    return {"version": FEATURE_SCHEMA_VERSION, "feature_names": list(FEATURE_NAMES)}
+
+
+def check_model_schema(model, feature_names=None):
+    """
+    Verifies that a fitted model expects the features produced by FEATURE_SPEC
+    (or by another feature layout, e.g. TEMPORAL_FEATURE_NAMES).
+
+    Raises:
+        ValueError: If the number of model inputs does not match the spec.
+    """
+    feature_names = FEATURE_NAMES if feature_names is None else feature_names
+    expected = getattr(model, "n_features_in_", None)
+    if expected is not None and expected != len(feature_names):
+        raise ValueError(
+            f"Model expects {expected} features but the feature spec produces "
+            f"{len(feature_names)}: {', '.join(feature_names)}"
+        )
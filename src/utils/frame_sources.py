@@ -0,0 +1,85 @@
+import time
+import cv2
+import numpy as np
+
+# Frame sources with the subset of the cv2.VideoCapture interface FrameGrabber uses
+# (read / release), so a session can be fed by a webcam, a recorded video or a synthetic stream.
+
+
+class VideoFileSource:
+    """
+    Plays a video file at its native frame rate (or `fps`), looping at the end, like a live camera.
+    """
+
+    def __init__(self, path, fps=None, loop=True):
+        self.path = path
+        self.cap = cv2.VideoCapture(path)
+        if not self.cap.isOpened():
+            raise FileNotFoundError(f"Could not open video '{path}'.")
+        self.fps = fps or self.cap.get(cv2.CAP_PROP_FPS) or 30.0
+        self.loop = loop
+        self._next = time.monotonic()
+
+    def read(self):
+        # Pace frames so a session sees the same frame rate as with a camera
+        delay = self._next - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        self._next = max(self._next, time.monotonic() - 1.0) + 1.0 / self.fps
+
+        ret, frame = self.cap.read()
+        if not ret and self.loop:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.cap.read()
+        return ret, frame
+
+    def release(self):
+        self.cap.release()
+
+
+class SyntheticSource:
+    """
+    Generated frames (a moving gradient with noise) at a fixed rate, for load tests without
+    cameras or recordings. MediaPipe finds no face in them, so features are all zero, but
+    the per-frame cost of the whole pipeline is exercised.
+    """
+
+    def __init__(self, width=640, height=480, fps=30.0, n_frames=30, seed=0):
+        self.fps = fps
+        # Frames are generated once and cycled, so many sources can run without using the CPU
+        rng = np.random.default_rng(seed)
+        base = np.linspace(0, 255, width, dtype=np.float32)[None, :, None].repeat(height, axis=0).repeat(3, axis=2)
+        self._frames = [
+            np.clip(np.roll(base, i * width // n_frames, axis=1) + rng.normal(0, 8, (height, width, 1)), 0, 255).astype(np.uint8)
+            for i in range(n_frames)
+        ]
+        self._index = 0
+        self._next = time.monotonic()
+
+    def read(self):
+        delay = self._next - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        self._next = max(self._next, time.monotonic() - 1.0) + 1.0 / self.fps
+
+        frame = self._frames[self._index % len(self._frames)]
+        self._index += 1
+        return True, frame
+
+    def release(self):
+        pass
+
+
+def open_source(spec):
+    """
+    Opens a frame source from a string: "webcam" / "webcam:<index>", "video:<path>" or
+    "synthetic" / "synthetic:<fps>".
+    """
+    kind, _, argument = spec.partition(":")
+    if kind == "webcam":
+        return cv2.VideoCapture(int(argument or 0))
+    if kind == "video":
+        return VideoFileSource(argument)
+    if kind == "synthetic":
+        return SyntheticSource(fps=float(argument or 30.0))
+    raise ValueError(f"Unknown frame source '{spec}' (use webcam[:index], video:<path> or synthetic[:fps]).")
@@ -0,0 +1,148 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+import numpy as np
+from src.utils import tracing
+
+# Inference shared by many assistant sessions:
+#   ExtractionPool    MediaPipe feature extraction in worker processes (one extractor each)
+#   BatchedPredictor  collects classifier requests from all sessions into one predict_proba call
+
+
+_worker_extractor = None
+
+def _init_worker():
+    import cv2
+    cv2.setNumThreads(1)
+
+def _extract(frame):
+    global _worker_extractor
+    if _worker_extractor is None:
+        # Frames of different sessions interleave in a worker, so there is no tracking
+        # between consecutive frames: every frame is processed on its own
+        from src.utils.state_detection import FeatureExtractor
+        _worker_extractor = FeatureExtractor(static_image_mode=True)
+    start = time.perf_counter()
+    features, _ = _worker_extractor.process(frame)
+    return np.asarray(features, dtype=float), time.perf_counter() - start
+
+
+class ExtractionPool:
+    """
+    Process pool for feature extraction; each worker keeps its own FeatureExtractor.
+
+    Usage:
+        pool = ExtractionPool(workers=4)
+        features = pool.extract(frame)           # blocking
+        future = pool.submit(frame)              # Future of (features, seconds in worker)
+    """
+
+    def __init__(self, workers=None):
+        self.workers = workers or os.cpu_count()
+        self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker)
+
+    def submit(self, frame):
+        return self._executor.submit(_extract, frame)
+
+    def extract(self, frame):
+        features, seconds = self.submit(frame).result()
+        tracing.observe("extract_worker", seconds)
+        return features
+
+    def warm_up(self, height=480, width=640):
+        """
+        Builds the MediaPipe graphs in every worker by running blank frames through them.
+        """
+        blank = np.zeros((height, width, 3), dtype=np.uint8)
+        for future in [self.submit(blank) for _ in range(self.workers * 2)]:
+            future.result()
+        return self
+
+    def close(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+
+class BatchedPredictor:
+    """
+    Micro-batches predict_proba calls from many threads.
+
+    Requests wait at most `max_wait` seconds (or until `max_batch` are queued) and are then
+    answered by a single predict_proba call on the stacked feature vectors.
+    """
+
+    def __init__(self, model, max_batch=64, max_wait=0.005):
+        """
+        Args:
+            model: Classifier with predict_proba and classes_ (sklearn SVC or CompiledSVC).
+            max_batch (int): Maximum rows per predict_proba call.
+            max_wait (float): Seconds the first request of a batch waits for others.
+        """
+        self.model = model
+        self.classes = list(model.classes_)
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.batch_sizes = []
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="batched-predictor", daemon=True)
+        self._thread.start()
+
+    def submit(self, features):
+        """
+        Returns:
+            concurrent.futures.Future: Resolves to the class probabilities (aligned with self.classes).
+        """
+        future = Future()
+        self._queue.put((np.asarray(features, dtype=float), future))
+        return future
+
+    def predict_proba(self, features):
+        return self.submit(features).result()
+
+    def predict(self, features):
+        """
+        Returns:
+            tuple: (state, probabilities)
+        """
+        proba = self.predict_proba(features)
+        return self.classes[int(np.argmax(proba))], proba
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                try:
+                    item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._queue.put(None)
+                    break
+                batch.append(item)
+
+            self.batch_sizes.append(len(batch))
+            tracing.count("predict_requests", len(batch))
+            try:
+                with tracing.span("predict_batch"):
+                    probabilities = self.model.predict_proba(np.stack([features for features, _ in batch]))
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), proba in zip(batch, probabilities):
+                future.set_result(proba)
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+
+    def report(self):
+        if self.batch_sizes:
+            sizes = np.array(self.batch_sizes)
+            print(f" Classifier: {sizes.sum()} predictions in {len(sizes)} batches "
+                  f"(mean batch {sizes.mean():.1f}, max {sizes.max()})")
@@ -0,0 +1,135 @@
+import abc
+import asyncio
+import os
+import re
+
+
+class LLMBackend(abc.ABC):
+    """
+    Interface of a text generation backend.
+
+    Backends receive the conversation in Gemini's format (a list of {"role", "parts"} dicts)
+    and stream the reply as text chunks. A backend instance lives for the whole session, so
+    it can keep its client and connections open between turns.
+    """
+
+    name = "base"
+
+    @abc.abstractmethod
+    def stream(self, history):
+        """
+        Async generator yielding the reply text chunk by chunk.
+        """
+
+    async def aclose(self):
+        """
+        Releases client resources. Called once when the session ends.
+        """
+
+
+class GeminiBackend(LLMBackend):
+    """
+    Google Gemini backend using the async streaming API of google.generativeai.
+    """
+
+    name = "gemini"
+
+    def __init__(self, model_name="models/gemini-1.5-flash", api_key=None, request_timeout=30.0):
+        self.model_name = model_name
+        self.api_key = api_key or os.getenv("GEMINI_API_KEY")
+        self.request_timeout = request_timeout
+        self._model = None
+
+    def _get_model(self):
+        # The client (and its gRPC channel) is created once and reused for every turn
+        if self._model is None:
+            import google.generativeai as genai
+
+            genai.configure(api_key=self.api_key)
+            self._model = genai.GenerativeModel(self.model_name)
+        return self._model
+
+    async def stream(self, history):
+        response = await self._get_model().generate_content_async(
+            history, stream=True, request_options={"timeout": self.request_timeout}
+        )
+        async for chunk in response:
+            try:
+                text = chunk.text
+            except ValueError:
+                # Chunks without text parts (e.g. safety metadata only)
+                continue
+            if text:
+                yield text
+
+
+class LocalBackend(LLMBackend):
+    """
+    Deterministic offline stand-in for the language model.
+
+    The reply depends only on the last user prompt (state, style and the user's words), so
+    runs are reproducible without network access or an API key. Words are streamed one by
+    one with an optional delay to mimic token streaming.
+    """
+
+    name = "local"
+
+    STYLE_COMPLAINTS = ("don't understand", "do not understand", "confus", "too fast", "what do you mean", "huh")
+
+    def __init__(self, token_delay=0.0):
+        self.token_delay = token_delay
+
+    def reply_for(self, prompt, history=()):
+        """
+        Builds the full deterministic reply for a user prompt. The style is taken from the most
+        recent message that states it, since compacted prompts only mention it when it changes.
+        """
+        state = _match(r"The user (?:still )?appears (\w+)", prompt, "attentive")
+        style = "neutral"
+        for message in list(history) + [{"parts": [prompt]}]:
+            style = _match(r"preferred response style is: (.*?)\.\n", message["parts"][0], style)
+        said = _match(r'They just said: "(.*)"', prompt, "")
+
+        if state == "distracted":
+            reply = "Let's take a small pause together. Whenever you are ready, we can continue."
+        elif state == "confused":
+            reply = "No worries, let's go step by step. I'm here to help."
+        else:
+            reply = "That sounds lovely. Tell me a little more."
+        if said:
+            reply = f"You said \"{said}\". {reply}"
+        reply += f" (style: {style})"
+
+        if any(complaint in said.lower() for complaint in self.STYLE_COMPLAINTS):
+            reply += " [STYLE_CHANGE_REQUESTED]"
+        return reply
+
+    async def stream(self, history):
+        prompt = history[-1]["parts"][0] if history else ""
+        words = self.reply_for(prompt, history[:-1]).split(" ")
+        for i, word in enumerate(words):
+            if self.token_delay:
+                await asyncio.sleep(self.token_delay)
+            yield word if i == 0 else " " + word
+
+
+def _match(pattern, text, default):
+    match = re.search(pattern, text)
+    return match.group(1) if match else default
+
+
+BACKENDS = {
+    "gemini": GeminiBackend,
+    "local": LocalBackend,
+}
+
+
+def create_backend(name=None):
+    """
+    Creates a backend by name; defaults to the ASSISTANT_LLM_BACKEND environment variable,
+    then to Gemini.
+    """
+    name = name or os.getenv("ASSISTANT_LLM_BACKEND", "gemini")
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown LLM backend '{name}'. Available: {', '.join(BACKENDS)}")
+    return BACKENDS[name]()
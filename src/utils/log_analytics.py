@@ -0,0 +1,289 @@
+import datetime
+import gzip
+import json
+import os
+import numpy as np
+from src.utils.conversation_saving import log_jsonl_path, rotated_segments
+
+# Kinds of log records, derived from the "user_input" field main.py writes
+KIND_USER_TURN = 0
+KIND_SYSTEM_TRIGGER = 1      # "You seem ... would you like to try a different style?"
+KIND_STYLE_ANSWER = 2        # the user's yes/no to the question above
+KIND_STYLE_UPDATE = 3        # a new preferred style was stored
+KIND_FOLLOW_UP = 4           # assistant reply after the style check
+KIND_STATE_CONFIRMATION = 5  # the user's answer to "Were you really <state>?"
+
+_COLUMNS = {
+    "user": np.int32,
+    "state": np.int16,
+    "kind": np.int8,
+    "turn_id": np.int32,
+    "timestamp": np.float64,
+    "segment": np.int32,
+    "offset": np.int64,
+}
+
+
+def record_kind(user_input):
+    if user_input == "System trigger":
+        return KIND_SYSTEM_TRIGGER
+    if user_input == "User":
+        return KIND_STYLE_ANSWER
+    if user_input == "System trigger after style check":
+        return KIND_FOLLOW_UP
+    if user_input == "State confirmation":
+        return KIND_STATE_CONFIRMATION
+    if user_input.startswith("[User updated preferred style"):
+        return KIND_STYLE_UPDATE
+    return KIND_USER_TURN
+
+
+class LogIndex:
+    """
+    Compact columnar index over the JSONL conversation log and its rotated gzip segments.
+
+    Each record is reduced to a handful of integer/float columns (user code, state code,
+    record kind, turn id, timestamp and its location in the log), kept as NumPy arrays and
+    persisted next to the log. update() only parses segments it has not seen and the bytes
+    appended to the active log since the last call, so queries stay fast as logs grow.
+
+    Usage:
+        index = LogIndex().update()
+        print(index.transition_matrix())
+    """
+
+    def __init__(self, jsonl_path=log_jsonl_path, index_path=None):
+        self.jsonl_path = jsonl_path
+        self.index_path = index_path or jsonl_path + ".index.npz"
+        self.users = []
+        self.states = []
+        self.segments = []        # file names of indexed rotated segments; -1 = active log
+        self.active_offset = 0    # bytes of the active log already indexed
+        self.active_records = 0   # records indexed from the active log
+        self.columns = {name: np.empty(0, dtype=dtype) for name, dtype in _COLUMNS.items()}
+        if os.path.exists(self.index_path):
+            self._load()
+
+    # --- persistence ---
+
+    def _load(self):
+        with np.load(self.index_path, allow_pickle=False) as data:
+            meta = json.loads(str(data["meta"]))
+            self.columns = {name: data[name] for name in _COLUMNS}
+        self.users = meta["users"]
+        self.states = meta["states"]
+        self.segments = meta["segments"]
+        self.active_offset = meta["active_offset"]
+        self.active_records = meta["active_records"]
+
+    def save(self):
+        meta = {
+            "users": self.users, "states": self.states, "segments": self.segments,
+            "active_offset": self.active_offset, "active_records": self.active_records,
+        }
+        tmp_path = self.index_path + ".tmp.npz"
+        np.savez(tmp_path, meta=np.array(json.dumps(meta)), **self.columns)
+        os.replace(tmp_path, self.index_path)
+
+    # --- indexing ---
+
+    def _code(self, vocabulary, value):
+        try:
+            return vocabulary.index(value)
+        except ValueError:
+            vocabulary.append(value)
+            return len(vocabulary) - 1
+
+    def _parse_lines(self, lines, segment, start_offset):
+        rows = {name: [] for name in _COLUMNS}
+        user_codes = {u: i for i, u in enumerate(self.users)}
+        state_codes = {s: i for i, s in enumerate(self.states)}
+        offset = start_offset
+        for line in lines:
+            line_offset = offset
+            offset += len(line)
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            user = record["user_id"]
+            if user not in user_codes:
+                user_codes[user] = self._code(self.users, user)
+            state = record["state"]
+            if state not in state_codes:
+                state_codes[state] = self._code(self.states, state)
+            rows["user"].append(user_codes[user])
+            rows["state"].append(state_codes[state])
+            rows["kind"].append(record_kind(record.get("user_input", "")))
+            rows["turn_id"].append(record.get("turn_id", 0))
+            rows["timestamp"].append(datetime.datetime.fromisoformat(record["timestamp"]).timestamp())
+            rows["segment"].append(segment)
+            rows["offset"].append(line_offset)
+        return rows
+
+    def _append(self, rows):
+        for name, dtype in _COLUMNS.items():
+            self.columns[name] = np.concatenate([self.columns[name], np.asarray(rows[name], dtype=dtype)])
+
+    def update(self, save=True):
+        """
+        Indexes new rotated segments and newly appended bytes of the active log.
+
+        Returns:
+            LogIndex: self, for chaining.
+        """
+        for path in rotated_segments(self.jsonl_path):
+            name = os.path.basename(path)
+            if name in self.segments:
+                continue
+            segment = len(self.segments)
+            self.segments.append(name)
+            with gzip.open(path, "rb") as f:
+                lines = f.readlines()
+            # The segment starts with the records that were indexed while it was the active log
+            if self.active_records:
+                active = self.columns["segment"] == -1
+                moved = np.flatnonzero(active)[:self.active_records]
+                self.columns["segment"][moved] = segment
+                offsets = np.cumsum([0] + [len(line) for line in lines[:self.active_records]])[:-1]
+                self.columns["offset"][moved] = offsets
+                skipped = sum(len(line) for line in lines[:self.active_records])
+                self._append(self._parse_lines(lines[self.active_records:], segment, skipped))
+                self.active_records = 0
+                self.active_offset = 0
+            else:
+                self._append(self._parse_lines(lines, segment, 0))
+
+        if os.path.exists(self.jsonl_path):
+            size = os.path.getsize(self.jsonl_path)
+            if size < self.active_offset:
+                # The log was replaced without a rotated segment we could recognize: re-index it
+                keep = self.columns["segment"] != -1
+                self.columns = {name: column[keep] for name, column in self.columns.items()}
+                self.active_offset = 0
+                self.active_records = 0
+            with open(self.jsonl_path, "rb") as f:
+                f.seek(self.active_offset)
+                data = f.read()
+            # Only complete lines; a record still being written is picked up next time
+            complete = data[:data.rfind(b"\n") + 1]
+            if complete:
+                lines = complete.splitlines(keepends=True)
+                rows = self._parse_lines(lines, -1, self.active_offset)
+                self._append(rows)
+                self.active_records += len(rows["user"])
+                self.active_offset += len(complete)
+
+        if save:
+            self.save()
+        return self
+
+    def __len__(self):
+        return len(self.columns["user"])
+
+    def record(self, i):
+        """
+        Reads the full JSON record for row i from the log.
+        """
+        segment, offset = int(self.columns["segment"][i]), int(self.columns["offset"][i])
+        if segment == -1:
+            with open(self.jsonl_path, "rb") as f:
+                f.seek(offset)
+                return json.loads(f.readline())
+        path = os.path.join(os.path.dirname(os.path.abspath(self.jsonl_path)), self.segments[segment])
+        with gzip.open(path, "rb") as f:
+            f.seek(offset)
+            return json.loads(f.readline())
+
+    # --- queries ---
+
+    def _ordered(self, user=None):
+        """
+        Row indices sorted by user then time, optionally restricted to one user.
+        """
+        rows = np.arange(len(self))
+        if user is not None:
+            if user not in self.users:
+                return rows[:0]
+            rows = rows[self.columns["user"] == self.users.index(user)]
+        order = np.lexsort((self.columns["timestamp"][rows], self.columns["user"][rows]))
+        return rows[order]
+
+    def _consecutive_pairs(self, rows):
+        """
+        (previous, next) row pairs of the same user within the same session. A new session
+        starts when the turn counter goes back down.
+        """
+        prev, nxt = rows[:-1], rows[1:]
+        same = (self.columns["user"][prev] == self.columns["user"][nxt]) & \
+               (self.columns["turn_id"][nxt] > self.columns["turn_id"][prev])
+        return prev[same], nxt[same]
+
+    def user_rows(self, user):
+        """
+        Row indices (in time order) of one user's records.
+        """
+        return self._ordered(user)
+
+    def transition_matrix(self, user=None, normalize=True):
+        """
+        State transition matrix between consecutive user turns.
+
+        Returns:
+            tuple: (matrix, states) where matrix[i, j] counts (or, normalized, is the share of)
+            transitions from states[i] to states[j].
+        """
+        rows = self._ordered(user)
+        rows = rows[self.columns["kind"][rows] == KIND_USER_TURN]
+        prev, nxt = self._consecutive_pairs(rows)
+        n = len(self.states)
+        matrix = np.zeros((n, n))
+        np.add.at(matrix, (self.columns["state"][prev], self.columns["state"][nxt]), 1)
+        if normalize:
+            totals = matrix.sum(axis=1, keepdims=True)
+            matrix = np.divide(matrix, totals, out=np.zeros_like(matrix), where=totals > 0)
+        return matrix, list(self.states)
+
+    def style_change_rates(self):
+        """
+        Share of user turns directly followed by a style-change trigger, per user and state.
+
+        Returns:
+            dict: {user: {state: (triggers, turns, rate)}}
+        """
+        rows = self._ordered()
+        prev, nxt = self._consecutive_pairs(rows)
+        turn_rows = rows[self.columns["kind"][rows] == KIND_USER_TURN]
+        triggered = prev[(self.columns["kind"][prev] == KIND_USER_TURN) & (self.columns["kind"][nxt] == KIND_SYSTEM_TRIGGER)]
+
+        shape = (len(self.users), len(self.states))
+        turns = np.zeros(shape, dtype=int)
+        triggers = np.zeros(shape, dtype=int)
+        np.add.at(turns, (self.columns["user"][turn_rows], self.columns["state"][turn_rows]), 1)
+        np.add.at(triggers, (self.columns["user"][triggered], self.columns["state"][triggered]), 1)
+
+        rates = {}
+        for u, s in zip(*np.nonzero(turns)):
+            rates.setdefault(self.users[u], {})[self.states[s]] = (
+                int(triggers[u, s]), int(turns[u, s]), float(triggers[u, s] / turns[u, s])
+            )
+        return rates
+
+    def turn_latencies(self, user=None):
+        """
+        Seconds between consecutive records of the same session (user typing + model time).
+        """
+        prev, nxt = self._consecutive_pairs(self._ordered(user))
+        return self.columns["timestamp"][nxt] - self.columns["timestamp"][prev]
+
+    def latency_distribution(self, user=None, percentiles=(50, 90, 95, 99)):
+        """
+        Returns:
+            dict: count, mean and the requested percentiles of turn latency in seconds.
+        """
+        latencies = self.turn_latencies(user)
+        if not len(latencies):
+            return {"count": 0}
+        summary = {"count": int(len(latencies)), "mean": float(latencies.mean())}
+        for p, value in zip(percentiles, np.percentile(latencies, percentiles)):
+            summary[f"p{p}"] = float(value)
+        return summary
@@ -1,50 +1,302 @@
+import atexit
 import json
+import os
+import sqlite3
+import tempfile
+import threading
+from src.utils import tracing
+
+try:
+    import fcntl
+except ImportError:  # Windows: writers are not serialized across processes
+    fcntl = None
 
 MEMORY_FILE = "user_memory.json"
 
+# Returned when no preference is stored for a user/state
+DEFAULT_STYLE = "neutral"
+DEFAULT_EXAMPLE = "Let's keep going!"
+
+
+class JSONPreferenceStore:
+    """
+    Preference store backed by the JSON memory file.
+
+    Reads are served from an in-process copy that is only re-parsed when the file's
+    modification time changes (e.g. another session wrote it). Updates are applied to the
+    copy immediately and written back in the background ("write-behind"): each flush
+    re-reads the latest file, merges the pending updates on top, and atomically replaces
+    the file, so concurrent sessions never leave it half-written or lose each other's updates.
+    """
+
+    def __init__(self, path=MEMORY_FILE, flush_delay=1.0):
+        """
+        Args:
+            path (str): JSON memory file.
+            flush_delay (float): Seconds to wait after an update before writing, so bursts of
+                updates cost one write. 0 writes synchronously.
+        """
+        self.path = path
+        self.flush_delay = flush_delay
+        self._data = {}
+        self._stamp = None
+        self._dirty = {}
+        self._lock = threading.RLock()
+        self._timer = None
+        atexit.register(self.close)
+
+    def _file_stamp(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _read_file(self):
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def _refresh(self):
+        stamp = self._file_stamp()
+        if stamp != self._stamp:
+            self._data = self._read_file()
+            self._stamp = stamp
+            # Updates not flushed yet take precedence over what is on disk
+            for (user_id, state), entry in self._dirty.items():
+                self._data.setdefault(user_id, {})[state] = entry
+
+    def get(self, user_id, state):
+        """
+        Returns:
+            tuple: (preferred_style, example_response), with defaults if nothing is stored.
+        """
+        with self._lock:
+            self._refresh()
+            user_data = self._data.get(user_id, {}).get(state, {})
+            return user_data.get("preferred_style", DEFAULT_STYLE), user_data.get("example_response", DEFAULT_EXAMPLE)
+
+    def set(self, user_id, state, new_style, new_example):
+        """
+        Stores a preference; it is visible immediately and persisted by the next flush.
+        """
+        entry = {"preferred_style": new_style, "example_response": new_example}
+        with self._lock:
+            self._refresh()
+            self._data.setdefault(user_id, {})[state] = entry
+            self._dirty[(user_id, state)] = entry
+            if self.flush_delay <= 0:
+                self.flush()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.flush_delay, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        """
+        Writes pending updates to disk atomically (temporary file + rename).
+        """
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._dirty:
+                return
+
+            directory = os.path.dirname(os.path.abspath(self.path))
+            with open(os.path.join(directory, os.path.basename(self.path) + ".lock"), "w") as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                # Merge with the latest content, which may include other sessions' updates
+                memory = self._read_file()
+                for (user_id, state), entry in self._dirty.items():
+                    memory.setdefault(user_id, {})[state] = entry
+
+                fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".user_memory.", suffix=".tmp")
+                try:
+                    with os.fdopen(fd, 'w') as f:
+                        json.dump(memory, f, indent=2)
+                        f.flush()
+                        os.fsync(f.fileno())
+                    os.replace(tmp_path, self.path)
+                except BaseException:
+                    os.unlink(tmp_path)
+                    raise
+
+            self._data = memory
+            self._stamp = self._file_stamp()
+            self._dirty.clear()
+
+    def close(self):
+        self.flush()
+
+
+class SQLitePreferenceStore:
+    """
+    Preference store backed by SQLite, indexed by (user_id, state).
+
+    Lookups touch a single row instead of the whole file. Recently read rows are cached in
+    process and the cache is dropped whenever another connection commits a change
+    (detected through PRAGMA data_version). Updates are batched and committed in one
+    transaction after `flush_delay` seconds.
+    """
+
+    def __init__(self, path="user_memory.sqlite", flush_delay=1.0):
+        self.path = path
+        self.flush_delay = flush_delay
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS preferences ("
+            " user_id TEXT NOT NULL, state TEXT NOT NULL,"
+            " preferred_style TEXT NOT NULL, example_response TEXT NOT NULL,"
+            " PRIMARY KEY (user_id, state))"
+        )
+        self._conn.commit()
+        self._cache = {}
+        self._dirty = {}
+        self._data_version = None
+        self._lock = threading.RLock()
+        self._timer = None
+        atexit.register(self.close)
+
+    def _refresh(self):
+        version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if version != self._data_version:
+            self._cache.clear()
+            self._data_version = version
+
+    def get(self, user_id, state):
+        """
+        Returns:
+            tuple: (preferred_style, example_response), with defaults if nothing is stored.
+        """
+        key = (user_id, state)
+        with self._lock:
+            if key in self._dirty:
+                return self._dirty[key]
+            self._refresh()
+            if key not in self._cache:
+                row = self._conn.execute(
+                    "SELECT preferred_style, example_response FROM preferences WHERE user_id = ? AND state = ?", key
+                ).fetchone()
+                self._cache[key] = tuple(row) if row else (DEFAULT_STYLE, DEFAULT_EXAMPLE)
+            return self._cache[key]
+
+    def set(self, user_id, state, new_style, new_example):
+        with self._lock:
+            self._dirty[(user_id, state)] = (new_style, new_example)
+            if self.flush_delay <= 0:
+                self.flush()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.flush_delay, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._dirty:
+                return
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO preferences (user_id, state, preferred_style, example_response) VALUES (?, ?, ?, ?)",
+                    [(user_id, state, style, example) for (user_id, state), (style, example) in self._dirty.items()],
+                )
+            self._cache.update(self._dirty)
+            self._dirty.clear()
+            # Our own commit changes nothing that needs invalidating
+            self._data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def import_json(self, json_path=MEMORY_FILE):
+        """
+        Imports every preference from a JSON memory file (existing rows are overwritten).
+
+        Returns:
+            int: Number of imported (user, state) entries.
+        """
+        with open(json_path, 'r') as f:
+            memory = json.load(f)
+        rows = [
+            (user_id, state, entry.get("preferred_style", DEFAULT_STYLE), entry.get("example_response", DEFAULT_EXAMPLE))
+            for user_id, states in memory.items()
+            for state, entry in states.items()
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO preferences (user_id, state, preferred_style, example_response) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            self._cache.clear()
+        return len(rows)
+
+    def close(self):
+        with self._lock:
+            if self._conn is None:
+                return
+            self.flush()
+            self._conn.close()
+            self._conn = None
+
+
+def create_store(backend=None):
+    """
+    Creates the preference store selected by `backend` or the ASSISTANT_PREFERENCE_STORE
+    environment variable: 'json' (default, user_memory.json) or 'sqlite' (user_memory.sqlite,
+    seeded from user_memory.json the first time).
+    """
+    backend = backend or os.getenv("ASSISTANT_PREFERENCE_STORE", "json")
+    if backend == "json":
+        return JSONPreferenceStore(MEMORY_FILE)
+    if backend == "sqlite":
+        path = "user_memory.sqlite"
+        is_new = not os.path.exists(path)
+        store = SQLitePreferenceStore(path)
+        if is_new and os.path.exists(MEMORY_FILE):
+            store.import_json(MEMORY_FILE)
+        return store
+    raise ValueError(f"Unknown preference store '{backend}' (expected 'json' or 'sqlite').")
+
+
+# Store used by the module-level functions, created on first use
+_store = None
+_store_lock = threading.Lock()
+
+def get_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = create_store()
+        return _store
+
 def load_preference(user_id, state):
     """
     Loads the user's preferred response style and example for a given cognitive state.
-    
+
     Args:
         user_id (str): The identifier of the user.
         state (str): The cognitive state (e.g., "confused", "attentive").
-    
+
     Returns:
         tuple: (preferred_style, example_response)
     """
-    with open(MEMORY_FILE, 'r') as f:
-        memory = json.load(f)
-    
-    user_data = memory.get(user_id, {}).get(state, {})
-    
-    # Return default values if no preferences are stored
-    return user_data.get("preferred_style", "neutral"), user_data.get("example_response", "Let's keep going!")
+    with tracing.span("memory_load"):
+        return get_store().get(user_id, state)
 
 def update_preference(user_id, state, new_style, new_example):
     """
     Updates the user's preferred response style and example for a specific cognitive state.
     Creates entries if they don't already exist.
-    
+
     Args:
         user_id (str): The identifier of the user.
         state (str): The cognitive state to update.
         new_style (str): New preferred communication style (e.g., "calm", "step-by-step").
         new_example (str): Example response in that style.
     """
-    with open(MEMORY_FILE, 'r') as f:
-        memory = json.load(f)
-
-    # Ensure user section exists
-    if user_id not in memory:
-        memory[user_id] = {}
-
-    # Update the preference for the given state
-    memory[user_id][state] = {
-        "preferred_style": new_style,
-        "example_response": new_example,
-    }
-
-    # Save updated memory
-    with open(MEMORY_FILE, 'w') as f:
-        json.dump(memory, f, indent=2)
\ No newline at end of file
+    with tracing.span("memory_update"):
+        get_store().set(user_id, state, new_style, new_example)
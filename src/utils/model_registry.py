@@ -0,0 +1,258 @@
+import datetime
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import numpy as np
+from src.utils.fast_predictor import CompiledSVC, export_predictor
+
+try:
+    import fcntl
+except ImportError:  # Windows: registrations are not serialized across processes
+    fcntl = None
+
+# Versioned store of trained classifiers.
+#
+# Layout of a registry directory:
+#   PROMOTED              name of the version the assistant should use (replaced atomically)
+#   v0001/model.joblib    the fitted estimator
+#   v0001/model.npz       NumPy-only export (SVC only), loaded without scikit-learn in milliseconds
+#   v0001/meta.json       feature schema, training-data hash, metrics, parameters, created_at
+#
+# A version directory is written under a temporary name and renamed into place, so readers
+# never see a partial artifact. ModelWatcher loads newly promoted versions on a background
+# thread; the assistant swaps them in between turns.
+
+PROMOTED = "PROMOTED"
+
+
+class ModelRegistry:
+    """
+    Usage:
+        registry = ModelRegistry("models")
+        version = registry.register(model, schema(), data_hash=..., metrics={"test_accuracy": 0.91})
+        registry.promote(version)
+        model, meta = registry.load()          # the promoted version
+    """
+
+    def __init__(self, root="models"):
+        self.root = root
+
+    def _version_dir(self, version):
+        return os.path.join(self.root, version)
+
+    def _locked(self):
+        os.makedirs(self.root, exist_ok=True)
+        lock_file = open(os.path.join(self.root, "registry.lock"), "w")
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        return lock_file
+
+    def versions(self):
+        """
+        Returns:
+            list: Registered version names, oldest first.
+        """
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name for name in os.listdir(self.root)
+                      if name.startswith("v") and os.path.exists(os.path.join(self.root, name, "meta.json")))
+
+    def meta(self, version):
+        with open(os.path.join(self._version_dir(version), "meta.json")) as f:
+            return json.load(f)
+
+    def register(self, model, schema, data_hash=None, metrics=None, params=None, promote=False):
+        """
+        Stores a fitted model as a new version.
+
+        Args:
+            model: Fitted classifier (sklearn estimator; SVCs also get a NumPy-only export).
+            schema (dict): Feature schema the model was trained on (feature_spec.schema()).
+            data_hash (str, optional): Hash of the training data.
+            metrics (dict, optional): Evaluation results, e.g. {"cv_accuracy": ..., "test_accuracy": ...}.
+            params (dict, optional): Hyperparameters and training options.
+            promote (bool): Make it the promoted version right away.
+
+        Returns:
+            str: The new version name.
+        """
+        import joblib
+
+        n_features = getattr(model, "n_features_in_", None)
+        if n_features is not None and n_features != len(schema["feature_names"]):
+            raise ValueError(f"Model expects {n_features} features but the schema lists {len(schema['feature_names'])}.")
+
+        with self._locked():
+            existing = self.versions()
+            version = f"v{int(existing[-1][1:]) + 1 if existing else 1:04d}"
+            tmp_dir = tempfile.mkdtemp(dir=self.root, prefix=f".{version}.")
+            try:
+                joblib.dump(model, os.path.join(tmp_dir, "model.joblib"))
+                compiled = getattr(model, "kernel", None) == "rbf"
+                if compiled:
+                    export_predictor(model, os.path.join(tmp_dir, "model.npz"))
+                meta = {
+                    "version": version,
+                    "created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+                    "schema": schema,
+                    "classes": [str(c) for c in model.classes_],
+                    "data_hash": data_hash,
+                    "metrics": metrics or {},
+                    "params": params or {},
+                    "compiled": compiled,
+                }
+                with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+                    json.dump(meta, f, indent=2, default=str)
+                os.rename(tmp_dir, self._version_dir(version))
+            except BaseException:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+                raise
+        if promote:
+            self.promote(version)
+        return version
+
+    def promoted(self):
+        """
+        Returns:
+            str or None: The promoted version.
+        """
+        try:
+            with open(os.path.join(self.root, PROMOTED)) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def promote(self, version):
+        if version not in self.versions():
+            raise ValueError(f"Unknown model version '{version}'. Registered: {', '.join(self.versions()) or 'none'}")
+        with self._locked():
+            fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix=".promoted.", suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                f.write(version + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, os.path.join(self.root, PROMOTED))
+
+    def load(self, version=None, expected_schema=None):
+        """
+        Loads a version (default: the promoted one). The NumPy-only export is used when present,
+        so scikit-learn is only imported for other model types.
+
+        Args:
+            expected_schema (dict, optional): Schema the caller produces; a mismatch raises ValueError.
+
+        Returns:
+            tuple: (model, meta)
+        """
+        version = version or self.promoted()
+        if version is None:
+            raise FileNotFoundError(f"No promoted model in '{self.root}'.")
+        meta = self.meta(version)
+        if expected_schema is not None:
+            check_schema(meta, expected_schema)
+        directory = self._version_dir(version)
+        if meta.get("compiled"):
+            model = CompiledSVC.load(os.path.join(directory, "model.npz"))
+        else:
+            import joblib
+            model = joblib.load(os.path.join(directory, "model.joblib"))
+        return model, meta
+
+
+def check_schema(meta, expected_schema):
+    """
+    Raises:
+        ValueError: If a registered model was trained on other features than expected_schema.
+    """
+    trained = meta["schema"]
+    if trained["feature_names"] != expected_schema["feature_names"] or trained.get("version") != expected_schema.get("version"):
+        missing = [n for n in expected_schema["feature_names"] if n not in trained["feature_names"]]
+        extra = [n for n in trained["feature_names"] if n not in expected_schema["feature_names"]]
+        raise ValueError(
+            f"Model {meta['version']} was trained on feature schema v{trained.get('version')} "
+            f"({len(trained['feature_names'])} features) but v{expected_schema.get('version')} "
+            f"({len(expected_schema['feature_names'])} features) is produced"
+            + (f"; missing: {', '.join(missing)}" if missing else "")
+            + (f"; unexpected: {', '.join(extra)}" if extra else "")
+        )
+
+
+class ModelWatcher:
+    """
+    Polls the registry for a newly promoted version and loads it on a background thread
+    (schema check and one warm-up prediction included). The caller picks it up with swap()
+    at a safe point, e.g. between turns, so frames and turns are never blocked by loading.
+
+    Usage:
+        watcher = ModelWatcher(registry, schema(), current_version).start()
+        ...
+        update = watcher.swap()      # None, or (model, meta)
+    """
+
+    def __init__(self, registry, expected_schema, current_version=None, interval=2.0):
+        self.registry = registry
+        self.expected_schema = expected_schema
+        self.current_version = current_version
+        self.interval = interval
+        self.errors = []
+        self._pending = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="model-watcher", daemon=True)
+        self._thread.start()
+        return self
+
+    def check(self):
+        """
+        Loads the promoted version if it is new. Returns True when an update is pending.
+        """
+        version = self.registry.promoted()
+        with self._lock:
+            known = self._pending[1]["version"] if self._pending else self.current_version
+        if version is None or version == known or version in self.errors:
+            return self._pending is not None
+        try:
+            start = time.perf_counter()
+            model, meta = self.registry.load(version, self.expected_schema)
+            model.predict_proba(np.zeros((1, len(self.expected_schema["feature_names"]))))
+            meta["load_seconds"] = time.perf_counter() - start
+        except Exception as e:
+            # A bad promotion (schema mismatch, truncated artifact, ...) must not take the
+            # assistant down; keep the current model and skip this version from now on
+            self.errors.append(version)
+            print(f"\n Model {version} was not loaded: {type(e).__name__}: {e}")
+            return self._pending is not None
+        with self._lock:
+            self._pending = (model, meta)
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                # e.g. an unreadable PROMOTED file; try again at the next poll
+                print(f"\n Model registry check failed: {type(e).__name__}: {e}")
+
+    def swap(self):
+        """
+        Returns:
+            tuple or None: (model, meta) of a newly loaded version, handed out once.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, None
+            if pending is not None:
+                self.current_version = pending[1]["version"]
+        return pending
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
@@ -0,0 +1,123 @@
+import numpy as np
+
+# Confidence-gated observation windows.
+#
+# Instead of classifying one frame after a fixed wait, every frame seen during the window is
+# classified and the class probabilities are smoothed with an exponential moving average.
+# The window closes as soon as the smoothed probability of one class reaches `threshold`
+# (after at least `min_seconds` and `min_frames`), and at the latest after `max_seconds`,
+# which extends the old fixed window when the signal stays ambiguous.
+#
+#   observer = AdaptiveObserver(classes)
+#   observer.start(clock.time())
+#   while not observer.done(clock.time()):
+#       observer.update(predict_proba(next_frame()), clock.time())
+#   observation = observer.result()          # state, confidence, seconds, frames, early
+
+
+class Observation:
+    def __init__(self, state, confidence, seconds, frames, early, probabilities):
+        self.state = state
+        self.confidence = confidence
+        self.seconds = seconds
+        self.frames = frames
+        self.early = early
+        self.probabilities = probabilities
+
+    def to_dict(self):
+        """
+        Fields stored with the log record of the turn.
+        """
+        return {"state": self.state, "confidence": round(self.confidence, 4), "seconds": round(self.seconds, 3),
+                "frames": self.frames, "early": self.early}
+
+    def __repr__(self):
+        return (f"Observation({self.state}, confidence={self.confidence:.2f}, seconds={self.seconds:.2f}, "
+                f"frames={self.frames}, early={self.early})")
+
+
+def observation_fields(pre, post):
+    """
+    Extra fields of a turn's log record: how the pre- and post-response states were decided.
+
+    Args:
+        pre (Observation): Observation behind the state the reply was generated for.
+        post (Observation or None): Observation after the reply (None when none was made).
+    """
+    return {"observation": {
+        "pre": pre.to_dict() if pre is not None else None,
+        "post": post.to_dict() if post is not None else None,
+    }}
+
+
+class AdaptiveObserver:
+    """
+    Exponentially smoothed class probabilities over an observation window with early stopping.
+    """
+
+    def __init__(self, classes, alpha=0.3, threshold=0.8, min_seconds=1.0, max_seconds=12.0, min_frames=5):
+        """
+        Args:
+            classes (list): Class names aligned with the probabilities passed to update().
+            alpha (float): Weight of the newest frame in the moving average.
+            threshold (float): Smoothed probability at which the window closes early.
+            min_seconds (float): The window never closes before this.
+            max_seconds (float): The window always closes after this.
+            min_frames (int): Frames needed before the window may close early.
+        """
+        self.classes = list(classes)
+        self.alpha = alpha
+        self.threshold = threshold
+        self.min_seconds = min_seconds
+        self.max_seconds = max_seconds
+        self.min_frames = min_frames
+        self.start()
+
+    def start(self, now=0.0):
+        self.started = now
+        self.smoothed = None
+        self.frames = 0
+        self.decided_at = None
+
+    def update(self, probabilities, now):
+        """
+        Adds the class probabilities of one frame.
+
+        Returns:
+            bool: True once the window is closed.
+        """
+        probabilities = np.asarray(probabilities, dtype=float)
+        if self.smoothed is None:
+            self.smoothed = probabilities.copy()
+        else:
+            self.smoothed = self.alpha * probabilities + (1 - self.alpha) * self.smoothed
+        self.frames += 1
+        return self.done(now)
+
+    def confidence(self):
+        return float(self.smoothed.max()) if self.smoothed is not None else 0.0
+
+    def done(self, now):
+        if self.decided_at is not None:
+            return True
+        elapsed = now - self.started
+        confident = (self.frames >= self.min_frames and elapsed >= self.min_seconds
+                     and self.confidence() >= self.threshold)
+        if confident or elapsed >= self.max_seconds:
+            self.decided_at = now
+            return True
+        return False
+
+    def result(self):
+        """
+        Returns:
+            Observation or None: The decision (None when no frame was classified).
+        """
+        if self.smoothed is None:
+            return None
+        end = self.decided_at if self.decided_at is not None else self.started
+        seconds = end - self.started
+        return Observation(
+            self.classes[int(np.argmax(self.smoothed))], self.confidence(), seconds, self.frames,
+            early=seconds < self.max_seconds, probabilities=self.smoothed.copy(),
+        )
@@ -0,0 +1,184 @@
+import os
+import numpy as np
+from src.utils import tracing
+
+# Per-user adaptation on top of the shared classifier.
+#
+# The shared (base) model is never retrained. Each user gets a tiny adapter:
+#   - running mean/variance of their features (per-user normalization), and
+#   - a residual softmax head: logits = log(p_base) + W @ [p_base, z] + b,
+#     where z are the user-normalized features.
+# W and b start at zero, so a new adapter reproduces the base model exactly. Every confirmed
+# label applies a few SGD steps on the cross-entropy, which takes microseconds, and the
+# adapter is stored as a few hundred bytes per user.
+
+
+class UserAdapter:
+    """
+    Lightweight per-user correction of the base model's class probabilities.
+    """
+
+    def __init__(self, n_classes, n_features, learning_rate=0.1, l2=1e-3, steps=5, min_observations=10):
+        """
+        Args:
+            n_classes (int): Number of classes of the base model.
+            n_features (int): Size of the feature vector.
+            learning_rate (float): SGD step size.
+            l2 (float): Weight decay keeping the adapter close to the base model.
+            steps (int): SGD steps per confirmed label.
+            min_observations (int): Frames needed before per-user normalization is used.
+        """
+        self.learning_rate = learning_rate
+        self.l2 = l2
+        self.steps = steps
+        self.min_observations = min_observations
+        self.W = np.zeros((n_classes, n_classes + n_features))
+        self.b = np.zeros(n_classes)
+        self.count = 0
+        self.mean = np.zeros(n_features)
+        self.m2 = np.zeros(n_features)
+        self.n_updates = 0
+
+    def observe(self, features):
+        """
+        Updates the user's running feature statistics (Welford's algorithm).
+        """
+        self.count += 1
+        delta = features - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (features - self.mean)
+
+    def normalize(self, features):
+        if self.count < self.min_observations:
+            return np.zeros_like(features)
+        std = np.sqrt(self.m2 / (self.count - 1))
+        return (features - self.mean) / np.maximum(std, 1e-6)
+
+    def _inputs(self, features, base_proba):
+        return np.concatenate([base_proba, self.normalize(features)])
+
+    def _proba(self, inputs, base_proba):
+        logits = np.log(np.maximum(base_proba, 1e-12)) + self.W @ inputs + self.b
+        logits -= logits.max()
+        exp = np.exp(logits)
+        return exp / exp.sum()
+
+    def predict_proba(self, features, base_proba):
+        return self._proba(self._inputs(features, base_proba), base_proba)
+
+    def update(self, features, base_proba, label_index):
+        """
+        Learns from one confirmed label.
+        """
+        inputs = self._inputs(features, base_proba)
+        target = np.zeros(len(self.b))
+        target[label_index] = 1.0
+        for _ in range(self.steps):
+            grad = self._proba(inputs, base_proba) - target
+            self.W -= self.learning_rate * (np.outer(grad, inputs) + self.l2 * self.W)
+            self.b -= self.learning_rate * grad
+        self.n_updates += 1
+
+    def to_arrays(self):
+        return {
+            "W": self.W, "b": self.b, "count": np.array(self.count), "mean": self.mean,
+            "m2": self.m2, "n_updates": np.array(self.n_updates),
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays, **kwargs):
+        n_classes = len(arrays["b"])
+        adapter = cls(n_classes, arrays["W"].shape[1] - n_classes, **kwargs)
+        adapter.W = arrays["W"].copy()
+        adapter.b = arrays["b"].copy()
+        adapter.count = int(arrays["count"])
+        adapter.mean = arrays["mean"].copy()
+        adapter.m2 = arrays["m2"].copy()
+        adapter.n_updates = int(arrays["n_updates"])
+        return adapter
+
+
+class Personalizer:
+    """
+    Shared base model plus one UserAdapter per user, persisted as user_models/<user_id>.npz.
+
+    Usage:
+        personalizer = Personalizer(model)
+        state, proba = personalizer.predict("user_1", features)
+        personalizer.confirm("user_1", features, "confused")
+    """
+
+    def __init__(self, base_model, directory="user_models"):
+        """
+        Args:
+            base_model: Fitted classifier with classes_ and predict_proba (sklearn SVC or CompiledSVC).
+            directory (str): Where adapters are stored.
+        """
+        self.base_model = base_model
+        self.directory = directory
+        self.classes = list(base_model.classes_)
+        self._adapters = {}
+
+    def _path(self, user_id):
+        safe_id = "".join(c if c.isalnum() or c in "-_" else "_" for c in user_id)
+        return os.path.join(self.directory, f"{safe_id}.npz")
+
+    def adapter(self, user_id):
+        """
+        Returns the user's adapter, loading it from disk or creating a fresh one.
+        """
+        if user_id not in self._adapters:
+            path = self._path(user_id)
+            adapter = None
+            if os.path.exists(path):
+                with np.load(path) as data:
+                    adapter = UserAdapter.from_arrays(data)
+            if adapter is not None and adapter.W.shape == (len(self.classes), len(self.classes) + self.base_model.n_features_in_):
+                self._adapters[user_id] = adapter
+            else:
+                self._adapters[user_id] = UserAdapter(len(self.classes), self.base_model.n_features_in_)
+        return self._adapters[user_id]
+
+    def set_base_model(self, base_model):
+        """
+        Switches to another base classifier (e.g. a newly promoted registry version). Adapters
+        are kept when the classes and feature count are unchanged, and reset otherwise.
+        """
+        if list(base_model.classes_) != self.classes or base_model.n_features_in_ != self.base_model.n_features_in_:
+            self._adapters = {}
+        self.base_model = base_model
+        self.classes = list(base_model.classes_)
+
+    def base_proba(self, features):
+        return self.base_model.predict_proba(np.asarray(features, dtype=float)[None, :])[0]
+
+    def predict(self, user_id, features, observe=True):
+        """
+        Personalized prediction for one feature vector.
+
+        Returns:
+            tuple: (state, probabilities aligned with self.classes)
+        """
+        features = np.asarray(features, dtype=float)
+        with tracing.span("predict"):
+            adapter = self.adapter(user_id)
+            if observe:
+                adapter.observe(features)
+            proba = adapter.predict_proba(features, self.base_proba(features))
+        return self.classes[int(np.argmax(proba))], proba
+
+    def confirm(self, user_id, features, label):
+        """
+        Updates the user's adapter with a confirmed label and saves it.
+        """
+        features = np.asarray(features, dtype=float)
+        adapter = self.adapter(user_id)
+        adapter.update(features, self.base_proba(features), self.classes.index(label))
+        self.save(user_id)
+
+    def save(self, user_id):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(user_id)
+        tmp_path = path + ".tmp.npz"
+        np.savez(tmp_path, **self.adapter(user_id).to_arrays())
+        os.replace(tmp_path, path)
@@ -0,0 +1,186 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# Prompts sent by the assistant itself (not typed by the user), mapped to ready-made replies
+# per detected state. They never need a language model round-trip. Only prompts whose reply does
+# not depend on the user's style belong here: the follow-up after a style check ("Continue the
+# conversation.") must show the newly chosen style, so it always goes through the normal lookup.
+GREETING_TRIGGER = "Please greet the user and ask if they would like to chat or do something together."
+
+CANNED_REPLIES = {
+    GREETING_TRIGGER: {
+        "default": "Hello, it's lovely to see you! Would you like to have a little chat, or shall we do something together?",
+    },
+}
+
+
+def normalize_text(text):
+    """
+    Lowercases, drops punctuation and collapses whitespace, so "Yes!" and "yes" share an entry.
+    """
+    return " ".join(re.sub(r"[^\w\s]", " ", (text or "").lower()).split())
+
+
+def make_key(state, style, example, user_input, context_hash=""):
+    """
+    Cache key for a turn: normalized state, preferences and user input plus a hash of the
+    recent conversation, so a reply is only reused in the same conversational context.
+    """
+    payload = json.dumps([
+        normalize_text(state), normalize_text(style), normalize_text(example),
+        normalize_text(user_input), context_hash,
+    ])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def canned_reply(user_input, state):
+    """
+    Returns the precomputed reply for a system trigger, or None for regular user input.
+    """
+    replies = CANNED_REPLIES.get(user_input)
+    if replies is None:
+        return None
+    return replies.get(state, replies["default"])
+
+
+class LRUCache:
+    """
+    In-memory least-recently-used cache whose entries expire after `ttl` seconds.
+    """
+
+    def __init__(self, capacity=256, ttl=3600.0):
+        self.capacity = capacity
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.time() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class DiskCache:
+    """
+    Persistent SQLite tier shared across sessions. Entries older than `ttl` seconds are ignored.
+    """
+
+    def __init__(self, path="response_cache.sqlite", ttl=7 * 24 * 3600.0):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, reply TEXT NOT NULL, created REAL NOT NULL)")
+        self._conn.commit()
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT reply, created FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None or row[1] < time.time() - self.ttl:
+            return None
+        return row[0]
+
+    def put(self, key, value):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO responses (key, reply, created) VALUES (?, ?, ?)", (key, value, time.time()))
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class ResponseCache:
+    """
+    Multi-tier response cache: canned replies for system triggers, then an in-memory LRU,
+    then the on-disk tier. Disk hits are promoted to memory.
+    """
+
+    def __init__(self, memory=None, disk=None):
+        """
+        Args:
+            memory (LRUCache, optional): In-memory tier (created by default).
+            disk (DiskCache, optional): Persistent tier, or None to keep the cache in memory only.
+        """
+        self.memory = memory or LRUCache()
+        self.disk = disk
+        self.stats = {"canned": 0, "memory": 0, "disk": 0, "miss": 0}
+
+    def lookup(self, key, state=None, user_input=None):
+        """
+        Returns:
+            tuple: (reply, tier) where tier is 'canned', 'memory' or 'disk', or (None, None).
+        """
+        reply = canned_reply(user_input, state)
+        if reply is not None:
+            self.stats["canned"] += 1
+            return reply, "canned"
+        reply = self.memory.get(key)
+        if reply is not None:
+            self.stats["memory"] += 1
+            return reply, "memory"
+        if self.disk is not None:
+            reply = self.disk.get(key)
+            if reply is not None:
+                self.memory.put(key, reply)
+                self.stats["disk"] += 1
+                return reply, "disk"
+        self.stats["miss"] += 1
+        return None, None
+
+    def store(self, key, reply):
+        self.memory.put(key, reply)
+        if self.disk is not None:
+            self.disk.put(key, reply)
+
+    def hit_rate(self):
+        lookups = sum(self.stats.values())
+        return (lookups - self.stats["miss"]) / lookups if lookups else 0.0
+
+    def report(self):
+        """
+        Prints hit counts per tier and how many language model round-trips were saved.
+        """
+        lookups = sum(self.stats.values())
+        if not lookups:
+            return
+        saved = lookups - self.stats["miss"]
+        print(f"\n Response cache: {saved}/{lookups} LLM round-trips saved ({self.hit_rate() * 100:.0f}% hit rate)")
+        print(f"   canned: {self.stats['canned']}  memory: {self.stats['memory']}  "
+              f"disk: {self.stats['disk']}  misses: {self.stats['miss']}")
+
+
+def create_cache(disk_path="response_cache.sqlite"):
+    """
+    Builds the default cache. Set ASSISTANT_RESPONSE_CACHE=memory to skip the disk tier,
+    or ASSISTANT_RESPONSE_CACHE=off to disable caching altogether (returns None).
+    """
+    mode = os.getenv("ASSISTANT_RESPONSE_CACHE", "on").lower()
+    if mode == "off":
+        return None
+    if mode == "memory":
+        return ResponseCache()
+    return ResponseCache(disk=DiskCache(disk_path))
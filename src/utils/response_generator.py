@@ -1,10 +1,15 @@
-import google.generativeai as genai
-import os
+import asyncio
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from src.utils.llm_backends import create_backend
+from src.utils.conversation_history import ConversationHistory, estimate_tokens
+from src.utils import tracing
+from src.utils.response_cache import create_cache, make_key
 
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-
-# Create Gemini model instance
-model = genai.GenerativeModel('models/gemini-1.5-flash')
+# Marker the model appends when the user seems unhappy with the communication style
+STYLE_CHANGE_MARKER = "[STYLE_CHANGE_REQUESTED]"
 
 # Initial system prompt to instruct the assistant's personality and communication style
 system_prompt = (
@@ -19,15 +24,176 @@ system_prompt = (
 )
 
 
-# Memory of previous turns
-conversation_history = [ { "role": "user", "parts": [system_prompt] } ]
+# Asked once in the system prompt instead of being repeated in every turn
+style_change_instructions = (
+    "\nWhenever the user's latest message suggests that they are confused, frustrated, or dissatisfied with the assistant's communication style, "
+    f"append {STYLE_CHANGE_MARKER} at the end of your response."
+)
+
+
+# Memory of previous turns, bounded to a token budget (older turns are summarized)
+history = ConversationHistory(system_prompt + style_change_instructions)
+
+
+class StreamingClient:
+    """
+    Runs an LLMBackend on a dedicated asyncio event loop thread.
+
+    The loop (and therefore the backend's client connections) lives for the whole session.
+    Every request gets a timeout and is retried with exponential backoff, but only while no
+    text has been streamed yet, so a retry never repeats words the user has already seen.
+    """
+
+    def __init__(self, backend=None, timeout=30.0, retries=2, backoff=0.5):
+        """
+        Args:
+            backend (LLMBackend, optional): Defaults to create_backend().
+            timeout (float): Seconds allowed per attempt.
+            retries (int): Additional attempts after a failure before the first token.
+            backoff (float): Initial delay between attempts, doubled after each failure.
+        """
+        self.backend = backend
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self._loop = None
+        self._lock = threading.Lock()
+
+    def _get_loop(self):
+        with self._lock:
+            if self._loop is None:
+                if self.backend is None:
+                    self.backend = create_backend()
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="llm-client", daemon=True).start()
+            return self._loop
+
+    async def _attempt(self, history, on_token, chunks):
+        start = time.perf_counter()
+        async for text in self.backend.stream(history):
+            if not chunks:
+                tracing.observe("llm_first_token", time.perf_counter() - start)
+            chunks.append(text)
+            if on_token is not None:
+                on_token(text)
+
+    async def _generate(self, history, on_token):
+        delay = self.backoff
+        for attempt in range(self.retries + 1):
+            chunks = []
+            try:
+                await asyncio.wait_for(self._attempt(history, on_token, chunks), self.timeout)
+                return "".join(chunks)
+            except Exception as e:
+                if chunks or attempt == self.retries:
+                    raise
+                tracing.count("llm_retries")
+                print(f"\n LLM request failed ({type(e).__name__}: {e}); retrying in {delay:.1f}s...", file=sys.stderr)
+                await asyncio.sleep(delay)
+                delay *= 2
 
+    async def _run(self, history, on_token, on_complete):
+        start = time.perf_counter()
+        tracing.count("llm_requests")
+        try:
+            reply = await self._generate(history, on_token)
+        except BaseException as e:
+            tracing.count("llm_errors")
+            if on_complete is not None:
+                on_complete(None, e)
+            raise
+        tracing.observe("llm_total", time.perf_counter() - start)
+        tracing.count("llm_output_tokens", estimate_tokens(reply))
+        if on_complete is not None:
+            on_complete(reply, None)
+        return reply
 
-def generate_response(state, style, example, user_input=None):
+    def submit(self, history, on_token=None, on_complete=None):
+        """
+        Starts generating a reply without blocking.
+
+        Args:
+            history (list): Conversation in Gemini format. Copied, so it may change afterwards.
+            on_token (callable, optional): Called with each text chunk as it arrives
+                (from the client thread).
+            on_complete (callable, optional): Called as on_complete(reply, error) before the
+                returned future resolves.
+
+        Returns:
+            concurrent.futures.Future: Resolves to the full reply text.
+        """
+        coroutine = self._run(list(history), on_token, on_complete)
+        return asyncio.run_coroutine_threadsafe(coroutine, self._get_loop())
+
+    def close(self):
+        if self._loop is not None:
+            asyncio.run_coroutine_threadsafe(self.backend.aclose(), self._loop).result(timeout=5)
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._loop = None
+
+
+class ConsoleStreamer:
     """
-    Generates a response from Gemini, adapting to the user's cognitive state and interaction style.
+    Prints streamed reply chunks as they arrive, hiding STYLE_CHANGE_MARKER.
+
+    Text that could be the beginning of the marker is held back until it can be decided.
+    """
+
+    def __init__(self, prefix="Assistant: ", stream=None):
+        self.prefix = prefix
+        self.stream = stream or sys.stdout
+        self._pending = ""
+        self._started = False
+
+    def write(self, text):
+        if not self._started:
+            self.stream.write(self.prefix)
+            self._started = True
+        self._pending = (self._pending + text).replace(STYLE_CHANGE_MARKER, "")
+        # Keep the longest suffix that is still a prefix of the marker
+        hold = 0
+        for length in range(min(len(self._pending), len(STYLE_CHANGE_MARKER) - 1), 0, -1):
+            if STYLE_CHANGE_MARKER.startswith(self._pending[-length:]):
+                hold = length
+                break
+        ready, self._pending = self._pending[:len(self._pending) - hold], self._pending[len(self._pending) - hold:]
+        self.stream.write(ready)
+        self.stream.flush()
+
+    def finish(self):
+        if not self._started:
+            self.stream.write(self.prefix)
+        self.stream.write(self._pending + "\n")
+        self.stream.flush()
+        self._pending = ""
+        self._started = False
+
+
+# Client shared by every conversation (one event loop and backend connection per process)
+client = StreamingClient()
+
+def get_client():
+    return client
+
+# Response cache, opened on first use (None when disabled)
+cache = None
+_cache_ready = False
+_cache_lock = threading.Lock()
+
+def get_cache():
+    global cache, _cache_ready
+    with _cache_lock:
+        if not _cache_ready:
+            cache = create_cache()
+            _cache_ready = True
+    return cache
+
+
+def build_user_prompt(state, style, example, user_input=None):
+    """
+    Composes the full per-turn prompt from the detected state and the user's preferences,
+    as it would be sent without history compaction.
     """
-    # Compose the user input based on state and preference
     user_prompt = (
         f"The user appears {state}. Their preferred response style is: {style}.\n"
         f"Example response: \"{example}\"."
@@ -36,19 +202,98 @@ def generate_response(state, style, example, user_input=None):
         user_prompt += (
             f"\nThey just said: \"{user_input}\""
             "\nIf the user's message suggests that they are confused, frustrated, or dissatisfied with the assistant's communication style, "
-            "then append [STYLE_CHANGE_REQUESTED] at the end of your response."
+            f"then append {STYLE_CHANGE_MARKER} at the end of your response."
         )
+    return user_prompt
 
-    # Add to conversation
-    conversation_history.append({ "role": "user", "parts": [user_prompt] })
 
-    # Generate response
-    response = model.generate_content(conversation_history)
+class ResponseGenerator:
+    """
+    Conversation with the language model for one user: its own history, sharing the
+    streaming client and the response cache with other sessions.
 
-    # Extract response
-    reply = response.text.strip()
+    Usage:
+        generator = ResponseGenerator()
+        reply = generator.generate_response("confused", "calm", "Let's go slowly.", "What now?")
+    """
 
-    # Add assistant's response to memory
-    conversation_history.append({ "role": "model", "parts": [reply] })
+    def __init__(self, client=None, history=None, response_cache=None):
+        """
+        Args:
+            client (StreamingClient, optional): Defaults to the module's shared client.
+            history (ConversationHistory, optional): Defaults to a new history with the assistant's system prompt.
+            response_cache (ResponseCache, optional): Defaults to get_cache().
+        """
+        self.client = client or get_client()
+        self.history = history or ConversationHistory(system_prompt + style_change_instructions)
+        self._cache = response_cache
+
+    @property
+    def cache(self):
+        return self._cache if self._cache is not None else get_cache()
+
+    def start_response(self, state, style, example, user_input=None, on_token=None):
+        """
+        Starts generating a response without blocking, so the caller can keep observing the user.
+        The conversation history is updated when the reply is complete.
+
+        Returns:
+            concurrent.futures.Future: Resolves to the reply text.
+        """
+        history = self.history
+
+        # System triggers and repeated turns in the same context are answered from the cache
+        response_cache = self.cache
+        key = None
+        if response_cache is not None:
+            key = make_key(state, style, example, user_input, history.context_hash())
+            reply, _ = response_cache.lookup(key, state=state, user_input=user_input)
+            if reply is not None:
+                history.begin_turn(state, style, example, user_input)
+                history.complete_turn(reply)
+                if on_token is not None:
+                    on_token(reply)
+                future = Future()
+                future.set_result(reply)
+                return future
+
+        # Add to conversation
+        messages = history.begin_turn(
+            state, style, example, user_input,
+            full_prompt=build_user_prompt(state, style, example, user_input)
+        )
 
-    return reply
\ No newline at end of file
+        def on_complete(reply, error):
+            if error is None:
+                # Add assistant's response to memory
+                history.complete_turn(reply.strip())
+                if key is not None and reply.strip():
+                    response_cache.store(key, reply.strip())
+            else:
+                history.abort_turn()
+
+        return self.client.submit(messages, on_token=on_token, on_complete=on_complete)
+
+    def generate_response(self, state, style, example, user_input=None, on_token=None):
+        """
+        Generates a response from the language model, adapting to the user's cognitive state and interaction style.
+        """
+        return self.start_response(state, style, example, user_input, on_token).result().strip()
+
+
+# Generator behind the module-level functions (single-user assistant in main.py)
+default_generator = ResponseGenerator(client=client, history=history)
+
+
+def start_response(state, style, example, user_input=None, on_token=None):
+    """
+    Starts generating a response for the module-level conversation (see ResponseGenerator.start_response).
+    """
+    return default_generator.start_response(state, style, example, user_input, on_token)
+
+
+def generate_response(state, style, example, user_input=None, on_token=None):
+    """
+    Generates a response from the language model, adapting to the user's cognitive state and interaction style.
+    """
+    return default_generator.generate_response(state, style, example, user_input, on_token)
@@ -0,0 +1,176 @@
+import datetime
+import json
+import numpy as np
+from src.utils.log_analytics import (
+    KIND_FOLLOW_UP, KIND_STATE_CONFIRMATION, KIND_STYLE_ANSWER, KIND_STYLE_UPDATE, KIND_SYSTEM_TRIGGER, KIND_USER_TURN,
+    record_kind,
+)
+
+# Accelerated replay of assistant sessions (see src/scripts/simulate.py).
+#
+#   SimulatedClock         virtual time: sleep() advances it instantly, so the observation
+#                          windows of a turn cost nothing
+#   SyntheticFeatureFrames "frames" that are feature vectors of a scripted state, drawn from a
+#                          labeled dataset (paired with FeaturePassthrough instead of MediaPipe)
+#   VideoFrames            decoded frames of a recording, picked by virtual time
+#   load_scripts           user turns, states and style-check answers recovered from conversation_log.jsonl
+#   ReplayUser             answers the style-check dialog as the logged user did
+
+
+class SimulatedClock:
+    """
+    Virtual time in seconds. Each session gets its own clock, so sessions can run in parallel.
+    """
+
+    def __init__(self, start=0.0, epoch=None):
+        self._time = start
+        self.epoch = epoch or datetime.datetime(2025, 1, 1)
+        self.slept = 0.0
+
+    def time(self):
+        return self._time
+
+    def sleep(self, seconds):
+        self._time += seconds
+        self.slept += seconds
+
+    def advance(self, seconds):
+        self._time += seconds
+
+    def now(self):
+        return self.epoch + datetime.timedelta(seconds=self._time)
+
+
+class SyntheticFeatureFrames:
+    """
+    Feature vectors of the currently scripted state, sampled from labeled dataset rows (with a
+    little noise). show(state, then=post_state) switches to `post_state` once the clock moves on,
+    i.e. after the observation window that follows the reply.
+    """
+
+    def __init__(self, clock, X, y, noise=0.02, seed=0):
+        self.clock = clock
+        self.rows = {label: X[y == label] for label in np.unique(y)}
+        self.scale = X.std(axis=0) * noise
+        self.rng = np.random.default_rng(seed)
+        self._state, self._then, self._switch_at = None, None, None
+
+    def show(self, state, then=None):
+        self._state, self._then = state, then
+        self._switch_at = self.clock.time()
+
+    def state(self):
+        if self._then is not None and self.clock.time() > self._switch_at:
+            return self._then
+        return self._state
+
+    def wait_for_frame(self, after=None, timeout=1.0):
+        rows = self.rows.get(self.state())
+        if rows is None or not len(rows):
+            return None, None
+        row = rows[self.rng.integers(len(rows))]
+        return self.clock.time(), row + self.rng.normal(0, 1, row.shape) * self.scale
+
+
+class FeaturePassthrough:
+    """
+    Extraction stand-in for SyntheticFeatureFrames: the "frame" already is the feature vector.
+    """
+
+    def extract(self, frame):
+        return np.asarray(frame, dtype=float)
+
+
+class VideoFrames:
+    """
+    Frames of a recorded video chosen by virtual time (looping), for sessions whose features
+    go through the real extractor.
+    """
+
+    def __init__(self, clock, frames, fps=30.0):
+        self.clock = clock
+        self.frames = frames
+        self.fps = fps
+
+    def show(self, state, then=None):
+        pass  # the recording decides what the user looks like
+
+    def wait_for_frame(self, after=None, timeout=1.0):
+        index = int(self.clock.time() * self.fps) % len(self.frames)
+        return self.clock.time(), self.frames[index]
+
+
+class ScriptedTurn:
+    def __init__(self, message, state):
+        self.message = message
+        self.state = state
+        self.post_state = state
+        self.style_check = False
+        self.change_style = "no"
+        self.state_answer = "skip"
+        self.new_style = None
+        self.new_example = None
+
+    def __repr__(self):
+        return f"ScriptedTurn({self.message!r}, {self.state} -> {self.post_state}, change_style={self.change_style})"
+
+
+def load_scripts(jsonl_path="conversation_log.jsonl"):
+    """
+    Splits a conversation log into sessions (a new session starts at turn_id 1 or with another
+    user) and rebuilds each user turn with the states and style-check answers that followed it.
+
+    Returns:
+        list: (user_id, [ScriptedTurn, ...]) per session with at least one user turn.
+    """
+    scripts = []
+    turns, user_id, turn = None, None, None
+    with open(jsonl_path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if turns is None or record["turn_id"] == 1 or record["user_id"] != user_id:
+                turns, user_id, turn = [], record["user_id"], None
+                scripts.append((user_id, turns))
+
+            kind = record_kind(record["user_input"])
+            if kind == KIND_USER_TURN:
+                turn = ScriptedTurn(record["user_input"], record["state"])
+                turns.append(turn)
+            elif turn is None:
+                continue
+            elif kind == KIND_SYSTEM_TRIGGER:
+                turn.post_state = record["state"]
+                turn.style_check = True
+            elif kind == KIND_STATE_CONFIRMATION:
+                turn.state_answer = record["assistant_response"].rsplit("→", 1)[-1].strip()
+            elif kind == KIND_STYLE_ANSWER:
+                turn.change_style = record["assistant_response"].rsplit("→", 1)[-1].strip()
+            elif kind == KIND_STYLE_UPDATE:
+                turn.new_style = record["user_input"].split("'")[1] if "'" in record["user_input"] else "calm"
+            elif kind == KIND_FOLLOW_UP and turn.new_style is not None:
+                # The example the user typed is not logged; the reply in the new style stands in for it
+                turn.new_example = record["assistant_response"]
+    return [(user_id, turns) for user_id, turns in scripts if turns]
+
+
+class ReplayUser:
+    """
+    Answers the style-check questions of AssistantSession.run_turn as in the scripted turn.
+    """
+
+    def __init__(self):
+        self.turn = None
+        self.style_checks = 0
+
+    def ask(self, prompt):
+        turn = self.turn
+        if prompt.startswith("Were you really"):
+            return turn.state_answer
+        if prompt.startswith("Change style?"):
+            self.style_checks += 1
+            return turn.change_style
+        if prompt.startswith("Enter a new preferred style"):
+            return turn.new_style or "calm"
+        return turn.new_example or "Let's take it slowly."
@@ -0,0 +1,111 @@
+import threading
+import time
+
+
+class StartupTimer:
+    """
+    Records how long each startup stage takes, measured from the moment the timer is created.
+    Stages may be recorded from several threads.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.stages = []  # (name, thread name, start offset, duration) in seconds
+        self._lock = threading.Lock()
+
+    def record(self, name, started_at, finished_at=None):
+        """
+        Records a stage given its perf_counter() start (and end, default: now).
+        """
+        if finished_at is None:
+            finished_at = time.perf_counter()
+        with self._lock:
+            self.stages.append((name, threading.current_thread().name, started_at - self.start, finished_at - started_at))
+
+    def stage(self, name):
+        """
+        Context manager timing the enclosed block as one stage.
+        """
+        return _Stage(self, name)
+
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+    def report(self, title="Startup timing"):
+        """
+        Prints every stage sorted by start time plus the total time to interaction.
+        """
+        print(f"\n {title}:")
+        with self._lock:
+            stages = sorted(self.stages, key=lambda s: s[2])
+        for name, thread, offset, duration in stages:
+            print(f"   {name:<22} {duration * 1000:8.1f} ms  (started at {offset * 1000:7.1f} ms on {thread})")
+        print(f"   {'ready after':<22} {self.elapsed() * 1000:8.1f} ms\n")
+
+
+class _Stage:
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        self.started_at = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.timer.record(self.name, self.started_at)
+
+
+class Warmup:
+    """
+    Runs slow initialization tasks (heavy imports, model loading, camera opening) on
+    background threads while the main thread does something useful, e.g. waits for the
+    greeting from the language model.
+
+    Usage:
+        warmup = Warmup(timer)
+        warmup.add("classifier", load_classifier)
+        warmup.start()
+        ...
+        model = warmup.result("classifier")
+    """
+
+    def __init__(self, timer=None):
+        self.timer = timer
+        self._tasks = {}
+        self._results = {}
+        self._errors = {}
+        self._threads = {}
+
+    def add(self, name, fn, *args, **kwargs):
+        self._tasks[name] = (fn, args, kwargs)
+        return self
+
+    def start(self):
+        for name in self._tasks:
+            thread = threading.Thread(target=self._run, args=(name,), name=f"warmup-{name}", daemon=True)
+            self._threads[name] = thread
+            thread.start()
+        return self
+
+    def _run(self, name):
+        fn, args, kwargs = self._tasks[name]
+        started_at = time.perf_counter()
+        try:
+            self._results[name] = fn(*args, **kwargs)
+        except BaseException as e:
+            self._errors[name] = e
+        finally:
+            if self.timer is not None:
+                self.timer.record(name, started_at)
+
+    def result(self, name, timeout=None):
+        """
+        Waits for a task to finish and returns its result, re-raising its exception if it failed.
+        """
+        self._threads[name].join(timeout)
+        if self._threads[name].is_alive():
+            raise TimeoutError(f"Warm-up task '{name}' did not finish in time.")
+        if name in self._errors:
+            raise self._errors[name]
+        return self._results[name]
@@ -1,98 +1,323 @@
 import cv2
-import mediapipe as mp
 import numpy as np
+from src.utils.feature_spec import FEATURE_NAMES, compute_features, landmarks_to_array
+from src.utils import tracing
 
-# Initialize MediaPipe modules
-mp_face = mp.solutions.face_mesh
-mp_pose = mp.solutions.pose
 
-def extract_features(frame):
+class FeatureExtractor:
     """
-    Extracts normalized facial and body posture features from a webcam frame using MediaPipe.
-
-    Returns:
-        - features: np.array of 8 values
-        - feature_names: list of 8 corresponding feature names
-
-    Features:
-        - Left eye openness
-        - Right eye openness
-        - Left eyebrow raise
-        - Right eyebrow raise
-        - Mouth openness
-        - Head yaw asymmetry
-        - Shoulder distance
-        - Head tilt (vertical)
+    Long-lived feature extraction engine that owns the MediaPipe FaceMesh and Pose graphs.
+
+    The graphs are built once and reused for every frame, so model loading is paid a single
+    time and MediaPipe's temporal tracking (static_image_mode=False) carries over between
+    consecutive frames of the same stream.
+
+    Usage:
+        with FeatureExtractor() as extractor:
+            features, feature_names = extractor.process(frame)
     """
-    with mp_face.FaceMesh(static_image_mode=False, refine_landmarks=True) as face_mesh, \
-         mp_pose.Pose(static_image_mode=False) as pose:
+
+    def __init__(self, static_image_mode=False, refine_landmarks=True):
+        """
+        Args:
+            static_image_mode (bool): Treat every frame as an unrelated image (disables tracking).
+                Use True for folders of independent pictures, False for video/webcam streams.
+            refine_landmarks (bool): Enable FaceMesh iris refinement.
+        """
+        # MediaPipe is imported here: it is the slowest import of the project and only
+        # needed once an extractor is actually built
+        import mediapipe as mp
+
+        self.static_image_mode = static_image_mode
+        self.face_mesh = mp.solutions.face_mesh.FaceMesh(static_image_mode=static_image_mode, refine_landmarks=refine_landmarks)
+        self.pose = mp.solutions.pose.Pose(static_image_mode=static_image_mode)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def reset(self):
+        """
+        Drops MediaPipe's tracking state, so the next frame is not treated as the continuation
+        of the previous one (e.g. when switching to another video or jumping within one).
+        """
+        if self.face_mesh is not None:
+            self.face_mesh.reset()
+        if self.pose is not None:
+            self.pose.reset()
+
+    def close(self):
+        """
+        Releases the MediaPipe graphs. The extractor cannot be used afterwards.
+        """
+        if self.face_mesh is not None:
+            self.face_mesh.close()
+            self.face_mesh = None
+        if self.pose is not None:
+            self.pose.close()
+            self.pose = None
+
+    def process(self, frame):
+        """
+        Extracts normalized facial and body posture features from a single BGR frame.
+
+        Returns:
+            - features: np.array with one value per entry of FEATURE_SPEC
+            - feature_names: list of corresponding feature names
+
+        Features (see src/utils/feature_spec.py):
+            - Left / right eye openness
+            - Left / right eyebrow raise
+            - Mouth openness
+            - Head yaw asymmetry
+            - Shoulder distance
+            - Head tilt (vertical)
+        """
+        if self.face_mesh is None:
+            raise RuntimeError("FeatureExtractor has been closed.")
 
         # Convert BGR to RGB for MediaPipe
         rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        face_results = face_mesh.process(rgb)
-        pose_results = pose.process(rgb)
-
-        features = []
-        feature_names = []
-
-        face_scale = None  # Used for normalization based on face size
-
-        # --- Facial features ---
-        if face_results.multi_face_landmarks:
-            face = face_results.multi_face_landmarks[0]
-            get = lambda i: np.array([face.landmark[i].x, face.landmark[i].y])
-
-            # Estimate face height as reference scale (to normalize distances)
-            top_face = get(10)     # forehead center
-            bottom_face = get(152) # chin
-            face_scale = np.linalg.norm(top_face - bottom_face)
-            face_scale = max(face_scale, 1e-6)  # Prevent division by zero
-
-            # Eye openness
-            left_eye = np.linalg.norm(get(159) - get(145)) / face_scale
-            right_eye = np.linalg.norm(get(386) - get(374)) / face_scale
-            features += [left_eye, right_eye]
-            feature_names += ["left_eye_openness", "right_eye_openness"]
-
-            # Eyebrow raise
-            left_eyebrow = np.linalg.norm(get(105) - get(159)) / face_scale
-            right_eyebrow = np.linalg.norm(get(334) - get(386)) / face_scale
-            features += [left_eyebrow, right_eyebrow]
-            feature_names += ["left_eyebrow_raise", "right_eyebrow_raise"]
-
-            # Mouth openness
-            mouth_open = np.linalg.norm(get(13) - get(14)) / face_scale
-            features.append(mouth_open)
-            feature_names.append("mouth_openness")
-
-            # Head yaw asymmetry
-            nose = get(1)
-            left_cheek = get(234)
-            right_cheek = get(454)
-            yaw = (np.linalg.norm(nose - left_cheek) - np.linalg.norm(nose - right_cheek)) / face_scale
-            features.append(yaw)
-            feature_names.append("head_yaw_asymmetry")
-        else:
-            features += [0] * 6
-            feature_names += [
-                "left_eye_openness", "right_eye_openness",
-                "left_eyebrow_raise", "right_eyebrow_raise",
-                "mouth_openness", "head_yaw_asymmetry"
-            ]
-
-        # --- Body posture features ---
-        if pose_results.pose_landmarks:
-            landmarks = pose_results.pose_landmarks.landmark
-            left_shoulder = np.array([landmarks[11].x, landmarks[11].y])
-            right_shoulder = np.array([landmarks[12].x, landmarks[12].y])
-
-            shoulder_dist = np.linalg.norm(left_shoulder - right_shoulder)
-            head_tilt = landmarks[7].y - landmarks[8].y
-
-            features += [shoulder_dist, head_tilt]
-            feature_names += ["shoulder_distance", "head_tilt"]
-        else:
-            features += [0, 0]
-            feature_names += ["shoulder_distance", "head_tilt"]
-
-        return np.array(features), feature_names
\ No newline at end of file
+        face_landmarks = self._face_landmarks(rgb)
+        pose_landmarks = self._pose_landmarks(rgb)
+
+        # Landmarks are converted once; all distances are computed from FEATURE_SPEC in one pass
+        return compute_features(face_landmarks, pose_landmarks), list(FEATURE_NAMES)
+
+    def _face_landmarks(self, rgb):
+        """
+        Returns:
+            np.array: (N, 3) FaceMesh landmarks normalized to `rgb`, or None if no face was found.
+        """
+        with tracing.span("facemesh"):
+            results = self.face_mesh.process(rgb)
+        if results.multi_face_landmarks:
+            return landmarks_to_array(results.multi_face_landmarks[0])
+        return None
+
+    def _pose_landmarks(self, rgb):
+        """
+        Returns:
+            np.array: (33, 3) Pose landmarks normalized to `rgb`, or None if no body was found.
+        """
+        with tracing.span("pose"):
+            results = self.pose.process(rgb)
+        if results.pose_landmarks:
+            return landmarks_to_array(results.pose_landmarks)
+        return None
+
+    def iter_features(self, frames):
+        """
+        Streams features for an iterable of frames (e.g. decoded video), reusing the same graphs.
+
+        Args:
+            frames (iterable): BGR frames in temporal order.
+
+        Yields:
+            tuple: (features, feature_names) for each frame.
+        """
+        for frame in frames:
+            yield self.process(frame)
+
+    def warm_up(self, height=480, width=640):
+        """
+        Runs one blank frame through both graphs so model loading happens now rather than
+        on the first real observation.
+        """
+        self.process(np.zeros((height, width, 3), dtype=np.uint8))
+        return self
+
+
+class AdaptiveFeatureExtractor(FeatureExtractor):
+    """
+    FeatureExtractor that spends less work per frame:
+
+        - motion gating: when a small grayscale thumbnail barely differs from the last
+          processed frame, the previous features are returned without running MediaPipe
+          (at most `max_skip` frames in a row);
+        - face ROI: FaceMesh runs on a crop around the last detected face, downscaled to at
+          most `roi_size` pixels, and the landmarks are mapped back to full-frame coordinates
+          so features are unchanged. The crop only moves when the face gets close to its
+          border, which keeps MediaPipe's tracking valid; if the face is lost in the crop the
+          full frame is used;
+        - selective Pose: Pose runs on every `pose_every`-th processed frame, on a frame
+          downscaled by `pose_scale`; the last body landmarks are reused in between.
+
+    `stats` counts how often each shortcut was taken.
+    """
+
+    def __init__(self, static_image_mode=False, refine_landmarks=True, motion_threshold=2.0, max_skip=15,
+                 roi_margin=0.35, roi_size=256, min_roi_side=64, pose_every=10, pose_scale=0.5):
+        """
+        Args:
+            motion_threshold (float): Mean absolute difference (0-255) of the 64x48 grayscale
+                thumbnail below which a frame counts as static. 0 disables motion gating.
+            max_skip (int): Maximum consecutive frames answered from the previous features.
+            roi_margin (float): Margin added around the face box, relative to its size.
+            roi_size (int): Longest side of the crop given to FaceMesh. 0 disables the ROI.
+            min_roi_side (int): Smallest crop side in pixels (capped by the frame size).
+            pose_every (int): Run Pose on one processed frame out of this many.
+            pose_scale (float): Downscale factor of the frame given to Pose.
+        """
+        super().__init__(static_image_mode=static_image_mode, refine_landmarks=refine_landmarks)
+        self.motion_threshold = motion_threshold
+        self.max_skip = max_skip
+        self.roi_margin = roi_margin
+        self.roi_size = roi_size
+        self.min_roi_side = min_roi_side
+        self.pose_every = max(int(pose_every), 1)
+        self.pose_scale = pose_scale
+        self.reset()
+
+    def reset(self):
+        """
+        Forgets the tracked state (e.g. when switching to another video).
+        """
+        super().reset()
+        self._thumbnail = None
+        self._features = None
+        self._skipped_in_row = 0
+        self._roi = None          # (x0, y0, x1, y1) in pixels
+        self._pose = None
+        self._processed = 0
+        self.stats = {"frames": 0, "skipped": 0, "face_roi": 0, "face_full": 0, "pose_runs": 0}
+
+    def warm_up(self, height=480, width=640):
+        super().warm_up(height, width)
+        self.reset()
+        return self
+
+    def _is_static(self, frame):
+        thumbnail = cv2.resize(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), (64, 48), interpolation=cv2.INTER_AREA)
+        thumbnail = thumbnail.astype(np.int16)
+        static = (
+            self.motion_threshold > 0
+            and self._features is not None
+            and self._skipped_in_row < self.max_skip
+            and np.abs(thumbnail - self._thumbnail).mean() < self.motion_threshold
+        )
+        if not static:
+            self._thumbnail = thumbnail
+        return static
+
+    def _face_box(self, landmarks, width, height):
+        xs, ys = landmarks[:, 0] * width, landmarks[:, 1] * height
+        return xs.min(), ys.min(), xs.max(), ys.max()
+
+    def _update_roi(self, landmarks, width, height):
+        x0, y0, x1, y1 = self._face_box(landmarks, width, height)
+        if self._roi is not None:
+            # Keep the crop while the face stays well inside it
+            rx0, ry0, rx1, ry1 = self._roi
+            inset = 0.1 * (rx1 - rx0)
+            size_ratio = max(x1 - x0, y1 - y0) / (rx1 - rx0)
+            if x0 > rx0 + inset and y0 > ry0 + inset and x1 < rx1 - inset and y1 < ry1 - inset and size_ratio > 0.4:
+                return
+        side = max(x1 - x0, y1 - y0) * (1 + 2 * self.roi_margin)
+        cx, cy = (x0 + x1) / 2, (y0 + y1) / 2
+        # A degenerate face box (or a tiny face) must not collapse the crop
+        side = min(max(side, self.min_roi_side), width, height)
+        left = int(np.clip(cx - side / 2, 0, width - side))
+        top = int(np.clip(cy - side / 2, 0, height - side))
+        self._roi = (left, top, left + int(side), top + int(side))
+
+    def _face_in_roi(self, frame):
+        x0, y0, x1, y1 = self._roi
+        crop = frame[y0:y1, x0:x1]
+        if crop.size == 0:
+            return None  # process() falls back to full-frame FaceMesh
+        scale = min(1.0, self.roi_size / max(crop.shape[:2]))
+        if scale < 1.0:
+            crop = cv2.resize(crop, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        landmarks = self._face_landmarks(cv2.cvtColor(crop, cv2.COLOR_BGR2RGB))
+        if landmarks is None:
+            return None
+        # Crop-normalized -> full-frame-normalized coordinates (z uses the x scale, as in MediaPipe)
+        height, width = frame.shape[:2]
+        landmarks = landmarks.copy()
+        landmarks[:, 0] = (x0 + landmarks[:, 0] * (x1 - x0)) / width
+        landmarks[:, 1] = (y0 + landmarks[:, 1] * (y1 - y0)) / height
+        landmarks[:, 2] *= (x1 - x0) / width
+        return landmarks
+
+    def process(self, frame):
+        """
+        Same output as FeatureExtractor.process, computed adaptively.
+        """
+        if self.face_mesh is None:
+            raise RuntimeError("FeatureExtractor has been closed.")
+        self.stats["frames"] += 1
+
+        if self._is_static(frame):
+            self._skipped_in_row += 1
+            self.stats["skipped"] += 1
+            return self._features.copy(), list(FEATURE_NAMES)
+        self._skipped_in_row = 0
+
+        height, width = frame.shape[:2]
+        face = None
+        if self._roi is not None and self.roi_size:
+            face = self._face_in_roi(frame)
+            if face is not None:
+                self.stats["face_roi"] += 1
+        if face is None:
+            face = self._face_landmarks(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+            self.stats["face_full"] += 1
+            self._roi = None
+        if face is not None and self.roi_size:
+            self._update_roi(face, width, height)
+
+        if self._processed % self.pose_every == 0:
+            small = frame if self.pose_scale >= 1.0 else cv2.resize(
+                frame, None, fx=self.pose_scale, fy=self.pose_scale, interpolation=cv2.INTER_AREA)
+            self._pose = self._pose_landmarks(cv2.cvtColor(small, cv2.COLOR_BGR2RGB))
+            self.stats["pose_runs"] += 1
+        self._processed += 1
+
+        self._features = compute_features(face, self._pose)
+        return self._features.copy(), list(FEATURE_NAMES)
+
+
+# Shared extractor used by the extract_features() convenience function
+_default_extractor = None
+
+def get_default_extractor():
+    """
+    Returns the process-wide FeatureExtractor, creating it on first use.
+    """
+    global _default_extractor
+    if _default_extractor is None:
+        _default_extractor = FeatureExtractor()
+    return _default_extractor
+
+def extract_features(frame):
+    """
+    Extracts features from a webcam frame using the shared FeatureExtractor.
+
+    Kept for backwards compatibility; see FeatureExtractor.process for the returned values.
+    """
+    return get_default_extractor().process(frame)
+
+def iter_video_frames(path, max_frames=None):
+    """
+    Yields BGR frames decoded from a video file.
+
+    Args:
+        path (str): Path to the video file.
+        max_frames (int, optional): Stop after this many frames.
+    """
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise IOError(f"Could not open video: {path}")
+    count = 0
+    try:
+        while max_frames is None or count < max_frames:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            yield frame
+            count += 1
+    finally:
+        cap.release()
@@ -0,0 +1,330 @@
+import glob
+import os
+import threading
+import numpy as np
+from src.utils.feature_spec import FEATURE_NAMES, FEATURE_SCHEMA_VERSION, FEATURE_SPEC
+
+# Streaming temporal features.
+#
+# The per-frame features (FEATURE_SPEC) are pushed at camera rate into NumPy ring buffers covering
+# the last `window_seconds`, whose running sums are updated in O(1) per frame, so a fixed-width
+# vector of windowed statistics is available at any moment without reprocessing the window.
+# Except for face_presence, the statistics only use frames with a detected face:
+#   <feature>_mean, <feature>_std     level and variability of each per-frame feature
+#   <feature>_velocity                mean absolute rate of change (units per second)
+#   blink_rate                        blinks per minute (eye openness dropping below a share of its window mean)
+#   head_stillness                    share of frames with little head-yaw motion (a fixation proxy;
+#                                     the feature spec has no gaze landmarks)
+#   face_presence                     share of frames with a detected face
+
+_FACE_COLUMNS = np.array([i for i, spec in enumerate(FEATURE_SPEC) if spec.source == "face"])
+_EYE_COLUMNS = np.array([FEATURE_NAMES.index("eye_openness_left"), FEATURE_NAMES.index("eye_openness_right")])
+_YAW_COLUMN = FEATURE_NAMES.index("head_yaw_asymmetry")
+
+TEMPORAL_FEATURE_NAMES = (
+    [f"{name}_mean" for name in FEATURE_NAMES]
+    + [f"{name}_std" for name in FEATURE_NAMES]
+    + [f"{name}_velocity" for name in FEATURE_NAMES]
+    + ["blink_rate", "head_stillness", "face_presence"]
+)
+
+
+def temporal_schema():
+    """
+    Description of the input a classifier trained on temporal features expects.
+
+    Returns:
+        dict: Schema version, TEMPORAL_FEATURE_NAMES and "temporal": True.
+    """
+    return {"version": FEATURE_SCHEMA_VERSION, "feature_names": list(TEMPORAL_FEATURE_NAMES), "temporal": True}
+
+
+class RollingWindow:
+    """
+    Ring buffer of timestamped rows with running sums (O(1) mean and variance). Rows leave the
+    window when they are older than the cutoff passed to expire(), or when `capacity` is reached.
+    """
+
+    def __init__(self, capacity, width=1):
+        self.values = np.zeros((capacity, width))
+        self.times = np.zeros(capacity)
+        self.capacity = capacity
+        self.count = 0
+        self._next = 0
+        self._sum = np.zeros(width)
+        self._sumsq = np.zeros(width)
+        self._pushes = 0
+
+    def _oldest(self):
+        return (self._next - self.count) % self.capacity
+
+    def _drop_oldest(self):
+        old = self.values[self._oldest()]
+        self._sum -= old
+        self._sumsq -= old * old
+        self.count -= 1
+
+    def push(self, row, timestamp=0.0):
+        if self.count == self.capacity:
+            self._drop_oldest()
+        self.values[self._next] = row
+        self.times[self._next] = timestamp
+        self._sum += row
+        self._sumsq += row * row
+        self._next = (self._next + 1) % self.capacity
+        self.count += 1
+
+        # Running sums drift with floating point error; rebuild them once per capacity pushes
+        self._pushes += 1
+        if self._pushes % self.capacity == 0:
+            window = self.values[(self._oldest() + np.arange(self.count)) % self.capacity]
+            self._sum = window.sum(axis=0)
+            self._sumsq = (window * window).sum(axis=0)
+
+    def expire(self, cutoff):
+        """
+        Drops the rows pushed before `cutoff` (seconds).
+        """
+        while self.count and self.times[self._oldest()] < cutoff:
+            self._drop_oldest()
+        if not self.count:
+            self._sum[:] = 0.0
+            self._sumsq[:] = 0.0
+
+    def span(self):
+        """
+        Returns:
+            float: Seconds between the oldest and the newest row.
+        """
+        if self.count < 2:
+            return 0.0
+        return self.times[(self._next - 1) % self.capacity] - self.times[self._oldest()]
+
+    def sum(self):
+        return self._sum.copy()
+
+    def mean(self):
+        return self._sum / self.count if self.count else np.zeros_like(self._sum)
+
+    def std(self):
+        if not self.count:
+            return np.zeros_like(self._sum)
+        mean = self._sum / self.count
+        return np.sqrt(np.maximum(self._sumsq / self.count - mean * mean, 0.0))
+
+
+class TemporalFeatureEngine:
+    """
+    Windowed statistics over the stream of per-frame features.
+
+    The window is measured in seconds, so live capture, subsampled recordings and dropped
+    frames all describe the same stretch of time. Frames without a face only count towards
+    face_presence; the other statistics (and the velocity across the gap) ignore them.
+
+    Usage:
+        engine = TemporalFeatureEngine(window_seconds=10.0)
+        for timestamp, frame in stream:
+            engine.push(extractor.process(frame)[0], timestamp)
+        vector = engine.vector()     # len(TEMPORAL_FEATURE_NAMES) values
+    """
+
+    def __init__(self, window_seconds=10.0, max_frames=1800, blink_ratio=0.6, stillness_threshold=0.1):
+        """
+        Args:
+            window_seconds (float): Length of the sliding window.
+            max_frames (int): Buffer size; caps the window at high frame rates (1800 = 30 s at 60 fps).
+            blink_ratio (float): The eyes count as closed below this share of their window mean.
+            stillness_threshold (float): Head-yaw speed (per second) under which the head is still.
+        """
+        n = len(FEATURE_NAMES)
+        self.window_seconds = window_seconds
+        self.blink_ratio = blink_ratio
+        self.stillness_threshold = stillness_threshold
+        self._features = RollingWindow(max_frames, n)
+        self._velocity = RollingWindow(max_frames, n)
+        self._eyes = RollingWindow(max_frames)
+        self._blinks = RollingWindow(max_frames)
+        self._still = RollingWindow(max_frames)
+        self._face = RollingWindow(max_frames)
+        self._windows = (self._features, self._velocity, self._eyes, self._blinks, self._still, self._face)
+        self._previous = None
+        self._previous_time = None
+        self._eyes_closed = False
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._face.count
+
+    def push(self, features, timestamp):
+        """
+        Adds one frame's features (amortized O(1)).
+
+        Args:
+            features (np.array): len(FEATURE_NAMES) per-frame values.
+            timestamp (float): Capture time in seconds.
+        """
+        features = np.asarray(features, dtype=float)
+        with self._lock:
+            face = bool(np.any(features[_FACE_COLUMNS] != 0))
+            self._face.push(float(face), timestamp)
+
+            if face:
+                self._features.push(features, timestamp)
+                if self._previous is not None and timestamp > self._previous_time:
+                    velocity = np.abs(features - self._previous) / (timestamp - self._previous_time)
+                    self._velocity.push(velocity, timestamp)
+                    self._still.push(float(velocity[_YAW_COLUMN] < self.stillness_threshold), timestamp)
+
+                eyes = features[_EYE_COLUMNS].mean()
+                self._eyes.push(eyes, timestamp)
+                closed = eyes < self.blink_ratio * self._eyes.mean()[0]
+                self._blinks.push(float(closed and not self._eyes_closed), timestamp)
+                self._eyes_closed = closed
+                self._previous, self._previous_time = features, timestamp
+            else:
+                # The next face frame starts a new run: no velocity or blink across the gap
+                self._previous = self._previous_time = None
+                self._eyes_closed = False
+
+            cutoff = timestamp - self.window_seconds
+            for window in self._windows:
+                window.expire(cutoff)
+
+    def span(self):
+        """
+        Returns:
+            float: Seconds covered by the frames currently in the window.
+        """
+        return self._face.span()
+
+    def vector(self):
+        """
+        Returns:
+            np.array: Current temporal features, ordered as TEMPORAL_FEATURE_NAMES.
+        """
+        with self._lock:
+            seconds = self.span()
+            blink_rate = self._blinks.sum()[0] / seconds * 60 if seconds > 0 else 0.0
+            return np.concatenate([
+                self._features.mean(), self._features.std(), self._velocity.mean(),
+                [blink_rate, self._still.mean()[0], self._face.mean()[0]],
+            ])
+
+
+class TemporalFeatureStream:
+    """
+    Runs feature extraction on every new frame of a FrameGrabber on a background thread and
+    feeds a TemporalFeatureEngine. The extractor must not be used by other threads meanwhile.
+    """
+
+    def __init__(self, grabber, extractor, engine=None):
+        self.grabber = grabber
+        self.extractor = extractor
+        self.engine = engine or TemporalFeatureEngine()
+        self.latest_features = None
+        self.latest_timestamp = None   # capture time of the newest frame in the window
+        self._running = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._running.set()
+        self._thread = threading.Thread(target=self._run, name="temporal-features", daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        last = None
+        while self._running.is_set():
+            timestamp, frame = self.grabber.buffer.wait_for_frame(after=last, timeout=0.5)
+            if frame is None:
+                continue
+            last = timestamp
+            features, _ = self.extractor.process(frame)
+            self.engine.push(features, timestamp)
+            self.latest_features = features
+            self.latest_timestamp = timestamp
+
+    def vector(self):
+        return self.engine.vector()
+
+    def stop(self):
+        self._running.clear()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+
+
+def temporal_vectors(features, timestamps, window_seconds=10.0, sample_seconds=0.5, min_seconds=1.0):
+    """
+    Streams a recorded sequence of per-frame features through a TemporalFeatureEngine and
+    samples the temporal vector every `sample_seconds` once `min_seconds` have been seen.
+
+    Returns:
+        np.array: (n_samples, len(TEMPORAL_FEATURE_NAMES))
+    """
+    engine = TemporalFeatureEngine(window_seconds=window_seconds)
+    vectors = []
+    next_sample = None
+    for row, timestamp in zip(features, timestamps):
+        engine.push(row, timestamp)
+        if next_sample is None:
+            next_sample = timestamp + min_seconds
+        if timestamp >= next_sample:
+            vectors.append(engine.vector())
+            while next_sample <= timestamp:
+                next_sample += sample_seconds
+    return np.array(vectors).reshape(len(vectors), len(TEMPORAL_FEATURE_NAMES))
+
+
+def _fill_dropped_frames(features, indices, frame_stride):
+    """
+    Re-inserts the frames extract_dataset dropped for having no detection as all-zero rows, so
+    they count as face-absent instead of silently shortening the gaps.
+    """
+    expected = np.arange(indices[0], indices[-1] + 1, frame_stride)
+    if len(expected) == len(indices):
+        return features, indices
+    filled = np.zeros((len(expected), features.shape[1]))
+    filled[np.searchsorted(expected, indices)] = features
+    return filled, expected
+
+
+def build_temporal_dataset(output_dir, fps=30.0, window_seconds=10.0, sample_seconds=0.5, min_seconds=1.0, frame_stride=1):
+    """
+    Builds temporal_features.npy / temporal_labels.npy from the chunks written by
+    batch_extraction.extract_dataset (video sources only; frames are ordered by frame index).
+
+    Args:
+        fps (float): Frame rate of the recordings; frame indices / fps are the timestamps.
+        frame_stride (int): Every n-th frame was extracted (plan_tasks stride).
+
+    Returns:
+        tuple: (features, labels) arrays.
+    """
+    sequences = {}
+    for path in sorted(glob.glob(os.path.join(output_dir, "chunks", "chunk_*.npz"))):
+        with np.load(path) as chunk:
+            if not len(chunk["features"]) or not len(chunk["frame_indices"]):
+                continue
+            source = str(chunk["source"])
+            if os.path.isdir(source):
+                continue  # still images have no temporal order
+            entry = sequences.setdefault(source, {"features": [], "indices": [], "label": str(chunk["labels"][0])})
+            entry["features"].append(chunk["features"])
+            entry["indices"].append(chunk["frame_indices"])
+
+    X, y = [], []
+    for source, entry in sequences.items():
+        indices = np.concatenate(entry["indices"])
+        order = np.argsort(indices)
+        features, indices = _fill_dropped_frames(np.concatenate(entry["features"])[order], indices[order], frame_stride)
+        vectors = temporal_vectors(features, indices / fps, window_seconds=window_seconds,
+                                   sample_seconds=sample_seconds, min_seconds=min_seconds)
+        X.append(vectors)
+        y.extend([entry["label"]] * len(vectors))
+
+    X = np.concatenate(X) if X else np.empty((0, len(TEMPORAL_FEATURE_NAMES)))
+    y = np.array(y)
+    np.save(os.path.join(output_dir, "temporal_features.npy"), X)
+    np.save(os.path.join(output_dir, "temporal_labels.npy"), y)
+    return X, y
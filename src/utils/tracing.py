@@ -0,0 +1,340 @@
+import bisect
+import json
+import logging
+import logging.handlers
+import os
+import threading
+import time
+
+# Lightweight tracing and metrics for the live assistant.
+#
+#   with tracing.span("facemesh"):      nested timing spans; durations feed per-stage histograms,
+#       ...                             kept apart per parent path (e.g. "extract/facemesh")
+#   tracing.count("llm_tokens", n)      counters
+#   tracing.set_gauge("camera_fps", v)  gauges
+#
+# Tracing is off unless ASSISTANT_TRACING=1 (or enable() is called). When off, span() returns
+# a shared no-op context manager and count()/observe()/set_gauge() return after one check,
+# so instrumented code pays well under a microsecond per call.
+#
+# Exporters (started with start_exporters()): a rotating JSON-lines metrics file with one
+# snapshot per interval, and a Prometheus text endpoint (http://127.0.0.1:<port>/metrics).
+# draw_overlay() writes the latest stage latencies onto a camera frame.
+
+# Histogram bucket upper bounds, in seconds
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_enabled = os.getenv("ASSISTANT_TRACING", "0") == "1"
+_lock = threading.Lock()
+_local = threading.local()
+_histograms = {}
+_counters = {}
+_gauges = {}
+
+
+class Histogram:
+    """
+    Cumulative latency histogram with fixed buckets (Prometheus style) and the last value.
+    """
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.last = 0.0
+        self.updated = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        self.last = seconds
+        self.updated = time.monotonic()
+
+    def quantile(self, q):
+        """
+        Upper bound of the bucket containing the q-quantile.
+        """
+        if not self.count:
+            return 0.0
+        target, seen = q * self.count, 0
+        for bound, n in zip(BUCKETS + (float("inf"),), self.counts):
+            seen += n
+            if seen >= target:
+                return bound
+        return float("inf")
+
+
+def enabled():
+    return _enabled
+
+
+def enable():
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+class _NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return None
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class _Span:
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        stack = getattr(_local, "stack", None)
+        if stack is None:
+            stack = _local.stack = []
+        stack.append(self.name)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        duration = time.perf_counter() - self.start
+        _local.stack.pop()
+        observe(self.name, duration)
+        if exc_type is not None:
+            count(f"{self.name}_errors")
+        return None
+
+
+def span(name):
+    """
+    Context manager timing a stage. Spans nest per thread; the duration is recorded in the
+    histogram of `name` under the path of the enclosing spans.
+    """
+    if not _enabled:
+        return _NOOP_SPAN
+    return _Span(name)
+
+
+def traced(name):
+    """
+    Decorator wrapping a function in span(name).
+    """
+    def decorate(fn):
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with _Span(name):
+                return fn(*args, **kwargs)
+        wrapper.__name__ = fn.__name__
+        wrapper.__doc__ = fn.__doc__
+        wrapper.__wrapped__ = fn
+        return wrapper
+    return decorate
+
+
+def current_path():
+    """
+    Names of the spans open on this thread, outermost first.
+    """
+    return list(getattr(_local, "stack", []))
+
+
+def observe(name, seconds):
+    """
+    Records a duration for stage `name`, nested under the spans open on this thread.
+    """
+    if not _enabled:
+        return
+    key = ("/".join(current_path()), name)
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = Histogram()
+        histogram.observe(seconds)
+
+
+def _stage_path(parent, name):
+    return f"{parent}/{name}" if parent else name
+
+
+def count(name, n=1):
+    if not _enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+def set_gauge(name, value):
+    if not _enabled:
+        return
+    with _lock:
+        _gauges[name] = value
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+        _gauges.clear()
+
+
+def snapshot():
+    """
+    Returns:
+        dict: timestamp, counters, gauges and per-stage count / mean / p50 / p95 / last (seconds),
+        keyed by stage path ("extract/facemesh") with the parent path of each stage.
+    """
+    with _lock:
+        stages = {
+            _stage_path(parent, name): {
+                "parent": parent, "count": h.count, "mean": h.sum / h.count if h.count else 0.0,
+                "p50": h.quantile(0.5), "p95": h.quantile(0.95), "last": h.last,
+            }
+            for (parent, name), h in _histograms.items()
+        }
+        return {"timestamp": time.time(), "counters": dict(_counters), "gauges": dict(_gauges), "stages": stages}
+
+
+def prometheus_text():
+    """
+    Metrics in the Prometheus text exposition format.
+    """
+    lines = []
+    with _lock:
+        if _histograms:
+            lines.append("# TYPE assistant_stage_seconds histogram")
+        for (parent, name), h in sorted(_histograms.items()):
+            labels = f'stage="{name}",parent="{parent}"'
+            cumulative = 0
+            for bound, n in zip(BUCKETS, h.counts):
+                cumulative += n
+                lines.append(f'assistant_stage_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'assistant_stage_seconds_bucket{{{labels},le="+Inf"}} {h.count}')
+            lines.append(f'assistant_stage_seconds_sum{{{labels}}} {h.sum}')
+            lines.append(f'assistant_stage_seconds_count{{{labels}}} {h.count}')
+        for name, value in sorted(_counters.items()):
+            lines.append(f"# TYPE assistant_{name}_total counter")
+            lines.append(f"assistant_{name}_total {value}")
+        for name, value in sorted(_gauges.items()):
+            lines.append(f"# TYPE assistant_{name} gauge")
+            lines.append(f"assistant_{name} {value}")
+    return "\n".join(lines) + "\n"
+
+
+# --- exporters ---
+
+class MetricsFileExporter:
+    """
+    Appends a snapshot() as one JSON line every `interval` seconds to a size-rotated file
+    (metrics.jsonl, metrics.jsonl.1, ...).
+    """
+
+    def __init__(self, path="metrics.jsonl", interval=10.0, max_bytes=5 * 1024 * 1024, backup_count=3):
+        self.interval = interval
+        self._logger = logging.getLogger(f"assistant.metrics.{path}")
+        self._logger.propagate = False
+        self._logger.setLevel(logging.INFO)
+        self._handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count)
+        self._logger.addHandler(self._handler)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="metrics-file", daemon=True)
+        self._thread.start()
+
+    def write(self):
+        self._logger.info(json.dumps(snapshot()))
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.write()
+
+    def close(self):
+        self._stop.set()
+        self._thread.join(timeout=2)
+        self.write()
+        self._logger.removeHandler(self._handler)
+        self._handler.close()
+
+
+def serve_prometheus(port=9464, host="127.0.0.1"):
+    """
+    Serves prometheus_text() at http://host:port/metrics from a daemon thread.
+
+    Returns:
+        http.server.ThreadingHTTPServer: call shutdown() to stop it.
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != "/metrics":
+                self.send_error(404)
+                return
+            body = prometheus_text().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+
+class Exporters:
+    def __init__(self, file_exporter=None, server=None):
+        self.file_exporter = file_exporter
+        self.server = server
+
+    def close(self):
+        if self.file_exporter is not None:
+            self.file_exporter.close()
+        if self.server is not None:
+            self.server.shutdown()
+
+
+def start_exporters(metrics_path=None, port=None):
+    """
+    Starts the exporters configured by the arguments or by ASSISTANT_METRICS_FILE
+    (default metrics.jsonl) and ASSISTANT_METRICS_PORT (default 9464; 0 disables the endpoint).
+    """
+    metrics_path = metrics_path or os.getenv("ASSISTANT_METRICS_FILE", "metrics.jsonl")
+    port = int(os.getenv("ASSISTANT_METRICS_PORT", "9464")) if port is None else port
+    server = None
+    if port:
+        try:
+            server = serve_prometheus(port)
+        except OSError as e:
+            print(f" Metrics endpoint not started on port {port}: {e}")
+    return Exporters(MetricsFileExporter(metrics_path), server)
+
+
+def draw_overlay(frame, stages=("capture", "facemesh", "pose", "predict", "llm_first_token", "llm_total")):
+    """
+    Draws the camera FPS and the latest latency of each stage onto a frame (in place). A stage
+    recorded under several parents shows its most recent value.
+    """
+    if not _enabled:
+        return frame
+    import cv2
+
+    with _lock:
+        lines = [f"fps {_gauges.get('camera_fps', 0.0):.1f}  dropped {_counters.get('camera_read_failures', 0)}"]
+        latest = {}
+        for (_, name), h in _histograms.items():
+            if name in stages and (name not in latest or h.updated > latest[name].updated):
+                latest[name] = h
+        lines += [f"{name} {latest[name].last * 1000:.1f} ms" for name in stages if name in latest]
+    for i, line in enumerate(lines):
+        cv2.putText(frame, line, (10, frame.shape[0] - 12 - 18 * (len(lines) - 1 - i)),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.45, (255, 255, 0), 1)
+    return frame